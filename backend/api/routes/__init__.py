@@ -1,3 +1,3 @@
-from . import persons, face_recognition, attendance
+from . import persons, face_recognition, attendance, stream
 
-__all__ = ["persons", "face_recognition", "attendance"]
+__all__ = ["persons", "face_recognition", "attendance", "stream"]
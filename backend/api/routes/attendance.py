@@ -1,20 +1,23 @@
 """
 Attendance API routes
 """
-from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile, Response
+from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from typing import Annotated, List, Optional
 from uuid import UUID
-from datetime import date, datetime
+from datetime import date
 import io
 
 from backend.models import (
     AttendanceMarkResponse,
+    MultiFaceAttendanceResponse,
     AttendanceRecord,
     ErrorResponse
 )
 from backend.services import AttendanceService
 from backend.api.dependencies import get_db_connection
+from database.db import get_db_connection as db_connection
 from backend.config import settings
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
@@ -41,7 +44,7 @@ async def mark_attendance_by_face(
         
         # Mark attendance
         service = AttendanceService(conn)
-        result = service.mark_attendance_by_face(image_bytes)
+        result = await run_in_threadpool(service.mark_attendance_by_face, image_bytes)
         
         return AttendanceMarkResponse(
             success=result["success"],
@@ -60,6 +63,40 @@ async def mark_attendance_by_face(
         )
 
 
+@router.post("/mark/faces", response_model=MultiFaceAttendanceResponse)
+async def mark_attendance_by_faces(
+    image: Annotated[UploadFile, File(description="Image with one or more faces (group photo, classroom camera)")],
+    conn = Depends(get_db_connection)
+):
+    """
+    Mark attendance for every recognized face in an image
+    """
+    try:
+        # Validate file type
+        if image.content_type not in settings.ALLOWED_IMAGE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMAGE_TYPES)}"
+            )
+        
+        # Read image bytes
+        image_bytes = await image.read()
+        
+        # Mark attendance for all recognized faces
+        service = AttendanceService(conn)
+        result = await run_in_threadpool(service.mark_attendance_by_faces, image_bytes)
+        
+        return MultiFaceAttendanceResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to mark attendance: {str(e)}"
+        )
+
+
 @router.post("/mark/manual/{person_id}", response_model=AttendanceMarkResponse)
 async def mark_attendance_manual(
     person_id: UUID,
@@ -70,7 +107,7 @@ async def mark_attendance_manual(
     """
     try:
         service = AttendanceService(conn)
-        result = service.mark_attendance_manual(person_id)
+        result = await run_in_threadpool(service.mark_attendance_manual, person_id)
         
         return AttendanceMarkResponse(
             success=result["success"],
@@ -94,7 +131,7 @@ async def get_today_attendance(conn = Depends(get_db_connection)):
     """
     try:
         service = AttendanceService(conn)
-        records = service.get_today_attendance()
+        records = await run_in_threadpool(service.get_today_attendance)
         return records
         
     except Exception as e:
@@ -114,7 +151,7 @@ async def get_attendance_by_date(
     """
     try:
         service = AttendanceService(conn)
-        records = service.get_attendance_by_date(target_date)
+        records = await run_in_threadpool(service.get_attendance_by_date, target_date)
         return records
         
     except Exception as e:
@@ -136,7 +173,7 @@ async def get_person_attendance(
     """
     try:
         service = AttendanceService(conn)
-        records = service.get_person_attendance(person_id, start_date, end_date)
+        records = await run_in_threadpool(service.get_person_attendance, person_id, start_date, end_date)
         return records
         
     except Exception as e:
@@ -146,56 +183,55 @@ async def get_person_attendance(
         )
 
 
+def stream_attendance_csv(start_date: date, end_date: date, compress: bool) -> StreamingResponse:
+    """
+    Stream attendance between two dates (inclusive) as a CSV (or gzip) download
+    """
+    def stream_rows():
+        # The request's connection is released before the body streams, so use our own
+        with db_connection() as conn:
+            yield from AttendanceService(conn).export_attendance_csv(start_date, end_date, compress)
+    
+    if start_date == end_date:
+        filename = f"attendance_{start_date}.csv"
+    else:
+        filename = f"attendance_{start_date}_{end_date}.csv"
+    if compress:
+        filename += ".gz"
+    
+    return StreamingResponse(
+        stream_rows(),
+        media_type="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/export/today")
-async def export_today_attendance_csv(conn = Depends(get_db_connection)):
+async def export_today_attendance_csv(gzip: bool = False):
     """
     Export today's attendance as CSV file
     """
-    try:
-        service = AttendanceService(conn)
-        records = service.get_today_attendance()
-        csv_content = service.export_attendance_csv(records)
-        
-        # Create CSV response
-        return Response(
-            content=csv_content,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=attendance_{datetime.now().strftime('%Y-%m-%d')}.csv"
-            }
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to export attendance: {str(e)}"
-        )
+    today = date.today()
+    return stream_attendance_csv(today, today, gzip)
 
 
 @router.get("/export/date/{target_date}")
-async def export_attendance_csv_by_date(
-    target_date: date,
-    conn = Depends(get_db_connection)
-):
+async def export_attendance_csv_by_date(target_date: date, gzip: bool = False):
     """
     Export attendance for a specific date as CSV file
     """
-    try:
-        service = AttendanceService(conn)
-        records = service.get_attendance_by_date(target_date)
-        csv_content = service.export_attendance_csv(records)
-        
-        # Create CSV response
-        return Response(
-            content=csv_content,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=attendance_{target_date}.csv"
-            }
-        )
-        
-    except Exception as e:
+    return stream_attendance_csv(target_date, target_date, gzip)
+
+
+@router.get("/export/range")
+async def export_attendance_csv_by_range(start_date: date, end_date: date, gzip: bool = False):
+    """
+    Export attendance between two dates (inclusive) as CSV file
+    Rows are streamed, so large ranges do not have to fit in memory
+    """
+    if end_date < start_date:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to export attendance: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
         )
+    return stream_attendance_csv(start_date, end_date, gzip)
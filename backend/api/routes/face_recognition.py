@@ -2,16 +2,36 @@
 Face recognition API routes
 """
 from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile, Form
-from typing import Annotated
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List, Optional
+import json
+import time
 
 from backend.models import (
     UploadImageResponse,
     FaceRecognitionResponse,
+    MultiFaceRecognitionResponse,
+    BatchingStatsResponse,
+    RecognitionCacheStatsResponse,
+    InferenceWorkerStats,
     ErrorResponse
 )
-from backend.services import PersonService, FaceRecognitionService
+from backend.services import PersonService, FaceRecognitionService, recognition_batcher, recognition_cache
+from backend.services.inference_pool import InferencePool
 from backend.api.dependencies import get_db_connection
 from backend.config import settings
+from backend.utils.bulk_upload import (
+    UploadSpool,
+    ImageSources,
+    add_image_source,
+    read_manifest,
+    match_manifest,
+    enrollment_error
+)
+from database.db import get_db_connection as db_connection
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
 
 router = APIRouter(prefix="/face-recognition", tags=["face-recognition"])
 
@@ -46,7 +66,8 @@ async def upload_person_image(
         
         # Create person with image
         service = PersonService(conn)
-        result = service.create_person_with_image(
+        result = await run_in_threadpool(
+            service.create_person_with_image,
             first_name,
             last_name,
             image_bytes
@@ -75,6 +96,93 @@ async def upload_person_image(
         )
 
 
+@router.post("/upload/bulk")
+async def bulk_upload_person_images(
+    files: Annotated[List[UploadFile], File(description="Face images and/or ZIP archives of images")],
+    manifest: Annotated[
+        Optional[UploadFile],
+        File(description="CSV with filename,first_name,last_name columns (or manifest.csv inside the ZIP)")
+    ] = None
+):
+    """
+    Enroll many people at once
+    
+    Images are encoded in parallel and all people are written in one transaction.
+    Streams one JSON object per line (application/x-ndjson) for each file, followed
+    by a final {"summary": ...} line.
+    """
+    sources: ImageSources = {}
+    errors = []
+    manifest_bytes = await manifest.read() if manifest is not None else None
+    spool = UploadSpool()
+    
+    try:
+        for upload in files:
+            filename = upload.filename or ""
+            if upload.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+                try:
+                    zip_sources, zip_manifest = await run_in_threadpool(spool.add_zip, upload.file)
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Invalid ZIP archive {filename}: {str(e)}"
+                    )
+                for name, read in zip_sources.items():
+                    add_image_source(sources, name, read)
+                if manifest_bytes is None:
+                    manifest_bytes = zip_manifest
+            elif upload.content_type in settings.ALLOWED_IMAGE_TYPES:
+                add_image_source(sources, filename, await run_in_threadpool(spool.add_image, upload.file))
+            else:
+                errors.append(enrollment_error(filename, f"Invalid file type: {upload.content_type}"))
+        
+        if manifest_bytes is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A names manifest is required (manifest upload or manifest.csv in the ZIP)"
+            )
+        
+        try:
+            people, manifest_errors = read_manifest(manifest_bytes)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid manifest: {str(e)}"
+            )
+    except Exception:
+        spool.close()
+        raise
+    
+    items, match_errors = match_manifest(sources, people)
+    errors += manifest_errors + match_errors
+    
+    def stream_results():
+        started = time.perf_counter()
+        counts = {"enrolled": 0, "failed": 0}
+        
+        def to_line(result):
+            counts["enrolled" if result["success"] else "failed"] += 1
+            return json.dumps(result, default=str) + "\n"
+        
+        try:
+            for error in errors:
+                yield to_line(error)
+            
+            if items:
+                # The request's connection is released before the body streams, so use our own
+                with db_connection() as conn:
+                    for result in PersonService(conn).enroll_many(items):
+                        yield to_line(result)
+        finally:
+            spool.close()
+        
+        yield json.dumps({
+            "summary": {**counts, "seconds": round(time.perf_counter() - started, 3)}
+        }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 @router.post("/recognize", response_model=FaceRecognitionResponse)
 async def recognize_face(
     image: Annotated[UploadFile, File(description="Face image to recognize")],
@@ -96,7 +204,7 @@ async def recognize_face(
         
         # Recognize face
         service = FaceRecognitionService(conn)
-        result = service.recognize_face(image_bytes)
+        result = await run_in_threadpool(service.recognize_face, image_bytes)
         
         if not result:
             return FaceRecognitionResponse(
@@ -121,3 +229,80 @@ async def recognize_face(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to recognize face: {str(e)}"
         )
+
+
+@router.post("/recognize/multi", response_model=MultiFaceRecognitionResponse)
+async def recognize_faces(
+    image: Annotated[UploadFile, File(description="Image with one or more faces (group photo, classroom camera)")],
+    conn = Depends(get_db_connection)
+):
+    """
+    Recognize every face in an image
+    """
+    try:
+        # Validate file type
+        if image.content_type not in settings.ALLOWED_IMAGE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMAGE_TYPES)}"
+            )
+        
+        # Read image bytes
+        image_bytes = await image.read()
+        
+        # Recognize all faces
+        service = FaceRecognitionService(conn)
+        faces = await run_in_threadpool(service.recognize_faces, image_bytes)
+        
+        if faces is None:
+            return MultiFaceRecognitionResponse(success=False, message="Could not read image")
+        
+        recognized = sum(face["person_id"] is not None for face in faces)
+        return MultiFaceRecognitionResponse(
+            success=recognized > 0,
+            faces=faces,
+            message=f"Recognized {recognized} of {len(faces)} detected faces"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to recognize faces: {str(e)}"
+        )
+
+
+@router.get("/batching", response_model=BatchingStatsResponse)
+async def get_batching_stats():
+    """
+    Get recognition micro-batching metrics (batch sizes and queue wait times)
+    """
+    return BatchingStatsResponse(
+        enabled=recognition_batcher.is_running,
+        window_ms=1000.0 * recognition_batcher.window,
+        batch_size_limit=recognition_batcher.max_batch_size,
+        wait_limit_ms=1000.0 * recognition_batcher.max_wait,
+        **recognition_batcher.stats.snapshot()
+    )
+
+
+@router.get("/cache", response_model=RecognitionCacheStatsResponse)
+async def get_cache_stats():
+    """
+    Get recognition cache metrics (exact and perceptual hits, misses)
+    """
+    return RecognitionCacheStatsResponse(
+        enabled=recognition_cache.enabled and settings.GALLERY_SEARCH_BACKEND != "pgvector",
+        max_entries=recognition_cache.max_entries,
+        ttl_seconds=recognition_cache.ttl,
+        **recognition_cache.snapshot()
+    )
+
+
+@router.get("/models", response_model=List[InferenceWorkerStats])
+async def get_model_stats():
+    """
+    Get the dlib models loaded by each inference worker process, with load time and memory
+    """
+    return await run_in_threadpool(InferencePool.worker_reports)
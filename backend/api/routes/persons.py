@@ -2,14 +2,15 @@
 Person API routes
 """
 from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 from typing import List, Annotated
 from uuid import UUID
 
-from backend.models import PersonCreate, PersonResponse, ErrorResponse
-from backend.services import PersonService, FaceRecognitionService
+from backend.models import PersonCreate, PersonResponse, PersonEncodingsResponse, ErrorResponse
+from backend.services import PersonService
 from backend.api.dependencies import get_db_connection
-from database.repositories import ImageRepository, EncodingRepository
+from database.repositories import ImageRepository
 from backend.config import settings
 
 router = APIRouter(prefix="/persons", tags=["persons"])
@@ -23,12 +24,13 @@ async def create_person(
     """Create a new person"""
     try:
         service = PersonService(conn)
-        person_id = service.create_person(
+        person_id = await run_in_threadpool(
+            service.create_person,
             person_data.first_name,
             person_data.last_name
         )
         
-        person = service.get_person(person_id)
+        person = await run_in_threadpool(service.get_person, person_id)
         return person
         
     except Exception as e:
@@ -43,7 +45,7 @@ async def get_all_persons(conn = Depends(get_db_connection)):
     """Get all persons"""
     try:
         service = PersonService(conn)
-        persons = service.get_all_persons()
+        persons = await run_in_threadpool(service.get_all_persons)
         return persons
         
     except Exception as e:
@@ -58,7 +60,7 @@ async def get_person(person_id: UUID, conn = Depends(get_db_connection)):
     """Get a person by ID"""
     try:
         service = PersonService(conn)
-        person = service.get_person(person_id)
+        person = await run_in_threadpool(service.get_person, person_id)
         
         if not person:
             raise HTTPException(
@@ -88,7 +90,7 @@ async def update_person(
         service = PersonService(conn)
         
         # Check if person exists
-        existing = service.get_person(person_id)
+        existing = await run_in_threadpool(service.get_person, person_id)
         if not existing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -96,14 +98,15 @@ async def update_person(
             )
         
         # Update
-        service.update_person(
+        await run_in_threadpool(
+            service.update_person,
             person_id,
             person_data.first_name,
             person_data.last_name
         )
         
         # Return updated person
-        person = service.get_person(person_id)
+        person = await run_in_threadpool(service.get_person, person_id)
         return person
         
     except HTTPException:
@@ -122,14 +125,14 @@ async def delete_person(person_id: UUID, conn = Depends(get_db_connection)):
         service = PersonService(conn)
         
         # Check if person exists
-        existing = service.get_person(person_id)
+        existing = await run_in_threadpool(service.get_person, person_id)
         if not existing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Person not found"
             )
         
-        service.delete_person(person_id)
+        await run_in_threadpool(service.delete_person, person_id)
         
     except HTTPException:
         raise
@@ -145,7 +148,7 @@ async def get_person_image(person_id: UUID, conn = Depends(get_db_connection)):
     """Get a person's image"""
     try:
         image_repo = ImageRepository(conn)
-        image_data = image_repo.get_by_person_id(person_id)
+        image_data = await run_in_threadpool(image_repo.get_by_person_id, person_id)
         
         if not image_data or not image_data.get('image'):
             raise HTTPException(
@@ -179,7 +182,7 @@ async def update_person_image(
         service = PersonService(conn)
         
         # Check if person exists
-        existing = service.get_person(person_id)
+        existing = await run_in_threadpool(service.get_person, person_id)
         if not existing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -203,17 +206,8 @@ async def update_person_image(
                 detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
             )
         
-        # Update image using FaceRecognitionService
-        face_service = FaceRecognitionService(conn)
-        encoding_repo = EncodingRepository(conn)
-        
-        # Delete old encoding and image
-        encoding_repo.delete_by_person_id(person_id)
-        image_repo = ImageRepository(conn)
-        image_repo.delete_by_person_id(person_id)
-        
-        # Add new image and encoding
-        result = face_service.process_and_store_face(image_bytes, person_id)
+        # Replace stored image and encoding
+        result = await run_in_threadpool(service.replace_person_image, person_id, image_bytes)
         
         if not result:
             raise HTTPException(
@@ -230,3 +224,62 @@ async def update_person_image(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update image: {str(e)}"
         )
+
+
+@router.post("/{person_id}/encodings", response_model=PersonEncodingsResponse)
+async def add_person_encodings(
+    person_id: UUID,
+    images: Annotated[List[UploadFile], File(description="Additional face images of the person")],
+    conn = Depends(get_db_connection)
+):
+    """
+    Enroll more face images of a person as additional templates
+    Images without a detectable face are reported in errors and skipped
+    """
+    try:
+        service = PersonService(conn)
+        
+        # Check if person exists
+        existing = await run_in_threadpool(service.get_person, person_id)
+        if not existing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Person not found"
+            )
+        
+        items = []
+        for image in images:
+            # Validate file type
+            if image.content_type not in settings.ALLOWED_IMAGE_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid file type for {image.filename}. Allowed types: {', '.join(settings.ALLOWED_IMAGE_TYPES)}"
+                )
+            
+            image_bytes = await image.read()
+            
+            # Validate file size
+            if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File {image.filename} too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
+                )
+            items.append((image.filename, image_bytes))
+        
+        result = await run_in_threadpool(service.add_person_images, person_id, items)
+        
+        if not result["added"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No face could be processed from the images: " + "; ".join(result["errors"])
+            )
+        
+        return PersonEncodingsResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to add encodings: {str(e)}"
+        )
@@ -0,0 +1,217 @@
+"""
+Streaming recognition routes - WebSocket sessions for continuous webcam detection
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi.concurrency import run_in_threadpool
+
+from backend.services import FaceRecognitionService, AttendanceService, gallery_index
+from backend.services.face_tracker import FaceTracker, tracker_from_settings
+from backend.services.motion_gate import MotionGate, motion_gate_from_settings, motion_gate_stats
+from backend.models import StreamStatsResponse
+from backend.config import settings
+from backend.utils.metrics import registry
+from database.db import get_db_connection
+from database.repositories import attendance_presence
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+STREAM_MODES = ("recognize", "attendance")
+
+stream_sessions = registry.gauge("stream_sessions", "Open streaming recognition sessions")
+stream_frames = registry.counter("stream_frames_total", "Streamed frames by outcome: processed or dropped", ("outcome",))
+stream_frame_seconds = registry.histogram("stream_frame_seconds", "Time to process one streamed frame")
+
+
+class LatestFrame:
+    """
+    Single-slot frame buffer: a new frame replaces one that has not been picked up yet
+
+    This is the session's backpressure - when inference is slower than the camera,
+    stale frames are dropped instead of queueing up behind each other.
+    """
+
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._sequence = 0
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        if self._frame is not None:
+            self.dropped += 1
+            stream_frames.inc(outcome="dropped")
+        self._frame = frame
+        self.received += 1
+        self._sequence = self.received
+        self._ready.set()
+
+    async def take(self) -> tuple:
+        await self._ready.wait()
+        self._ready.clear()
+        frame, self._frame = self._frame, None
+        return self._sequence, frame
+
+
+def _primary_face(faces: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The most confidently recognized face in a frame, if any"""
+    recognized = [face for face in faces if face["person_id"] is not None]
+    return max(recognized, key=lambda face: face["confidence"], default=None)
+
+
+def _recognize_faces(frame: bytes) -> Optional[List[Dict[str, Any]]]:
+    # The in-memory gallery needs no database; pgvector (or a first load) does
+    if settings.GALLERY_SEARCH_BACKEND != "pgvector" and gallery_index.is_loaded:
+        return FaceRecognitionService(None).recognize_faces(frame)
+    with get_db_connection() as conn:
+        return FaceRecognitionService(conn).recognize_faces(frame)
+
+
+def _mark_attendance(person_id, full_name: str, confidence: float) -> Dict[str, Any]:
+    if attendance_presence.is_warm and attendance_presence.contains(person_id):
+        # Already marked today: answered from the presence set, nothing to write
+        return AttendanceService(None).mark_recognized_person(person_id, full_name, confidence)
+    with get_db_connection() as conn:
+        return AttendanceService(conn).mark_recognized_person(person_id, full_name, confidence)
+
+
+def _process_frame(mode: str, frame: bytes, gate: MotionGate, tracker: FaceTracker) -> Dict[str, Any]:
+    # Runs in a worker thread; a connection is only borrowed for the steps that need one
+    if not gate.has_motion(frame):
+        return {"success": False, "message": "No activity", "idle": True}
+
+    # Faces already identified in earlier frames are followed without re-encoding;
+    # detection still runs every FACE_TRACKING_DETECT_SECONDS to catch new faces
+    faces = tracker.update(frame, _recognize_faces, FaceRecognitionService(None).detect_faces) or []
+    face = _primary_face(faces)
+    tracked = bool(faces) and all(f["tracked"] for f in faces)
+
+    if face is None:
+        return {
+            "success": False,
+            "message": "No face detected in image or no matching face found in database",
+            "tracked": tracked
+        }
+
+    person_id, full_name, confidence = face["person_id"], face["full_name"], face["confidence"]
+    if mode == "attendance":
+        result = _mark_attendance(person_id, full_name, confidence)
+    else:
+        result = {
+            "success": True,
+            "person_id": person_id,
+            "full_name": full_name,
+            "confidence": confidence,
+            "message": f"Face recognized as {full_name} with {confidence*100:.1f}% confidence"
+        }
+    result.update(track_id=face["track_id"], tracked=tracked)
+    return result
+
+
+def _to_event(sequence: int, frames: LatestFrame, result: Dict[str, Any], started: float) -> Dict[str, Any]:
+    event = {
+        key: (str(value) if key == "person_id" and value is not None else value)
+        for key, value in result.items()
+        if key in (
+            "success", "message", "person_id", "full_name", "confidence",
+            "timestamp", "already_marked", "track_id", "tracked", "idle"
+        )
+    }
+    if event.get("timestamp") is not None:
+        event["timestamp"] = event["timestamp"].isoformat()
+    event.setdefault("idle", False)
+    event.update(
+        type="result",
+        frame=sequence,
+        dropped=frames.dropped,
+        latency_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+    return event
+
+
+@router.websocket("/recognize")
+async def recognition_stream(
+    websocket: WebSocket,
+    mode: str = Query("recognize", description="'recognize' or 'attendance'")
+):
+    """
+    Continuous recognition over one WebSocket session
+
+    The client sends JPEG frames as binary messages; the server answers with a
+    JSON {"type": "result", ...} event per processed frame (same fields as the
+    recognize / mark-attendance responses). Only the newest frame is processed
+    when inference falls behind; skipped frames are counted in "dropped".
+    Identified faces are tracked between frames and only re-encoded every
+    FACE_TRACKING_REVERIFY_SECONDS; "tracked" is true for frames that were not encoded.
+    Frames where nothing moved since the last processed one skip detection and
+    come back as "idle".
+    """
+    await websocket.accept()
+
+    if mode not in STREAM_MODES:
+        await websocket.send_json({"type": "error", "message": f"Unknown mode: {mode}"})
+        await websocket.close(code=1008)
+        return
+
+    frames = LatestFrame()
+    gate = motion_gate_from_settings()
+    tracker = tracker_from_settings()
+    await websocket.send_json({"type": "ready", "mode": mode})
+
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            frame = message.get("bytes")
+            if frame is None:
+                await websocket.send_json({"type": "error", "message": "Frames must be sent as binary messages"})
+                continue
+            if len(frame) > settings.MAX_UPLOAD_SIZE:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Frame too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
+                })
+                continue
+            frames.put(frame)
+
+    async def process_frames():
+        while True:
+            sequence, frame = await frames.take()
+            started = time.perf_counter()
+            try:
+                result = await run_in_threadpool(_process_frame, mode, frame, gate, tracker)
+            except Exception as e:
+                result = {"success": False, "message": f"Failed to process frame: {str(e)}"}
+            stream_frames.inc(outcome="processed")
+            stream_frame_seconds.observe(time.perf_counter() - started)
+            await websocket.send_json(_to_event(sequence, frames, result, started))
+
+    stream_sessions.inc()
+    receiver = asyncio.create_task(receive_frames())
+    processor = asyncio.create_task(process_frames())
+    try:
+        done, _ = await asyncio.wait({receiver, processor}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, (WebSocketDisconnect, RuntimeError)):
+                raise error
+    finally:
+        receiver.cancel()
+        processor.cancel()
+        stream_sessions.dec()
+
+
+@router.get("/stats", response_model=StreamStatsResponse)
+async def get_stream_stats():
+    """
+    Get motion-gate metrics for streamed frames (how many skipped detection)
+    """
+    return StreamStatsResponse(
+        motion_gate_enabled=settings.MOTION_GATE_MIN_CHANGE > 0,
+        **motion_gate_stats.snapshot()
+    )
@@ -19,6 +19,7 @@ class Settings(BaseSettings):
     APP_NAME: str = "Face Recognition Attendance System"
     APP_VERSION: str = "2.0.0"
     DEBUG: bool = False
+    LOG_LEVEL: str = "INFO"  # DEBUG also logs every recognition result
     
     # API Settings
     API_PREFIX: str = "/api/v1"
@@ -35,10 +36,50 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_IMAGE_TYPES: List[str] = ["image/jpeg", "image/png", "image/jpg"]
+    IMAGE_STORAGE_MAX_SIDE: int = 1024  # stored person images are JPEGs capped to this longest side
+    IMAGE_STORAGE_JPEG_QUALITY: int = 85
+    BULK_ENROLL_COPY_CHUNK: int = 500  # people written per COPY during bulk enrollment
+    
+    # Attendance Storage Settings
+    ATTENDANCE_PARTITION_MONTHS_AHEAD: int = 3  # monthly partitions created ahead at startup
+    ATTENDANCE_RETENTION_MONTHS: int = 24  # months kept online by database/archive_attendance.py
     
     # Face Recognition Settings
     FACE_DETECTION_MODEL: str = "hog"  # or "cnn" for better accuracy but slower
     FACE_RECOGNITION_TOLERANCE: float = 0.6
+    DETECTION_MAX_SIDE: int = 800  # detect faces on a copy downscaled to this longest side, 0 = full resolution
+    # Face processing worker processes per uvicorn worker, 0 = run inline; with
+    # `--workers N` set this to about cpu_count / N so the pools do not oversubscribe the cores
+    INFERENCE_WORKERS: int = os.cpu_count() or 1
+    MODEL_WARMUP: bool = True  # load the dlib models at startup instead of on the first request
+    
+    # Recognition Batching Settings
+    RECOGNITION_BATCH_WINDOW_MS: float = 10.0  # collect concurrent requests for this long, 0 = no batching
+    RECOGNITION_BATCH_MAX_SIZE: int = 16
+    RECOGNITION_BATCH_MAX_WAIT_MS: float = 25.0  # longest any request may sit in the queue before dispatch
+    
+    # Recognition Cache Settings
+    RECOGNITION_CACHE_SIZE: int = 1024  # cached results per key type, 0 = no cache
+    RECOGNITION_CACHE_TTL_SECONDS: float = 60.0
+    RECOGNITION_CACHE_MAX_HAMMING: int = 2  # face-crop hashes this many bits apart propose a cached match (confirmed by encoding)
+    
+    # Stream Tracking Settings
+    FACE_TRACKING_REVERIFY_SECONDS: float = 2.0  # re-encode tracked faces this often, 0 = encode every streamed frame
+    FACE_TRACKING_DETECT_SECONDS: float = 0.5  # tracked streams still detect this often to notice new faces, 0 = every frame
+    FACE_TRACKING_MAX_SIDE: int = 320  # frames are downscaled to this longest side for template tracking
+    FACE_TRACKING_MIN_SCORE: float = 0.7  # template match score below which a track is lost
+    MOTION_GATE_MIN_CHANGE: float = 0.01  # fraction of pixels that must change before detection runs, 0 = no gate
+    MOTION_GATE_PIXEL_DELTA: int = 25  # grey-level difference that counts a pixel as changed
+    MOTION_GATE_MAX_SIDE: int = 64  # frames are compared at this longest side
+    
+    # Gallery Search Settings
+    GALLERY_SEARCH_BACKEND: str = "exact"  # "ivf" for approximate search, "pgvector" to search inside Postgres
+    GALLERY_IVF_NLIST: int = 0  # 0 = choose from gallery size (~4 * sqrt(N))
+    GALLERY_IVF_NPROBE: int = 8
+    GALLERY_IVF_MIN_SIZE: int = 5000  # below this the IVF backend scans exactly
+    GALLERY_INDEX_PATH: str = "./data/gallery_ivf.npz"
+    GALLERY_TEMPLATE_MODE: str = "all"  # "centroid" stores one averaged encoding per person
+    GALLERY_TEMPLATE_REDUCTION: str = "min"  # "mean" averages distances over a person's templates
 
 
 # Create global settings instance
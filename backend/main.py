@@ -1,23 +1,61 @@
 """
 Face Recognition Attendance System - FastAPI Application
 """
+import logging
+
+from psycopg import errors
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
 from backend.config import settings
-from backend.api.routes import persons, face_recognition, attendance
-from database.db import DatabaseManager
+from backend.api.routes import persons, face_recognition, attendance, stream
+from backend.services import gallery_index, recognition_batcher, InferencePool
+from database.db import DatabaseManager, get_db_connection
+from database.repositories import attendance_presence
+from database.repositories.attendance_repository import AttendanceRepository
+from backend.utils.metrics import registry
+
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle - database connections and cleanup"""
     DatabaseManager.initialize_pool()
-    print(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} - Database: {settings.DB_NAME}")
+    InferencePool.initialize(settings.INFERENCE_WORKERS, settings.FACE_DETECTION_MODEL, warm=settings.MODEL_WARMUP)
+    logger.info("%s v%s - Database: %s", settings.APP_NAME, settings.APP_VERSION, settings.DB_NAME)
+    if settings.MODEL_WARMUP:
+        reports = InferencePool.warm(settings.FACE_DETECTION_MODEL)
+        loaded = [model for model in reports[0]["models"] if model["loaded"]]
+        logger.info("Face models ready in %d process(es): %s", len(reports), ", ".join(
+            f"{model['name']} {model['load_seconds'] * 1000:.0f} ms" for model in loaded
+        ))
+    with get_db_connection() as conn:
+        try:
+            AttendanceRepository(conn).ensure_partitions(settings.ATTENDANCE_PARTITION_MONTHS_AHEAD)
+        except errors.UndefinedFunction:
+            logger.warning("Attendance is not partitioned yet; run database/run_migration.py to apply the pending migrations")
+        present_count = attendance_presence.warm(conn)
+    logger.info("Attendance presence loaded: %d marked today", present_count)
+    if settings.GALLERY_SEARCH_BACKEND != "pgvector":
+        with get_db_connection() as conn:
+            gallery_size = gallery_index.load(conn)
+        gallery_index.start_sync()
+        logger.info("Gallery index loaded: %d face encodings", gallery_size)
+        if settings.RECOGNITION_BATCH_WINDOW_MS > 0:
+            recognition_batcher.start()
     yield
+    recognition_batcher.stop()
+    gallery_index.stop_sync()
+    InferencePool.shutdown()
     DatabaseManager.close_all_connections()
-    print("👋 Shutdown complete")
+    logger.info("Shutdown complete")
 
 
 app = FastAPI(
@@ -39,6 +77,7 @@ app.add_middleware(
 app.include_router(persons.router, prefix=settings.API_PREFIX)
 app.include_router(face_recognition.router, prefix=settings.API_PREFIX)
 app.include_router(attendance.router, prefix=settings.API_PREFIX)
+app.include_router(stream.router, prefix=settings.API_PREFIX)
 
 
 @app.get("/")
@@ -55,6 +94,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=settings.DEBUG)
\ No newline at end of file
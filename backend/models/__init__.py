@@ -2,12 +2,22 @@ from .schemas import (
     PersonCreate,
     PersonResponse,
     PersonWithEncodingCreate,
+    PersonEncodingsResponse,
     UploadImageResponse,
     FaceRecognitionRequest,
     FaceRecognitionResponse,
+    FaceMatch,
+    MultiFaceRecognitionResponse,
+    BatchingStatsResponse,
+    RecognitionCacheStatsResponse,
+    FaceModelStats,
+    InferenceWorkerStats,
+    StreamStatsResponse,
     AttendanceRecord,
     AttendanceMarkRequest,
     AttendanceMarkResponse,
+    FaceAttendanceResult,
+    MultiFaceAttendanceResponse,
     ErrorResponse
 )
 
@@ -15,11 +25,21 @@ __all__ = [
     "PersonCreate",
     "PersonResponse",
     "PersonWithEncodingCreate",
+    "PersonEncodingsResponse",
     "UploadImageResponse",
     "FaceRecognitionRequest",
     "FaceRecognitionResponse",
+    "FaceMatch",
+    "MultiFaceRecognitionResponse",
+    "BatchingStatsResponse",
+    "RecognitionCacheStatsResponse",
+    "FaceModelStats",
+    "InferenceWorkerStats",
+    "StreamStatsResponse",
     "AttendanceRecord",
     "AttendanceMarkRequest",
     "AttendanceMarkResponse",
+    "FaceAttendanceResult",
+    "MultiFaceAttendanceResponse",
     "ErrorResponse"
 ]
@@ -2,7 +2,7 @@
 Pydantic models for request/response validation
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import Optional, List, Tuple
 from datetime import datetime
 from uuid import UUID
 
@@ -39,6 +39,14 @@ class PersonWithEncodingCreate(BaseModel):
     # Image will be uploaded as multipart form data
 
 
+class PersonEncodingsResponse(BaseModel):
+    """Response model for adding face templates to a person"""
+    person_id: UUID
+    added: int
+    template_count: int
+    errors: List[str] = []
+
+
 class UploadImageResponse(BaseModel):
     """Response model for image upload"""
     message: str
@@ -63,6 +71,70 @@ class FaceRecognitionResponse(BaseModel):
     message: str
 
 
+class FaceMatch(BaseModel):
+    """One detected face and who it was recognized as"""
+    location: Tuple[int, int, int, int]  # top, right, bottom, left in image pixels
+    person_id: Optional[UUID] = None
+    full_name: Optional[str] = None
+    confidence: Optional[float] = None
+
+
+class MultiFaceRecognitionResponse(BaseModel):
+    """Response model for recognizing every face in an image"""
+    success: bool
+    faces: List[FaceMatch] = []
+    message: str
+
+
+class BatchingStatsResponse(BaseModel):
+    """Response model for recognition batching metrics"""
+    enabled: bool
+    window_ms: float
+    batch_size_limit: int
+    wait_limit_ms: float
+    batches: int
+    items: int
+    mean_batch_size: float
+    max_batch_size: int
+    mean_wait_ms: float
+    max_wait_ms: float
+
+
+class RecognitionCacheStatsResponse(BaseModel):
+    """Response model for recognition cache metrics"""
+    enabled: bool
+    max_entries: int
+    ttl_seconds: float
+    entries: int
+    content_hits: int
+    face_hits: int
+    misses: int
+    hit_ratio: float
+
+
+class FaceModelStats(BaseModel):
+    """Load state, time and memory of one dlib model in the inference process"""
+    name: str
+    loaded: bool
+    file_mb: float
+    load_seconds: Optional[float] = None
+    memory_mb: Optional[float] = None
+
+
+class InferenceWorkerStats(BaseModel):
+    """dlib models of one inference worker process"""
+    pid: int
+    models: List[FaceModelStats]
+
+
+class StreamStatsResponse(BaseModel):
+    """Response model for streaming motion-gate metrics"""
+    motion_gate_enabled: bool
+    frames: int
+    skipped: int
+    skip_ratio: float
+
+
 class AttendanceRecord(BaseModel):
     """Model for attendance record"""
     id: UUID
@@ -89,6 +161,20 @@ class AttendanceMarkResponse(BaseModel):
     message: str
 
 
+class FaceAttendanceResult(FaceMatch):
+    """Attendance outcome for one detected face"""
+    status: str  # "marked", "already_marked", "unknown" or "error"
+    timestamp: Optional[datetime] = None
+
+
+class MultiFaceAttendanceResponse(BaseModel):
+    """Response model for marking attendance for every face in an image"""
+    success: bool
+    marked_count: int
+    faces: List[FaceAttendanceResult] = []
+    message: str
+
+
 class ErrorResponse(BaseModel):
     """Standard error response"""
     error: str
@@ -1,5 +1,25 @@
 from .face_recognition_service import FaceRecognitionService
 from .person_service import PersonService
 from .attendance_service import AttendanceService
+from .gallery_index import GalleryIndex, gallery_index
+from .inference_pool import InferencePool
+from .recognition_batcher import RecognitionBatcher, recognition_batcher
+from .recognition_cache import RecognitionCache, recognition_cache
+from .face_tracker import FaceTracker
+from .motion_gate import MotionGate, motion_gate_stats
 
-__all__ = ["FaceRecognitionService", "PersonService", "AttendanceService"]
+__all__ = [
+    "FaceRecognitionService",
+    "PersonService",
+    "AttendanceService",
+    "GalleryIndex",
+    "gallery_index",
+    "InferencePool",
+    "RecognitionBatcher",
+    "recognition_batcher",
+    "RecognitionCache",
+    "recognition_cache",
+    "FaceTracker",
+    "MotionGate",
+    "motion_gate_stats"
+]
@@ -1,13 +1,19 @@
 """
 Attendance service - handles attendance tracking business logic
 """
-from typing import List, Dict, Any, Optional
+import csv
+import io
+import zlib
+from typing import List, Dict, Any, Optional, Union, Iterator
 from uuid import UUID
 from datetime import datetime, date
 
 from database.repositories.attendance_repository import AttendanceRepository
 from backend.services.face_recognition_service import FaceRecognitionService
 from database.repositories import PersonRepository
+from backend.utils.image_utils import DecodedImage
+
+CSV_CHUNK_SIZE = 64 * 1024
 
 
 class AttendanceService:
@@ -19,13 +25,13 @@ class AttendanceService:
         self.face_service = FaceRecognitionService(conn)
         self.person_repo = PersonRepository(conn)
     
-    def mark_attendance_by_face(self, image_bytes: bytes) -> Dict[str, Any]:
+    def mark_attendance_by_face(self, image: Union[bytes, DecodedImage]) -> Dict[str, Any]:
         """
         Mark attendance by recognizing face from image
         Returns dict with success status, person info, and message
         """
         # Recognize face
-        recognition_result = self.face_service.recognize_face(image_bytes)
+        recognition_result = self.face_service.recognize_face(image)
         
         if not recognition_result:
             return {
@@ -38,10 +44,30 @@ class AttendanceService:
             }
         
         person_id, full_name, confidence = recognition_result
-        
-        # Check if already marked today
+        return self.mark_recognized_person(person_id, full_name, confidence)
+    
+    def mark_recognized_person(self, person_id: UUID, full_name: str, confidence: float) -> Dict[str, Any]:
+        """
+        Mark attendance for a person already identified from a face
+        Returns the same dict as mark_attendance_by_face
+        """
+        # Check if already marked today (answered in memory)
         already_marked = self.attendance_repo.check_already_marked_today(person_id)
         
+        if not already_marked:
+            try:
+                # Insert unless another request or worker marked them first
+                record, already_marked = self.attendance_repo.mark_attendance_if_absent(person_id)
+            except Exception as e:
+                return {
+                    "success": False,
+                    "message": f"Failed to mark attendance: {str(e)}",
+                    "person_id": person_id,
+                    "full_name": full_name,
+                    "timestamp": None,
+                    "already_marked": False
+                }
+        
         if already_marked:
             return {
                 "success": False,
@@ -53,30 +79,63 @@ class AttendanceService:
                 "confidence": confidence
             }
         
+        return {
+            "success": True,
+            "message": f"Attendance marked successfully for {full_name}",
+            "person_id": person_id,
+            "full_name": full_name,
+            "timestamp": record["timestamp"],
+            "already_marked": False,
+            "confidence": confidence,
+            "attendance_id": record["id"]
+        }
+    
+    def mark_attendance_by_faces(self, image: Union[bytes, DecodedImage]) -> Dict[str, Any]:
+        """
+        Recognize every face in an image and mark attendance for all recognized people
+        in one batched insert
+        Returns dict with success status, marked count, per-face results, and message
+        """
+        faces = self.face_service.recognize_faces(image)
+        
+        if faces is None:
+            return {"success": False, "message": "Could not read image", "marked_count": 0, "faces": []}
+        
+        recognized = [face["person_id"] for face in faces if face["person_id"] is not None]
+        
         try:
-            # Mark attendance
-            attendance_id = self.attendance_repo.mark_attendance(person_id)
-            
-            return {
-                "success": True,
-                "message": f"Attendance marked successfully for {full_name}",
-                "person_id": person_id,
-                "full_name": full_name,
-                "timestamp": datetime.now(),
-                "already_marked": False,
-                "confidence": confidence,
-                "attendance_id": attendance_id
-            }
-            
+            rows = self.attendance_repo.mark_attendance_many(recognized) if recognized else []
+            marked = {row["person_id"]: row for row in rows}
         except Exception as e:
+            for face in faces:
+                face.update(status="unknown" if face["person_id"] is None else "error", timestamp=None)
             return {
                 "success": False,
                 "message": f"Failed to mark attendance: {str(e)}",
-                "person_id": person_id,
-                "full_name": full_name,
-                "timestamp": None,
-                "already_marked": False
+                "marked_count": 0,
+                "faces": faces
             }
+        
+        for face in faces:
+            person_id = face["person_id"]
+            if person_id is None:
+                face.update(status="unknown", timestamp=None)
+            elif person_id in marked:
+                # Only the first face matched to a person claims the new record
+                face.update(status="marked", timestamp=marked.pop(person_id)["timestamp"])
+            else:
+                face.update(status="already_marked", timestamp=None)
+        
+        marked_count = sum(face["status"] == "marked" for face in faces)
+        return {
+            "success": marked_count > 0,
+            "message": (
+                f"Attendance marked for {marked_count} of {len(faces)} detected faces "
+                f"({len(set(recognized))} recognized)"
+            ),
+            "marked_count": marked_count,
+            "faces": faces
+        }
     
     def mark_attendance_manual(self, person_id: UUID) -> Dict[str, Any]:
         """
@@ -96,6 +155,17 @@ class AttendanceService:
         # Check if already marked
         already_marked = self.attendance_repo.check_already_marked_today(person_id)
         
+        if not already_marked:
+            try:
+                record, already_marked = self.attendance_repo.mark_attendance_if_absent(person_id)
+            except Exception as e:
+                return {
+                    "success": False,
+                    "message": f"Failed to mark attendance: {str(e)}",
+                    "person_id": person_id,
+                    "full_name": person['full_name']
+                }
+        
         if already_marked:
             return {
                 "success": False,
@@ -105,25 +175,14 @@ class AttendanceService:
                 "already_marked": True
             }
         
-        try:
-            attendance_id = self.attendance_repo.mark_attendance(person_id)
-            
-            return {
-                "success": True,
-                "message": f"Attendance marked successfully for {person['full_name']}",
-                "person_id": person_id,
-                "full_name": person['full_name'],
-                "timestamp": datetime.now(),
-                "attendance_id": attendance_id
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to mark attendance: {str(e)}",
-                "person_id": person_id,
-                "full_name": person['full_name']
-            }
+        return {
+            "success": True,
+            "message": f"Attendance marked successfully for {person['full_name']}",
+            "person_id": person_id,
+            "full_name": person['full_name'],
+            "timestamp": record["timestamp"],
+            "attendance_id": record["id"]
+        }
     
     def get_today_attendance(self) -> List[Dict[str, Any]]:
         """Get all attendance records for today"""
@@ -142,36 +201,40 @@ class AttendanceService:
         """Get attendance records for a specific person"""
         return self.attendance_repo.get_attendance_by_person(person_id, start_date, end_date)
     
-    def export_attendance_csv(self, records: List[Dict[str, Any]]) -> str:
+    def export_attendance_csv(
+        self,
+        start_date: date,
+        end_date: date,
+        compress: bool = False
+    ) -> Iterator[bytes]:
         """
-        Export attendance records to CSV format
-        Returns CSV string
+        Export attendance records between two dates (inclusive) as CSV
+        Yields encoded chunks (gzip-compressed if requested) while rows are read
+        from the database, so memory use does not grow with the date range
         """
-        if not records:
-            return "full_name,timestamp\n"
-        
-        csv_lines = ["full_name,timestamp"]
-        
-        for record in records:
-            full_name = record.get('full_name', 'Unknown')
-            # Escape commas in names
-            if ',' in full_name:
-                full_name = f'"{full_name}"'
-            
-            timestamp = record.get('timestamp', '')
-            # Convert datetime object to readable string
-            if timestamp:
-                if isinstance(timestamp, datetime):
-                    timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                elif isinstance(timestamp, str):
-                    # If already a string, try to parse and reformat
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        timestamp = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    except:
-                        # If parsing fails, keep the original string
-                        pass
-            
-            csv_lines.append(f"{full_name},{timestamp}")
-        
-        return "\n".join(csv_lines)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+        
+        def flush() -> bytes:
+            data = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(data) if compressor else data
+        
+        writer.writerow(["full_name", "timestamp"])
+        for full_name, timestamp in self.attendance_repo.iter_attendance_range(start_date, end_date):
+            writer.writerow([
+                full_name or "Unknown",
+                timestamp.strftime("%Y-%m-%d %H:%M:%S") if timestamp else ""
+            ])
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
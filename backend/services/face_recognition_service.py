@@ -1,15 +1,29 @@
 """
 Face recognition service - handles all face recognition business logic
 """
-import face_recognition
+import logging
 import numpy as np
-import json
-from typing import Optional, Tuple, List, Dict, Any
-import cv2
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import Optional, Tuple, List, Dict, Any, Union, Iterable, Iterator
 from uuid import UUID
 
 from database.repositories import EncodingRepository, PersonRepository
 from backend.config import settings
+from backend.services.gallery_index import gallery_index
+from backend.services.inference_pool import InferencePool, analyze_image
+from backend.services.recognition_batcher import recognition_batcher
+from backend.services.recognition_cache import recognition_cache, content_digest
+from backend.utils.image_utils import DecodedImage, as_decoded_image
+from backend.utils.metrics import registry, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+recognition_results = registry.counter(
+    "recognition_results_total",
+    "Recognized faces by result: match, no_match, no_face or error "
+    "(repeats answered from the recognition cache without a match count as no_match)",
+    ("result",)
+)
 
 
 class FaceRecognitionService:
@@ -21,202 +35,369 @@ class FaceRecognitionService:
         self.person_repo = PersonRepository(conn)
         self.tolerance = settings.FACE_RECOGNITION_TOLERANCE
         self.model = settings.FACE_DETECTION_MODEL
+        self.detection_max_side = settings.DETECTION_MAX_SIDE
+        self.storage_max_side = settings.IMAGE_STORAGE_MAX_SIDE
+        self.storage_quality = settings.IMAGE_STORAGE_JPEG_QUALITY
+    
+    def prepare_image(
+        self,
+        image: Union[bytes, DecodedImage],
+        encode: bool = True,
+        for_storage: bool = False
+    ) -> DecodedImage:
+        """
+        Run detection (and encoding / storage JPEG) for an image in the inference pool
+        Results are cached on the returned DecodedImage, so repeated calls are free
+        """
+        image = as_decoded_image(image, self.detection_max_side)
+        
+        if image.needs_analysis(self.model, encode, for_storage):
+            results = InferencePool.run(
+                analyze_image,
+                image,
+                self.model,
+                encode,
+                self.storage_max_side if for_storage else 0,
+                self.storage_quality
+            )
+            image.update_cache(results)
+        
+        return image
     
-    def extract_face_encoding(self, image_bytes: bytes) -> Optional[str]:
+    def prepare_images(
+        self,
+        images: Iterable[Tuple[Any, Union[bytes, DecodedImage]]],
+        for_storage: bool = False
+    ) -> Iterator[Tuple[Any, DecodedImage, Optional[Exception]]]:
+        """
+        Encode many (key, image) pairs in parallel across the inference pool
+        Yields (key, image, error) in completion order; only a couple of images per
+        worker are submitted at a time, so a large upload is never held in memory at once
+        """
+        max_in_flight = max(2, 2 * InferencePool.worker_count())
+        source = iter(images)
+        pending = {}
+        exhausted = False
+        
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    key, image = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                image = as_decoded_image(image, self.detection_max_side)
+                future = InferencePool.submit(
+                    analyze_image,
+                    image,
+                    self.model,
+                    True,
+                    self.storage_max_side if for_storage else 0,
+                    self.storage_quality
+                )
+                pending[future] = (key, image)
+            
+            if not pending:
+                break
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, image = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    image.update_cache(future.result())
+                yield key, image, error
+    
+    def storage_image(self, image: DecodedImage) -> bytes:
+        """Size-capped JPEG to store for an image prepared with for_storage=True"""
+        return image.storage_jpeg(self.storage_max_side, self.storage_quality)
+    
+    def extract_face_encoding(self, image: Union[bytes, DecodedImage]) -> Optional[np.ndarray]:
         """
         Extract face encoding from image bytes
-        Returns JSON string of encoding or None if no face detected
+        Returns float32 encoding vector or None if no face detected
         """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img_bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode, detect and encode in the inference pool
+            image = self.prepare_image(image)
             
-            if img_bgr is None:
-                print("Error: Could not decode image")
+            if image.decode_failed:
+                logger.debug("Could not decode image")
                 return None
             
-            # Convert to RGB
-            img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-            
-            # First detect face locations
-            face_locations = face_recognition.face_locations(img_rgb, model=self.model)
-            
-            if not face_locations:
-                print("Error: No face detected in image")
+            if not image.face_locations(self.model):
+                logger.debug("No face detected in image")
                 return None
             
-            # Get face encodings for detected faces
-            encodings = face_recognition.face_encodings(
-                img_rgb,
-                known_face_locations=face_locations,
-                model="large"  # Use large model for better accuracy
-            )
-            
+            encodings = image.encodings(self.model)
             if not encodings:
-                print("Error: Could not extract face encoding")
+                logger.debug("Could not extract face encoding")
                 return None
             
             # Take first face found
-            encoding = encodings[0]
+            return encodings[0]
             
-            # Convert to JSON string
-            encoding_json = json.dumps(encoding.tolist())
+        except Exception:
+            logger.exception("Error extracting face encoding")
+            return None
+    
+    def _search_gallery(self, encoding: np.ndarray) -> Optional[Tuple[UUID, str, float]]:
+        """
+        Find the closest enrolled person within tolerance
+        Returns tuple of (person_id, full_name, distance) or None
+        """
+        if settings.GALLERY_SEARCH_BACKEND == "pgvector":
+            with stage_seconds.time(stage="search"):
+                nearest = self.encoding_repo.find_nearest(
+                    encoding, 1, self.tolerance, settings.GALLERY_TEMPLATE_REDUCTION
+                )
+            if not nearest:
+                return None
+            return nearest[0]['person_id'], nearest[0]['full_name'], nearest[0]['distance']
+        
+        # Load the gallery on first use
+        if not gallery_index.is_loaded:
+            gallery_index.load(self.conn)
+        
+        # Single vectorized comparison against every stored face
+        return gallery_index.search(encoding, self.tolerance)
+    
+    def _search_gallery_batch(self, encodings: List[np.ndarray]) -> List[Optional[Tuple[UUID, str, float]]]:
+        """Match several encodings at once; one (person_id, full_name, distance) or None each"""
+        if not encodings:
+            return []
+        
+        if settings.GALLERY_SEARCH_BACKEND == "pgvector":
+            return [self._search_gallery(encoding) for encoding in encodings]
+        
+        if not gallery_index.is_loaded:
+            gallery_index.load(self.conn)
+        
+        # One (faces x gallery) distance matrix for every face in the image
+        return gallery_index.search_batch(np.stack(encodings), self.tolerance)
+    
+    def recognize_faces(self, image: Union[bytes, DecodedImage]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Recognize every face in an image (group photos, classroom cameras)
+        Returns one dict per detected face with location (top, right, bottom, left),
+        person_id, full_name and confidence (None when unknown), or None if the
+        image cannot be decoded
+        """
+        try:
+            image = self.prepare_image(image)
             
-            return encoding_json
+            if image.decode_failed:
+                logger.debug("Could not decode image")
+                recognition_results.inc(result="no_face")
+                return None
             
-        except Exception as e:
-            print(f"Error extracting face encoding: {e}")
-            import traceback
-            traceback.print_exc()
+            locations = image.face_locations(self.model)
+            matches = self._search_gallery_batch(image.encodings(self.model))
+            
+            faces = []
+            for location, match in zip(locations, matches):
+                face = {"location": location, "person_id": None, "full_name": None, "confidence": None}
+                if match:
+                    person_id, full_name, distance = match
+                    face.update(person_id=person_id, full_name=full_name, confidence=1.0 - distance)
+                faces.append(face)
+                recognition_results.inc(result="match" if match else "no_match")
+            
+            if not faces:
+                recognition_results.inc(result="no_face")
+            logger.debug("%d of %d faces recognized", sum(face['person_id'] is not None for face in faces), len(faces))
+            return faces
+            
+        except Exception:
+            logger.exception("Error recognizing faces")
+            recognition_results.inc(result="error")
             return None
     
-    def recognize_face(self, image_bytes: bytes) -> Optional[Tuple[UUID, str, float]]:
+    def recognize_face(self, image: Union[bytes, DecodedImage]) -> Optional[Tuple[UUID, str, float]]:
         """
         Recognize a face from image bytes
         Returns tuple of (person_id, full_name, confidence) or None if no match
         """
         try:
-            # Extract encoding from input image
-            input_encoding_json = self.extract_face_encoding(image_bytes)
-            
-            if not input_encoding_json:
-                print("Warning: Could not extract encoding from input image")
-                return None
+            image = as_decoded_image(image, self.detection_max_side)
             
-            input_encoding = np.array(json.loads(input_encoding_json))
-            
-            # Get all stored encodings
-            all_encodings = self.encoding_repo.get_all_with_person_info()
-            
-            if not all_encodings:
-                print("Warning: No encodings found in database")
-                return None
+            if recognition_cache.enabled and settings.GALLERY_SEARCH_BACKEND != "pgvector":
+                match = self._match_face_cached(image)
+            else:
+                match = self._match_face(image)
             
-            print(f"Comparing against {len(all_encodings)} stored faces...")
-            
-            # Compare with all stored encodings
-            best_match = None
-            best_distance = float('inf')
-            
-            for record in all_encodings:
-                # face_encoding is already a list from JSONB, no need to parse
-                stored_encoding_data = record['face_encoding']
-                if isinstance(stored_encoding_data, str):
-                    stored_encoding = np.array(json.loads(stored_encoding_data))
-                else:
-                    stored_encoding = np.array(stored_encoding_data)
-                
-                # Calculate face distance
-                distance = face_recognition.face_distance([stored_encoding], input_encoding)[0]
-                
-                print(f"Distance to {record['full_name']}: {distance:.4f} (tolerance: {self.tolerance})")
-                
-                if distance < best_distance and distance <= self.tolerance:
-                    best_distance = distance
-                    best_match = record
-            
-            if best_match:
-                confidence = 1.0 - best_distance  # Convert distance to confidence
-                print(f"✅ Match found: {best_match['full_name']} (confidence: {confidence:.2%})")
-                return (
-                    best_match['person_id'],
-                    best_match['full_name'],
-                    confidence
-                )
+            if match:
+                person_id, full_name, distance = match
+                confidence = 1.0 - distance  # Convert distance to confidence
+                recognition_results.inc(result="match")
+                logger.debug("Match found: %s (confidence: %.2f%%)", full_name, 100 * confidence)
+                return person_id, full_name, confidence
             
-            print(f"❌ No match found within tolerance {self.tolerance}")
+            recognition_results.inc(result="no_face" if self._found_no_face(image) else "no_match")
+            logger.debug("No match found within tolerance %s", self.tolerance)
             return None
             
-        except Exception as e:
-            print(f"Error recognizing face: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error recognizing face")
+            recognition_results.inc(result="error")
+            return None
+    
+    def _found_no_face(self, image: DecodedImage) -> bool:
+        """True if the image was analysed here and holds no detectable face"""
+        if image.decode_failed:
+            return True
+        if image.needs_analysis(self.model, encode=False):
+            # Answered from the recognition cache without detection
+            return False
+        return not image.face_locations(self.model)
+    
+    def _match_face(self, image: DecodedImage) -> Optional[Tuple[UUID, str, float]]:
+        """Encode the first face in an image and search the gallery for it"""
+        if recognition_batcher.is_running and settings.GALLERY_SEARCH_BACKEND != "pgvector":
+            # Encode and match together with other requests arriving now
+            return recognition_batcher.recognize(image)
+        
+        # Extract encoding from input image
+        input_encoding = self.extract_face_encoding(image)
+        
+        if input_encoding is None:
+            logger.debug("Could not extract encoding from input image")
+            return None
+        
+        return self._search_gallery(input_encoding)
+    
+    def _match_face_cached(self, image: DecodedImage) -> Optional[Tuple[UUID, str, float]]:
+        """
+        _match_face behind the recognition cache
+        Exact repeats are answered before decoding. Otherwise the image is
+        detected and encoded in one inference round trip; a face-hash hit then
+        only names a candidate, accepted if the fresh encoding is within
+        tolerance of that person's templates, so a hash collision costs a
+        gallery search rather than a wrong identity
+        """
+        version = gallery_index.version
+        digest = content_digest(image.image_bytes)
+        hit, match = recognition_cache.get_by_content(digest)
+        if hit:
+            return match
+        
+        image = self.prepare_image(image)
+        face_hashes = image.face_hashes(self.model)
+        face_hash = face_hashes[0] if face_hashes else None
+        
+        if face_hash is not None:
+            candidate = recognition_cache.get_by_face(face_hash)
+            match = self._confirm_candidate(candidate, image.encodings(self.model)[0])
+            if match:
+                recognition_cache.count_face_hit()
+                recognition_cache.put(digest, None, match, version)
+                return match
+        
+        recognition_cache.count_miss()
+        # Already encoded, so this is only the gallery search
+        match = self._match_face(image)
+        recognition_cache.put(digest, face_hash, match, version)
+        return match
+    
+    def _confirm_candidate(
+        self,
+        candidate: Optional[Tuple[UUID, str, float]],
+        encoding: np.ndarray
+    ) -> Optional[Tuple[UUID, str, float]]:
+        """The candidate with its distance to encoding, or None if it is not within tolerance"""
+        if candidate is None:
             return None
+        person_id, full_name, _ = candidate
+        templates = gallery_index.person_templates(person_id)
+        if templates is None:
+            return None
+        distance = gallery_index.identity_distance(templates, encoding)
+        if distance > self.tolerance:
+            return None
+        return person_id, full_name, distance
     
-    def verify_face(self, image_bytes: bytes, person_id: UUID) -> Tuple[bool, float]:
+    def verify_face(self, image: Union[bytes, DecodedImage], person_id: UUID) -> Tuple[bool, float]:
         """
         Verify if the face in image matches a specific person
         Returns tuple of (is_match, confidence)
         """
         try:
             # Extract encoding from input image
-            input_encoding_json = self.extract_face_encoding(image_bytes)
+            input_encoding = self.extract_face_encoding(image)
             
-            if not input_encoding_json:
+            if input_encoding is None:
                 return False, 0.0
             
-            input_encoding = np.array(json.loads(input_encoding_json))
+            # Compare against every stored template of the person
+            stored_records = self.encoding_repo.get_all_by_person_id(person_id)
             
-            # Get stored encoding for person
-            stored_record = self.encoding_repo.get_by_person_id(person_id)
-            
-            if not stored_record:
+            if not stored_records:
                 return False, 0.0
             
-            # face_encoding is already a list from JSONB, no need to parse
-            stored_encoding_data = stored_record['face_encoding']
-            if isinstance(stored_encoding_data, str):
-                stored_encoding = np.array(json.loads(stored_encoding_data))
-            else:
-                stored_encoding = np.array(stored_encoding_data)
-            
-            # Compare encodings
-            distance = face_recognition.face_distance([stored_encoding], input_encoding)[0]
+            templates = np.stack([record['face_encoding'] for record in stored_records])
+            distance = gallery_index.identity_distance(templates, input_encoding)
             
             is_match = distance <= self.tolerance
             confidence = 1.0 - distance
             
             return is_match, confidence
             
-        except Exception as e:
-            print(f"Error verifying face: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error verifying face")
             return False, 0.0
     
-    def detect_faces_count(self, image_bytes: bytes) -> int:
+    def detect_faces(self, image: Union[bytes, DecodedImage]) -> Optional[List[Tuple[int, int, int, int]]]:
         """
-        Count number of faces in an image
+        Locate every face in an image without encoding them
+        Returns (top, right, bottom, left) boxes, or None if the image cannot be decoded
         """
         try:
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img_bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img_bgr is None:
-                return 0
-            
-            img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(img_rgb, model=self.model)
+            image = self.prepare_image(image, encode=False)
+            locations = image.face_locations(self.model)
+            return locations if image.is_valid else None
             
-            return len(face_locations)
+        except Exception:
+            logger.exception("Error detecting faces")
+            return None
+    
+    def detect_faces_count(self, image: Union[bytes, DecodedImage]) -> int:
+        """
+        Count number of faces in an image
+        """
+        try:
+            image = self.prepare_image(image, encode=False)
+            return len(image.face_locations(self.model))
             
-        except Exception as e:
-            print(f"Error detecting faces: {e}")
+        except Exception:
+            logger.exception("Error detecting faces")
             return 0
     
-    def process_and_store_face(self, image_bytes: bytes, person_id: UUID) -> bool:
+    def process_and_store_face(self, image: Union[bytes, DecodedImage], person_id: UUID) -> bool:
         """
         Extract face encoding from image and store it along with the image
         Returns True on success, False on failure
         """
         try:
-            # Extract face encoding
-            encoding_json = self.extract_face_encoding(image_bytes)
+            # Encode the face and build the storage JPEG in one pool round-trip
+            image = self.prepare_image(image, for_storage=True)
+            encoding = self.extract_face_encoding(image)
             
-            if not encoding_json:
+            if encoding is None:
                 return False
             
             # Store encoding
-            self.encoding_repo.create(person_id, encoding_json)
+            self.encoding_repo.create(person_id, encoding)
+            
+            # Swap the person's rows in the gallery for what is now stored
+            gallery_index.refresh_person(self.conn, person_id)
             
-            # Store image
+            # Store a size-capped JPEG rather than the original upload
             from database.repositories import ImageRepository
             image_repo = ImageRepository(self.conn)
-            image_repo.create(person_id, image_bytes)
+            image_repo.create(person_id, self.storage_image(image))
             
             return True
             
-        except Exception as e:
-            print(f"Error processing and storing face: {e}")
+        except Exception:
+            logger.exception("Error processing and storing face")
             return False
@@ -0,0 +1,254 @@
+"""
+Face tracker - follows identified faces across consecutive frames of one stream
+
+A camera session usually shows the same person for several seconds. After a
+frame has been detected, encoded and matched, each face is kept as a track
+holding a small grayscale template. Following frames only relocate those
+templates near their last position (cv2.matchTemplate on a downscaled copy),
+which costs a fraction of a millisecond instead of detection plus a 128-d
+encoding. Frames are only followed while every face in view is identified;
+an unknown face is re-encoded on every frame. The full pipeline runs again
+when a track is lost, its identity is due for re-verification, or the
+periodic detection pass finds a face that no track covers (someone walked
+in). New detections are associated with the previous tracks by box overlap
+(IoU) so track ids stay stable.
+"""
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple, List, Dict, Any, Callable
+from uuid import UUID
+
+import cv2
+import numpy as np
+
+from backend.config import settings
+from backend.utils.image_utils import decode_image_reduced
+
+Box = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+
+@dataclass
+class FaceTrack:
+    """One followed face; location is in full-resolution pixels"""
+    track_id: int
+    location: Box
+    person_id: Optional[UUID]
+    full_name: Optional[str]
+    confidence: Optional[float]
+    template: np.ndarray
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    union = (a[2] - a[0]) * (a[1] - a[3]) + (b[2] - b[0]) * (b[1] - b[3]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """
+    Per-session tracker for a stream of frames from one camera
+
+    Not thread-safe: a session feeds it one frame at a time.
+    """
+
+    # Templates smaller than this (in tracking pixels) are too weak to follow
+    MIN_TEMPLATE_SIDE = 8
+
+    def __init__(
+        self,
+        reverify_seconds: float,
+        detect_seconds: float = 0.5,
+        tracking_max_side: int = 320,
+        min_score: float = 0.7,
+        iou_threshold: float = 0.3,
+        search_margin: float = 0.5
+    ):
+        self.reverify_seconds = reverify_seconds
+        self.detect_seconds = detect_seconds
+        self.tracking_max_side = tracking_max_side
+        self.min_score = min_score
+        self.iou_threshold = iou_threshold
+        self.search_margin = search_margin
+
+        self._tracks: List[FaceTrack] = []
+        # False while a face in view is unknown or could not be given a template
+        self._following = False
+        self._verified_at = 0.0
+        self._detected_at = 0.0
+        self._next_track_id = 1
+        self.encoded_frames = 0
+        self.tracked_frames = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.reverify_seconds > 0
+
+    def update(
+        self,
+        image_bytes: bytes,
+        recognize: Callable[[bytes], Optional[List[Dict[str, Any]]]],
+        detect: Optional[Callable[[bytes], Optional[List[Box]]]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Locate and identify the faces in the next frame
+
+        Args:
+            image_bytes: Encoded frame
+            recognize: Full pipeline, e.g. FaceRecognitionService.recognize_faces
+            detect: Detection only, e.g. FaceRecognitionService.detect_faces; run on
+                followed frames every detect_seconds to notice new faces
+
+        Returns:
+            One dict per face (as returned by recognize, plus track_id and
+            tracked - False when the frame was encoded), or None if the frame
+            could not be read
+        """
+        if not self.enabled:
+            return self._recognize(image_bytes, None, 1.0, recognize)
+
+        gray, scale = self._tracking_frame(image_bytes)
+        if gray is None:
+            return None
+
+        now = time.monotonic()
+        if self._following and now - self._verified_at < self.reverify_seconds:
+            locations = [self._follow(track, gray, scale) for track in self._tracks]
+            if all(location is not None for location in locations) and not (
+                detect is not None
+                and now - self._detected_at >= self.detect_seconds
+                and self._has_new_face(image_bytes, locations, detect)
+            ):
+                for track, location in zip(self._tracks, locations):
+                    track.location = location
+                self.tracked_frames += 1
+                return [self._as_face(track) for track in self._tracks]
+
+        return self._recognize(image_bytes, gray, scale, recognize)
+
+    def reset(self):
+        self._tracks = []
+        self._following = False
+        self._verified_at = 0.0
+        self._detected_at = 0.0
+
+    def _has_new_face(
+        self,
+        image_bytes: bytes,
+        locations: List[Box],
+        detect: Callable[[bytes], Optional[List[Box]]]
+    ) -> bool:
+        """Detect faces in the frame; True if one is not covered by any followed track"""
+        detected = detect(image_bytes)
+        self._detected_at = time.monotonic()
+        if detected is None:
+            return True
+        return any(
+            max(box_iou(location, tuple(box)) for location in locations) < self.iou_threshold
+            for box in detected
+        )
+
+    def _recognize(
+        self,
+        image_bytes: bytes,
+        gray: Optional[np.ndarray],
+        scale: float,
+        recognize: Callable[[bytes], Optional[List[Dict[str, Any]]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        faces = recognize(image_bytes)
+        self.encoded_frames += 1
+        if faces is None:
+            self.reset()
+            return None
+
+        previous = list(self._tracks)
+        self._tracks = []
+        for face in faces:
+            location = tuple(face["location"])
+            # Keep the id of the previous track this detection overlaps most
+            best = max(previous, key=lambda track: box_iou(track.location, location), default=None)
+            if best is not None and box_iou(best.location, location) >= self.iou_threshold:
+                previous.remove(best)
+                track_id = best.track_id
+            else:
+                track_id = self._next_track_id
+                self._next_track_id += 1
+
+            face.update(track_id=track_id, tracked=False)
+            template = self._crop(gray, location, scale) if gray is not None else None
+            if template is not None:
+                self._tracks.append(FaceTrack(
+                    track_id, location, face["person_id"], face["full_name"], face["confidence"], template
+                ))
+
+        # Unknown faces, and faces that cannot be followed, force the full pipeline
+        # on the next frame; their tracks are only kept to carry the track ids over
+        self._following = (
+            bool(faces)
+            and len(self._tracks) == len(faces)
+            and all(face["person_id"] is not None for face in faces)
+        )
+        self._verified_at = self._detected_at = time.monotonic()
+        return faces
+
+    def _tracking_frame(self, image_bytes: bytes) -> Tuple[Optional[np.ndarray], float]:
+        img, scale = decode_image_reduced(image_bytes, self.tracking_max_side)
+        if img is None:
+            return None, 1.0
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), scale
+
+    def _crop(self, gray: np.ndarray, location: Box, scale: float) -> Optional[np.ndarray]:
+        top, right, bottom, left = (int(round(v / scale)) for v in location)
+        top, left = max(0, top), max(0, left)
+        bottom, right = min(gray.shape[0], bottom), min(gray.shape[1], right)
+        if bottom - top < self.MIN_TEMPLATE_SIDE or right - left < self.MIN_TEMPLATE_SIDE:
+            return None
+        return gray[top:bottom, left:right].copy()
+
+    def _follow(self, track: FaceTrack, gray: np.ndarray, scale: float) -> Optional[Box]:
+        """Find the track's template near its last position; None if it is lost"""
+        height, width = track.template.shape
+        top, right, bottom, left = (v / scale for v in track.location)
+        margin_y, margin_x = self.search_margin * height, self.search_margin * width
+
+        y0, x0 = max(0, int(top - margin_y)), max(0, int(left - margin_x))
+        y1 = min(gray.shape[0], int(bottom + margin_y) + 1)
+        x1 = min(gray.shape[1], int(right + margin_x) + 1)
+        if y1 - y0 < height or x1 - x0 < width:
+            return None
+
+        scores = cv2.matchTemplate(gray[y0:y1, x0:x1], track.template, cv2.TM_CCOEFF_NORMED)
+        _, best_score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if best_score < self.min_score:
+            return None
+
+        new_top, new_left = (y0 + dy) * scale, (x0 + dx) * scale
+        return (
+            int(round(new_top)),
+            int(round(new_left + width * scale)),
+            int(round(new_top + height * scale)),
+            int(round(new_left))
+        )
+
+    @staticmethod
+    def _as_face(track: FaceTrack) -> Dict[str, Any]:
+        return {
+            "location": track.location,
+            "person_id": track.person_id,
+            "full_name": track.full_name,
+            "confidence": track.confidence,
+            "track_id": track.track_id,
+            "tracked": True
+        }
+
+
+def tracker_from_settings() -> FaceTracker:
+    """Create a face tracker for one stream session"""
+    return FaceTracker(
+        reverify_seconds=settings.FACE_TRACKING_REVERIFY_SECONDS,
+        detect_seconds=settings.FACE_TRACKING_DETECT_SECONDS,
+        tracking_max_side=settings.FACE_TRACKING_MAX_SIDE,
+        min_score=settings.FACE_TRACKING_MIN_SCORE
+    )
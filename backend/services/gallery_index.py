@@ -0,0 +1,559 @@
+"""
+Gallery index - in-memory matrix of stored face encodings for vectorized matching
+"""
+import logging
+import threading
+import time
+from typing import Optional, Tuple, List, Dict, Any, Iterable
+from uuid import UUID
+
+import numpy as np
+
+from backend.config import settings
+from backend.services.search_backends import create_search_backend
+from backend.utils.metrics import registry, stage_seconds
+from database.repositories import EncodingRepository, GALLERY_CHANNEL
+from database.db import get_db_connection, get_connection, close_connection
+
+logger = logging.getLogger(__name__)
+
+ENCODING_DIM = 128
+
+_MIN_CAPACITY = 64
+_COMPACT_MIN_TOMBSTONES = 64
+_COMPACT_RATIO = 0.25
+
+TEMPLATE_MODES = ("all", "centroid")
+TEMPLATE_REDUCTIONS = ("min", "mean")
+
+
+def to_encoding_array(value: Any) -> np.ndarray:
+    """Convert an encoding into a contiguous float32 vector"""
+    return np.asarray(value, dtype=np.float32).reshape(ENCODING_DIM)
+
+
+def search_backend_from_settings():
+    """Create the gallery search backend configured in settings"""
+    if settings.GALLERY_SEARCH_BACKEND == "ivf":
+        return create_search_backend(
+            "ivf",
+            nlist=settings.GALLERY_IVF_NLIST,
+            nprobe=settings.GALLERY_IVF_NPROBE,
+            min_size=settings.GALLERY_IVF_MIN_SIZE,
+            index_path=settings.GALLERY_INDEX_PATH
+        )
+    if settings.GALLERY_SEARCH_BACKEND == "pgvector":
+        # Searches run in Postgres; the in-memory gallery is not loaded at all
+        return create_search_backend("exact")
+    return create_search_backend(settings.GALLERY_SEARCH_BACKEND)
+
+
+def _encoding_id_key(encoding_ids: Iterable[Any]) -> Tuple[str, ...]:
+    """Order-independent key of a person's stored encoding ids"""
+    return tuple(sorted(str(encoding_id) for encoding_id in encoding_ids))
+
+
+def _nearest_by_mean(sq_distances: np.ndarray, identities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Closest identity per query when an identity's distance is the mean over its rows
+    identities must keep each identity's rows contiguous, so the per-identity sums
+    are one reduceat. Returns (a row of the best identity, its mean distance) per query
+    """
+    distances = np.sqrt(np.maximum(sq_distances, 0.0))
+    starts = np.flatnonzero(np.r_[True, identities[1:] != identities[:-1]])
+    rows = np.arange(len(distances))
+
+    if len(starts) == len(identities):
+        # One row per identity: nothing to reduce
+        best = np.argmin(distances, axis=1)
+        return best, distances[rows, best]
+
+    counts = np.diff(np.r_[starts, len(identities)])
+    means = np.add.reduceat(distances, starts, axis=1) / counts
+    best = np.argmin(means, axis=1)
+    return starts[best], means[rows, best]
+
+
+class GalleryIndex:
+    """
+    Process-wide gallery of known faces
+
+    Encodings are kept in a contiguous float32 (N, 128) matrix with parallel
+    arrays of person ids and full names, so a query is a single matrix-vector
+    product instead of one distance call per stored person.
+
+    The gallery is versioned and updated in place: after a write, the affected
+    people are re-read from the database and their rows replaced (or
+    tombstoned on delete; tombstones are compacted away once they pile up).
+    Each person's set of encoding ids is remembered, so a refresh that finds
+    nothing new changes nothing - a worker's own write and the Postgres
+    LISTEN/NOTIFY echo of it (which is how other workers learn about the
+    change) can arrive in any order.
+
+    Which rows a query is compared against is delegated to a search backend
+    (see search_backends.py): exact brute force, or IVF for large galleries.
+
+    A person may have several templates (encodings). In "all" mode every
+    template is a row and a person's rows are kept contiguous, so per-identity
+    distances are one reduceat over the distance matrix: "min" takes the
+    closest template, "mean" averages over them (with IVF, over the probed
+    ones). "centroid" mode stores one averaged row per person instead, which
+    keeps search cost at one row per identity.
+    """
+
+    def __init__(self, backend=None, template_mode: str = None, reduction: str = None):
+        self.template_mode = template_mode or settings.GALLERY_TEMPLATE_MODE
+        self.reduction = reduction or settings.GALLERY_TEMPLATE_REDUCTION
+        if self.template_mode not in TEMPLATE_MODES:
+            raise ValueError(f"Unknown gallery template mode: {self.template_mode}")
+        if self.reduction not in TEMPLATE_REDUCTIONS:
+            raise ValueError(f"Unknown gallery template reduction: {self.reduction}")
+
+        self._backend = backend if backend is not None else search_backend_from_settings()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = 0
+        self._next_identity = 0
+        self._template_counts: Dict[UUID, int] = {}
+        # Stored encoding ids per person (see _encoding_id_key); absent when loaded without ids
+        self._encoding_ids: Dict[UUID, Tuple[str, ...]] = {}
+        self._refresh_lock = threading.Lock()
+        self._reset(0)
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_stop = threading.Event()
+
+    def _reset(self, capacity: int):
+        capacity = max(capacity, _MIN_CAPACITY)
+        self._encodings = np.zeros((capacity, ENCODING_DIM), dtype=np.float32)
+        # Tombstoned rows get an infinite norm so they can never be the nearest
+        self._sq_norms = np.full(capacity, np.inf, dtype=np.float32)
+        self._person_ids = np.empty(capacity, dtype=object)
+        self._full_names = np.empty(capacity, dtype=object)
+        # Per-row identity number; a person's rows are contiguous and share one (-1 when tombstoned)
+        self._identities = np.full(capacity, -1, dtype=np.int64)
+        self._size = 0
+        self._tombstones = 0
+        self._rows_by_person: Dict[UUID, List[int]] = {}
+
+    def __len__(self) -> int:
+        """Number of live encodings in the gallery"""
+        return self._size - self._tombstones
+
+    @property
+    def person_count(self) -> int:
+        """Number of people with at least one template in the gallery"""
+        return len(self._rows_by_person)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped on every change to the gallery"""
+        return self._version
+
+    def load(self, conn) -> int:
+        """Load every stored encoding from the database, replacing the current gallery"""
+        # Same lock as refresh_people, so a reload never interleaves with a refresh
+        with self._refresh_lock:
+            records = EncodingRepository(conn).get_all_with_person_info()
+
+            if records:
+                encodings = np.stack([record['face_encoding'] for record in records])
+            else:
+                encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+
+            return self.load_encodings(
+                encodings,
+                [record['person_id'] for record in records],
+                [record['full_name'] for record in records],
+                [record['id'] for record in records]
+            )
+
+    def load_encodings(self, encodings: np.ndarray, person_ids, full_names, encoding_ids=None) -> int:
+        """
+        Replace the gallery with an (N, 128) encoding matrix and parallel person arrays
+        encoding_ids (the encoding table ids) let later refreshes skip people that are unchanged
+        """
+        ids_by_person: Dict[UUID, List[Any]] = {}
+        for person_id, encoding_id in zip(person_ids, encoding_ids or []):
+            ids_by_person.setdefault(person_id, []).append(encoding_id)
+
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        encodings, person_ids, full_names, counts = self._group_templates(encodings, person_ids, full_names)
+
+        with self._lock:
+            self._fill(encodings, person_ids, full_names)
+            self._template_counts = counts
+            self._encoding_ids = {person_id: _encoding_id_key(ids) for person_id, ids in ids_by_person.items()}
+            self._loaded = True
+            self._version += 1
+
+        return len(encodings)
+
+    # ------------------------------------------------------------------
+    # In-place updates
+    # ------------------------------------------------------------------
+
+    def _group_templates(self, encodings: np.ndarray, person_ids, full_names):
+        # Order rows so each person's templates are contiguous, or average them in centroid mode
+        rows_by_person: Dict[UUID, List[int]] = {}
+        for row, person_id in enumerate(person_ids):
+            rows_by_person.setdefault(person_id, []).append(row)
+
+        counts = {person_id: len(rows) for person_id, rows in rows_by_person.items()}
+        if self.template_mode == "centroid":
+            order = [rows[0] for rows in rows_by_person.values()]
+            grouped = np.empty((len(order), ENCODING_DIM), dtype=np.float32)
+            for i, rows in enumerate(rows_by_person.values()):
+                grouped[i] = encodings[rows].mean(axis=0)
+        else:
+            order = [row for rows in rows_by_person.values() for row in rows]
+            grouped = encodings[order]
+
+        return grouped, [person_ids[row] for row in order], [full_names[row] for row in order], counts
+
+    def _templates(self, encodings: np.ndarray) -> np.ndarray:
+        # Rows to store for a person's templates in the configured mode
+        if self.template_mode == "centroid":
+            return encodings.mean(axis=0, keepdims=True)
+        return encodings
+
+    def _fill(self, encodings: np.ndarray, person_ids, full_names):
+        # Replace the whole gallery with the given rows (each person's rows already contiguous)
+        count = len(encodings)
+        self._reset(count)
+        self._encodings[:count] = encodings
+        self._sq_norms[:count] = np.einsum('ij,ij->i', encodings, encodings)
+        self._person_ids[:count] = person_ids
+        self._full_names[:count] = full_names
+        self._size = count
+        for row, person_id in enumerate(person_ids):
+            self._rows_by_person.setdefault(person_id, []).append(row)
+        for rows in self._rows_by_person.values():
+            self._identities[rows] = self._next_identity
+            self._next_identity += 1
+        self._backend.rebuild(self._encodings[:count], np.ones(count, dtype=bool))
+
+    def _append(self, person_id: UUID, full_name: str, templates: np.ndarray):
+        # Append all of a person's rows together so they stay contiguous
+        count = len(templates)
+        while self._size + count > len(self._person_ids):
+            self._grow()
+
+        start, end = self._size, self._size + count
+        self._encodings[start:end] = templates
+        self._sq_norms[start:end] = np.einsum('ij,ij->i', templates, templates)
+        self._person_ids[start:end] = person_id
+        self._full_names[start:end] = full_name
+        self._identities[start:end] = self._next_identity
+        self._next_identity += 1
+        self._rows_by_person[person_id] = list(range(start, end))
+        self._size = end
+        for row in range(start, end):
+            self._backend.add(row, self._encodings[row])
+
+    def _set_templates(self, person_id: UUID, full_name: str, templates: np.ndarray, count: int):
+        # Store a person's complete set of rows, overwriting in place when the shape is unchanged
+        rows = self._rows_by_person.get(person_id)
+        if rows and len(rows) == len(templates):
+            for row, vector in zip(rows, templates):
+                self._set_row(row, vector)
+                self._full_names[row] = full_name
+        else:
+            self._tombstone(person_id)
+            self._append(person_id, full_name, templates)
+            self._maybe_compact()
+        self._template_counts[person_id] = count
+
+    def _set_row(self, row: int, encoding: Any):
+        vector = to_encoding_array(encoding)
+        self._encodings[row] = vector
+        self._sq_norms[row] = np.dot(vector, vector)
+        self._backend.add(row, vector)
+
+    def _maybe_rebuild_backend(self):
+        if self._backend.needs_rebuild:
+            live = np.isfinite(self._sq_norms[:self._size])
+            self._backend.rebuild(self._encodings[:self._size], live)
+
+    def _grow(self):
+        # Allocate new arrays rather than resizing so in-flight searches keep a valid snapshot
+        capacity = len(self._person_ids) * 2
+
+        encodings = np.zeros((capacity, ENCODING_DIM), dtype=np.float32)
+        encodings[:self._size] = self._encodings[:self._size]
+        sq_norms = np.full(capacity, np.inf, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        person_ids = np.empty(capacity, dtype=object)
+        person_ids[:self._size] = self._person_ids[:self._size]
+        full_names = np.empty(capacity, dtype=object)
+        full_names[:self._size] = self._full_names[:self._size]
+        identities = np.full(capacity, -1, dtype=np.int64)
+        identities[:self._size] = self._identities[:self._size]
+
+        self._encodings = encodings
+        self._sq_norms = sq_norms
+        self._person_ids = person_ids
+        self._full_names = full_names
+        self._identities = identities
+
+    def _tombstone(self, person_id: UUID):
+        self._template_counts.pop(person_id, None)
+        self._encoding_ids.pop(person_id, None)
+        for row in self._rows_by_person.pop(person_id, []):
+            self._sq_norms[row] = np.inf
+            self._person_ids[row] = None
+            self._full_names[row] = None
+            self._identities[row] = -1
+            self._tombstones += 1
+
+    def _maybe_compact(self):
+        if self._tombstones < max(_COMPACT_MIN_TOMBSTONES, self._size * _COMPACT_RATIO):
+            return
+
+        live = np.flatnonzero(np.isfinite(self._sq_norms[:self._size]))
+        encodings = self._encodings[live]
+        person_ids = self._person_ids[live]
+        full_names = self._full_names[live]
+
+        self._fill(encodings, person_ids, full_names)
+
+    def template_count(self, person_id: UUID) -> int:
+        """Number of templates enrolled for a person (rows may be fewer in centroid mode)"""
+        with self._lock:
+            return self._template_counts.get(person_id, 0)
+
+    def person_templates(self, person_id: UUID) -> Optional[np.ndarray]:
+        """Rows stored for one person (a copy), or None if they are not in the gallery"""
+        with self._lock:
+            rows = self._rows_by_person.get(person_id)
+            if not rows:
+                return None
+            return self._encodings[rows]
+
+    def remove(self, person_id: UUID):
+        """Tombstone all encodings of a person, compacting when enough rows are dead"""
+        with self._lock:
+            if person_id not in self._rows_by_person:
+                return
+            self._tombstone(person_id)
+            self._maybe_compact()
+            self._version += 1
+
+    def rename(self, person_id: UUID, full_name: str):
+        """Update the display name stored alongside a person's encodings"""
+        with self._lock:
+            rows = self._rows_by_person.get(person_id)
+            if not rows:
+                return
+            self._full_names[rows] = full_name
+            self._version += 1
+
+    def refresh_person(self, conn, person_id: UUID) -> bool:
+        """Make one person's rows match the database; True if anything changed"""
+        return self.refresh_people(conn, [person_id]) > 0
+
+    def refresh_people(self, conn, person_ids: Iterable[UUID]) -> int:
+        """
+        Make the gallery match the database for some people, with one query
+        A person whose stored encoding ids and name are unchanged is left alone,
+        so applying the same change twice (a worker's own write, then its NOTIFY)
+        is a no-op. Returns the number of people whose rows changed
+        """
+        person_ids = list(dict.fromkeys(person_ids))
+        if not person_ids:
+            return 0
+
+        # Serialise read + apply so an older read can never overwrite a newer one
+        with self._refresh_lock:
+            records_by_person: Dict[UUID, List[Dict[str, Any]]] = {}
+            for record in EncodingRepository(conn).get_by_person_ids_with_person_info(person_ids):
+                records_by_person.setdefault(record['person_id'], []).append(record)
+
+            with self._lock:
+                changed = 0
+                for person_id in person_ids:
+                    changed += self._apply_person(person_id, records_by_person.get(person_id, []))
+                if changed:
+                    self._maybe_compact()
+                    self._maybe_rebuild_backend()
+                    self._version += 1
+                return changed
+
+    def _apply_person(self, person_id: UUID, records: List[Dict[str, Any]]) -> bool:
+        # Replace one person's rows with their stored encodings unless they are already current
+        rows = self._rows_by_person.get(person_id)
+        if not records:
+            if not rows:
+                return False
+            self._tombstone(person_id)
+            return True
+
+        encoding_ids = _encoding_id_key(record['id'] for record in records)
+        full_name = records[0]['full_name']
+        if rows and self._encoding_ids.get(person_id) == encoding_ids:
+            if self._full_names[rows[0]] == full_name:
+                return False
+            self._full_names[rows] = full_name
+            return True
+
+        encodings = np.stack([to_encoding_array(record['face_encoding']) for record in records])
+        self._set_templates(person_id, full_name, self._templates(encodings), len(records))
+        self._encoding_ids[person_id] = encoding_ids
+        return True
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        encoding: np.ndarray,
+        tolerance: float
+    ) -> Optional[Tuple[UUID, str, float]]:
+        """
+        Find the closest stored encoding
+        Returns tuple of (person_id, full_name, distance) or None if nothing is within tolerance
+        """
+        return self.search_batch(to_encoding_array(encoding)[None, :], tolerance)[0]
+
+    def search_batch(
+        self,
+        encodings: np.ndarray,
+        tolerance: float
+    ) -> List[Optional[Tuple[UUID, str, float]]]:
+        """
+        Find the closest identity for each row of a (B, 128) query matrix
+        Returns one (person_id, full_name, distance) tuple or None per query
+        """
+        with stage_seconds.time(stage="search"):
+            return self._search_batch(encodings, tolerance)
+
+    def _search_batch(
+        self,
+        encodings: np.ndarray,
+        tolerance: float
+    ) -> List[Optional[Tuple[UUID, str, float]]]:
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        results: List[Optional[Tuple[UUID, str, float]]] = [None] * len(queries)
+
+        with self._lock:
+            size = self._size
+            gallery = self._encodings[:size]
+            sq_norms = self._sq_norms[:size]
+            person_ids = self._person_ids
+            full_names = self._full_names
+            identities = self._identities[:size]
+            candidates = self._backend.candidates(queries) if size and len(queries) else None
+
+        if size == 0 or len(queries) == 0:
+            return results
+
+        if candidates is not None:
+            if len(candidates) == 0:
+                return results
+            gallery = gallery[candidates]
+            sq_norms = sq_norms[candidates]
+            identities = identities[candidates]
+
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, one GEMM for the whole (B, N) matrix
+        query_sq_norms = np.einsum('ij,ij->i', queries, queries)
+        sq_distances = sq_norms[None, :] - 2.0 * (queries @ gallery.T) + query_sq_norms[:, None]
+        if self.reduction == "mean":
+            best_rows, best_distances = _nearest_by_mean(sq_distances, identities)
+        else:
+            # The closest row is also the closest identity under "min"
+            best_rows = np.argmin(sq_distances, axis=1)
+            best_sq = sq_distances[np.arange(len(queries)), best_rows]
+            best_distances = np.sqrt(np.maximum(best_sq, 0.0))
+
+        for i, (best, distance) in enumerate(zip(best_rows, best_distances)):
+            distance = float(distance)
+            if not np.isfinite(distance) or distance > tolerance:
+                continue
+
+            row = int(candidates[best]) if candidates is not None else int(best)
+
+            # The row may have been tombstoned by a concurrent write since the snapshot
+            person_id, full_name = person_ids[row], full_names[row]
+            if person_id is None:
+                continue
+
+            results[i] = (person_id, full_name, distance)
+
+        return results
+
+    def identity_distance(self, templates: np.ndarray, encoding: Any) -> float:
+        """Distance from an encoding to one person's templates, reduced the way searches are"""
+        templates = self._templates(np.asarray(templates, dtype=np.float32).reshape(-1, ENCODING_DIM))
+        distances = np.linalg.norm(templates - to_encoding_array(encoding), axis=1)
+        if self.reduction == "mean":
+            return float(distances.mean())
+        return float(distances.min())
+
+    # ------------------------------------------------------------------
+    # Cross-worker synchronisation
+    # ------------------------------------------------------------------
+
+    def start_sync(self):
+        """Start a background thread applying changes notified by other workers"""
+        if self._sync_thread is not None:
+            return
+        self._sync_stop.clear()
+        self._sync_thread = threading.Thread(target=self._sync_loop, name="gallery-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_sync(self):
+        """Stop the background sync thread"""
+        if self._sync_thread is None:
+            return
+        self._sync_stop.set()
+        self._sync_thread.join(timeout=5)
+        self._sync_thread = None
+
+    def _sync_loop(self):
+        connected_before = False
+        while not self._sync_stop.is_set():
+            try:
+                listen_conn = get_connection()
+            except Exception as e:
+                logger.warning("Gallery sync: could not connect, retrying: %s", e)
+                self._sync_stop.wait(5)
+                continue
+
+            try:
+                listen_conn.execute(f"LISTEN {GALLERY_CHANNEL}")
+
+                # Notifications may have been missed while disconnected
+                if connected_before and self._loaded:
+                    with get_db_connection() as conn:
+                        self.load(conn)
+                connected_before = True
+
+                while not self._sync_stop.is_set():
+                    changed = {
+                        notify.payload
+                        for notify in listen_conn.notifies(timeout=1.0)
+                    }
+                    if changed and self._loaded:
+                        self._apply_notifications(changed)
+            except Exception as e:
+                logger.warning("Gallery sync: listener error, reconnecting: %s", e)
+                time.sleep(1)
+            finally:
+                close_connection(listen_conn)
+
+    def _apply_notifications(self, payloads):
+        # A payload is one person id, or a comma-separated batch of them from a bulk write
+        person_ids = {UUID(person_id) for payload in payloads for person_id in payload.split(",")}
+        with get_db_connection() as conn:
+            self.refresh_people(conn, person_ids)
+
+
+# Global gallery instance shared by all requests in this process
+gallery_index = GalleryIndex()
+
+registry.gauge("gallery_encodings", "Face encodings (rows) in the in-memory gallery", function=lambda: len(gallery_index))
+registry.gauge("gallery_people", "People with at least one template in the in-memory gallery", function=lambda: gallery_index.person_count)
@@ -0,0 +1,182 @@
+"""
+Inference pool - runs dlib/OpenCV face processing in worker processes
+
+Face detection and encoding hold the GIL, so running them on the event loop
+(or in a thread) serializes every client. The pool gives each worker process
+its own core and its own preloaded copy of the dlib models.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, List, Dict, Any, Callable
+
+from backend.utils.image_utils import DecodedImage
+from backend.utils.metrics import registry
+from backend.utils.model_registry import ModelRegistry
+
+
+def _init_worker(setup: Optional[Callable[[], None]], detection_model: str, warm: bool):
+    """Process initializer - run the setup hook, then load the dlib models once per worker"""
+    if setup is not None:
+        setup()
+    if warm:
+        ModelRegistry.warm(detection_model)
+
+
+# Longest a worker waits for the others to pick up their report job
+_REPORT_BARRIER_SECONDS = 10.0
+
+
+def worker_report(barrier=None, detection_model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process id and model report of the process this runs in, loading the models first if asked
+    Waiting on a barrier shared by one job per worker keeps any worker from taking two
+    """
+    if detection_model is not None:
+        ModelRegistry.warm(detection_model)
+    if barrier is not None:
+        try:
+            barrier.wait(_REPORT_BARRIER_SECONDS)
+        except threading.BrokenBarrierError:
+            # A busy worker never joined; the caller keeps the reports it gets
+            pass
+    return {"pid": os.getpid(), "models": ModelRegistry.report()}
+
+
+def analyze_image(
+    image: DecodedImage,
+    detection_model: str,
+    encode: bool = True,
+    storage_max_side: int = 0,
+    storage_quality: int = 85
+) -> Dict[str, Any]:
+    """
+    Detect faces (and optionally encode them / build the storage JPEG) for an image
+    Returns the image's cached_results() plus the stage timings of this call,
+    to be merged back with update_cache()
+    """
+    if encode:
+        image.encodings(detection_model)
+    else:
+        image.face_locations(detection_model)
+    if storage_max_side > 0:
+        image.storage_jpeg(storage_max_side, storage_quality)
+    return {**image.cached_results(), "timings": image.pop_timings()}
+
+
+class InferencePool:
+    """Manages the process pool used for face detection and encoding"""
+
+    _executor: ProcessPoolExecutor | None = None
+    _workers: int = 0
+    # Called first in every worker process (benchmarks install stand-in models here)
+    worker_setup: Optional[Callable[[], None]] = None
+    _in_flight: int = 0
+    _in_flight_lock = threading.Lock()
+
+    @classmethod
+    def initialize(cls, max_workers: int, detection_model: str = "hog", warm: bool = True):
+        """
+        Start the pool; with max_workers <= 0 work runs inline in the calling thread
+        With warm=False workers start without loading models and load each on first use
+        """
+        if cls._executor is None and max_workers > 0:
+            needs_init = warm or cls.worker_setup is not None
+            # spawn, not fork: the parent already runs DB pool and gallery sync threads
+            cls._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker if needs_init else None,
+                initargs=(cls.worker_setup, detection_model, warm) if needs_init else ()
+            )
+            cls._workers = max_workers
+
+    @classmethod
+    def worker_count(cls) -> int:
+        """Number of worker processes (0 when work runs inline)"""
+        return cls._workers
+
+    @classmethod
+    def in_flight(cls) -> int:
+        """Jobs submitted to the worker processes and not finished yet"""
+        return cls._in_flight
+
+    @classmethod
+    def _job_done(cls, future: Future):
+        with cls._in_flight_lock:
+            cls._in_flight -= 1
+
+    @classmethod
+    def submit(cls, fn, *args) -> Future:
+        """Schedule fn(*args) on the pool (or run it now if the pool is not started)"""
+        if cls._executor is not None:
+            with cls._in_flight_lock:
+                cls._in_flight += 1
+            try:
+                future = cls._executor.submit(fn, *args)
+            except Exception:
+                cls._job_done(None)
+                raise
+            future.add_done_callback(cls._job_done)
+            return future
+
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    @classmethod
+    def run(cls, fn, *args):
+        """Run fn(*args) on the pool and wait for its result"""
+        return cls.submit(fn, *args).result()
+
+    @classmethod
+    def worker_reports(cls, detection_model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        One worker_report per worker process (a single one when work runs inline)
+        With detection_model set, every worker loads its models before reporting
+        """
+        if cls._executor is None:
+            return [worker_report(None, detection_model)]
+
+        # The executor may hand several jobs to one process; holding every job at a
+        # barrier until all workers have one ensures each worker runs exactly one
+        with multiprocessing.get_context("spawn").Manager() as manager:
+            barrier = manager.Barrier(cls._workers)
+            futures = [cls.submit(worker_report, barrier, detection_model) for _ in range(cls._workers)]
+            reports = {}
+            for future in futures:
+                report = future.result()
+                reports.setdefault(report["pid"], report)
+        return list(reports.values())
+
+    @classmethod
+    def warm(cls, detection_model: str = "hog") -> List[Dict[str, Any]]:
+        """
+        Load the models now instead of on the first request
+        Starts every worker process (or loads inline without a pool) and returns their reports
+        """
+        return cls.worker_reports(detection_model)
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the pool and its worker processes"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True, cancel_futures=True)
+            cls._executor = None
+            cls._workers = 0
+
+
+registry.gauge(
+    "inference_pool_workers",
+    "Inference worker processes (0 = face processing runs inline)",
+    function=InferencePool.worker_count
+)
+registry.gauge(
+    "inference_pool_in_flight",
+    "Jobs queued or running on the inference workers; above the worker count means the pool is saturated",
+    function=InferencePool.in_flight
+)
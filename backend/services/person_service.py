@@ -1,11 +1,17 @@
 """
 Person management service - handles person-related business logic
 """
-from typing import Optional, List, Dict, Any
-from uuid import UUID
+from typing import Optional, List, Dict, Any, Union, Iterator, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
 
 from database.repositories import PersonRepository, EncodingRepository, ImageRepository
 from backend.services.face_recognition_service import FaceRecognitionService
+from backend.services.gallery_index import gallery_index
+from backend.utils.image_utils import DecodedImage
+from backend.utils.bulk_upload import EnrollmentItem, enrollment_error
+from backend.config import settings
 
 
 class PersonService:
@@ -26,16 +32,17 @@ class PersonService:
         self, 
         first_name: str, 
         last_name: str, 
-        image_bytes: bytes
+        image: Union[bytes, DecodedImage]
     ) -> Dict[str, Any]:
         """
         Create a new person with face image
         Returns dict with person_id, success status, and message
         """
-        # Extract face encoding
-        encoding_json = self.face_service.extract_face_encoding(image_bytes)
+        # Encode the face and build the storage JPEG in one pool round-trip
+        image = self.face_service.prepare_image(image, for_storage=True)
+        encoding = self.face_service.extract_face_encoding(image)
         
-        if not encoding_json:
+        if encoding is None:
             return {
                 "success": False,
                 "message": "No face detected in the image",
@@ -47,10 +54,11 @@ class PersonService:
             person_id = self.person_repo.create(first_name, last_name)
             
             # Store encoding
-            self.encoding_repo.create(person_id, encoding_json)
+            self.encoding_repo.create(person_id, encoding)
+            gallery_index.refresh_person(self.conn, person_id)
             
-            # Store image
-            self.image_repo.create(person_id, image_bytes)
+            # Store a size-capped JPEG rather than the original upload
+            self.image_repo.create(person_id, self.face_service.storage_image(image))
             
             return {
                 "success": True,
@@ -65,6 +73,128 @@ class PersonService:
                 "person_id": None
             }
     
+    def enroll_many(self, items: List[EnrollmentItem]) -> Iterator[Dict[str, Any]]:
+        """
+        Enroll a batch of people in a single transaction
+        Images are encoded in parallel on the inference pool and rows are written with
+        COPY in chunks of BULK_ENROLL_COPY_CHUNK. Yields one result dict per item:
+        failures as soon as they are known, enrollments once the transaction commits
+        """
+        read_errors: Dict[int, str] = {}
+        
+        def sources():
+            for index, item in enumerate(items):
+                try:
+                    data = item.read()
+                except Exception as e:
+                    read_errors[index], data = f"Could not read file: {e}", b""
+                if len(data) > settings.MAX_UPLOAD_SIZE:
+                    read_errors[index], data = f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes", b""
+                yield index, data
+        
+        model = self.face_service.model
+        chunk: List[Dict[str, Any]] = []
+        enrolled: List[Dict[str, Any]] = []
+        
+        try:
+            with self.conn.transaction():
+                for index, image, error in self.face_service.prepare_images(sources(), for_storage=True):
+                    item = items[index]
+                    if error is not None:
+                        yield enrollment_error(item.filename, f"Failed to process image: {error}")
+                        continue
+                    if index in read_errors:
+                        yield enrollment_error(item.filename, read_errors[index])
+                        continue
+                    if image.decode_failed:
+                        yield enrollment_error(item.filename, "Could not decode image")
+                        continue
+                    encodings = image.encodings(model)
+                    if not encodings:
+                        yield enrollment_error(item.filename, "No face detected in the image")
+                        continue
+                    
+                    person = {
+                        "id": uuid4(),
+                        "filename": item.filename,
+                        "first_name": item.first_name,
+                        "last_name": item.last_name,
+                        "full_name": f"{item.first_name} {item.last_name}",
+                        "face_encoding": encodings[0],
+                        "image": self.face_service.storage_image(image)
+                    }
+                    chunk.append(person)
+                    
+                    if len(chunk) >= settings.BULK_ENROLL_COPY_CHUNK:
+                        self.person_repo.copy_people_with_faces(chunk)
+                        enrolled.extend(self._without_image(person) for person in chunk)
+                        chunk = []
+                
+                if chunk:
+                    self.person_repo.copy_people_with_faces(chunk)
+                    enrolled.extend(self._without_image(person) for person in chunk)
+        
+        except Exception as e:
+            # The whole batch was rolled back
+            for person in enrolled + chunk:
+                yield enrollment_error(person["filename"], f"Failed to save person: {str(e)}")
+            return
+        
+        if enrolled:
+            gallery_index.refresh_people(self.conn, [person["id"] for person in enrolled])
+        
+        for person in enrolled:
+            yield {
+                "filename": person["filename"],
+                "success": True,
+                "person_id": person["id"],
+                "message": f"Enrolled {person['full_name']}"
+            }
+    
+    def add_person_images(
+        self,
+        person_id: UUID,
+        images: List[Tuple[str, Union[bytes, DecodedImage]]]
+    ) -> Dict[str, Any]:
+        """
+        Enroll extra face images of an existing person as additional templates
+        Takes (filename, image) pairs; images are encoded in parallel on the inference pool.
+        Returns dict with added count, the person's total template_count and per-file errors
+        """
+        person = self.person_repo.get_by_id(person_id)
+        if not person:
+            raise ValueError("Person not found")
+        
+        model = self.face_service.model
+        encodings: List[np.ndarray] = []
+        errors: List[str] = []
+        
+        for filename, image, error in self.face_service.prepare_images(images):
+            if error is not None:
+                errors.append(f"{filename}: Failed to process image: {error}")
+            elif image.decode_failed:
+                errors.append(f"{filename}: Could not decode image")
+            elif not image.encodings(model):
+                errors.append(f"{filename}: No face detected in the image")
+            else:
+                encodings.append(image.encodings(model)[0])
+        
+        if encodings:
+            self.encoding_repo.create_many(person_id, encodings)
+            gallery_index.refresh_person(self.conn, person_id)
+        
+        return {
+            "person_id": person_id,
+            "added": len(encodings),
+            "template_count": len(self.encoding_repo.get_all_by_person_id(person_id)),
+            "errors": errors
+        }
+    
+    @staticmethod
+    def _without_image(person: Dict[str, Any]) -> Dict[str, Any]:
+        # Drop the JPEG once it is written so a large batch is not kept in memory
+        return {key: value for key, value in person.items() if key != "image"}
+    
     def get_person(self, person_id: UUID) -> Optional[Dict[str, Any]]:
         """Get person by ID"""
         return self.person_repo.get_by_id(person_id)
@@ -80,11 +210,35 @@ class PersonService:
         last_name: str = None
     ) -> bool:
         """Update person information"""
-        return self.person_repo.update(person_id, first_name, last_name)
+        updated = self.person_repo.update(person_id, first_name, last_name)
+        
+        if updated:
+            person = self.person_repo.get_by_id(person_id)
+            if person:
+                gallery_index.rename(person_id, person['full_name'])
+        
+        return updated
     
     def delete_person(self, person_id: UUID) -> bool:
         """Delete a person (cascades to encodings and images)"""
-        return self.person_repo.delete(person_id)
+        deleted = self.person_repo.delete(person_id)
+        gallery_index.remove(person_id)
+        return deleted
+    
+    def replace_person_image(self, person_id: UUID, image: Union[bytes, DecodedImage]) -> bool:
+        """
+        Replace a person's face image and encoding
+        Returns False if no face could be processed from the new image
+        """
+        self.encoding_repo.delete_by_person_id(person_id)
+        self.image_repo.delete_by_person_id(person_id)
+        
+        if not self.face_service.process_and_store_face(image, person_id):
+            # Old encoding is already gone, so drop the stale gallery row too
+            gallery_index.remove(person_id)
+            return False
+        
+        return True
     
     def get_person_image(self, person_id: UUID) -> Optional[bytes]:
         """Get stored image for a person"""
@@ -0,0 +1,262 @@
+"""
+Recognition batcher - micro-batches concurrent recognition requests
+
+Requests that arrive within a short window are collected into one batch.
+Each image is detected/encoded on the inference pool in parallel, then the
+whole batch is matched against the gallery with a single (B, N) distance
+matrix and every caller's future is resolved.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, List, Dict, Any, Union
+from uuid import UUID
+
+import numpy as np
+
+from backend.config import settings
+from backend.services.gallery_index import gallery_index
+from backend.services.inference_pool import InferencePool, analyze_image
+from backend.utils.image_utils import DecodedImage, as_decoded_image
+from backend.utils.metrics import registry
+from database.db import get_db_connection
+
+batch_size_histogram = registry.histogram(
+    "recognition_batch_size",
+    "Requests per dispatched recognition micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+batch_wait_seconds = registry.histogram(
+    "recognition_batch_wait_seconds",
+    "Time a request waited in the batching queue before its batch was dispatched"
+)
+
+
+@dataclass
+class _PendingRecognition:
+    image: DecodedImage
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchingStats:
+    """Batch-size and queue-wait counters (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.items = 0
+            self.max_batch_size = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, batch_size: int, waits: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.total_wait += sum(waits)
+            self.max_wait = max(self.max_wait, max(waits))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "mean_wait_ms": 1000.0 * self.total_wait / self.items if self.items else 0.0,
+                "max_wait_ms": 1000.0 * self.max_wait
+            }
+
+
+class RecognitionBatcher:
+    """
+    Collects recognition requests into micro-batches
+
+    A batch is closed when `max_batch_size` requests are queued or `window_ms`
+    has passed since the collector picked up its first request. The max-latency
+    guard closes it early once the oldest request has been queued for
+    `max_wait_ms`, so a lone request is never held longer than that.
+
+    Collecting and resolving run on separate threads, so the next batch fills
+    up while the previous one is still being encoded.
+    """
+
+    def __init__(
+        self,
+        window_ms: float,
+        max_batch_size: int,
+        max_wait_ms: float,
+        tolerance: float,
+        detection_model: str,
+        detection_max_side: int = 0
+    ):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.tolerance = tolerance
+        self.detection_model = detection_model
+        self.detection_max_side = detection_max_side
+        self.stats = BatchingStats()
+
+        self._requests: "queue.Queue[Optional[_PendingRecognition]]" = queue.Queue()
+        self._batches: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._collector: Optional[threading.Thread] = None
+        self._resolver: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._collector is not None
+
+    def start(self):
+        """Start the collector and resolver threads"""
+        if self._collector is not None:
+            return
+        self._collector = threading.Thread(target=self._collect_loop, name="recognition-collector", daemon=True)
+        self._resolver = threading.Thread(target=self._resolve_loop, name="recognition-resolver", daemon=True)
+        self._collector.start()
+        self._resolver.start()
+
+    def stop(self):
+        """Finish queued requests and stop the threads"""
+        if self._collector is None:
+            return
+        self._requests.put(None)
+        self._collector.join()
+        self._resolver.join()
+        self._collector = None
+        self._resolver = None
+
+    def submit(self, image: Union[bytes, DecodedImage]) -> Future:
+        """Queue an image; the future resolves to (person_id, full_name, distance) or None"""
+        pending = _PendingRecognition(as_decoded_image(image, self.detection_max_side))
+        self._requests.put(pending)
+        return pending.future
+
+    def recognize(self, image: Union[bytes, DecodedImage]) -> Optional[Tuple[UUID, str, float]]:
+        """Queue an image and wait for its match"""
+        return self.submit(image).result()
+
+    # ------------------------------------------------------------------
+    # Worker threads
+    # ------------------------------------------------------------------
+
+    def _collect_loop(self):
+        stopping = False
+        while not stopping:
+            first = self._requests.get()
+            if first is None:
+                break
+
+            batch = [first]
+            # Max-latency guard: never wait past the oldest request's budget
+            deadline = min(time.perf_counter() + self.window, first.enqueued_at + self.max_wait)
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+        self._batches.put(None)
+
+    def _dispatch(self, batch: List[_PendingRecognition]):
+        dispatched_at = time.perf_counter()
+        waits = [dispatched_at - item.enqueued_at for item in batch]
+        self.stats.record(len(batch), waits)
+        batch_size_histogram.observe(len(batch))
+        for seconds in waits:
+            batch_wait_seconds.observe(seconds)
+
+        encode_futures = []
+        for item in batch:
+            try:
+                if item.image.needs_analysis(self.detection_model):
+                    encode_futures.append(
+                        InferencePool.submit(analyze_image, item.image, self.detection_model)
+                    )
+                else:
+                    # Already encoded earlier in the request
+                    cached = Future()
+                    cached.set_result(item.image.cached_results())
+                    encode_futures.append(cached)
+            except Exception as e:
+                failed = Future()
+                failed.set_exception(e)
+                encode_futures.append(failed)
+
+        self._batches.put((batch, encode_futures))
+
+    def _resolve_loop(self):
+        while True:
+            work = self._batches.get()
+            if work is None:
+                break
+            batch, encode_futures = work
+            try:
+                self._resolve(batch, encode_futures)
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def _resolve(self, batch: List[_PendingRecognition], encode_futures: List[Future]):
+        wait(encode_futures)
+
+        encoded: List[int] = []
+        encodings: List[np.ndarray] = []
+        for i, (item, encode_future) in enumerate(zip(batch, encode_futures)):
+            error = encode_future.exception()
+            if error is not None:
+                item.future.set_exception(error)
+                continue
+            item.image.update_cache(encode_future.result())
+            if item.image.decode_failed or not item.image.encodings(self.detection_model):
+                # Undecodable image or no face: nothing to match
+                item.future.set_result(None)
+                continue
+            encoded.append(i)
+            encodings.append(item.image.encodings(self.detection_model)[0])
+
+        if not encoded:
+            return
+
+        if not gallery_index.is_loaded:
+            with get_db_connection() as conn:
+                gallery_index.load(conn)
+
+        matches = gallery_index.search_batch(np.stack(encodings), self.tolerance)
+        for i, match in zip(encoded, matches):
+            batch[i].future.set_result(match)
+
+
+def batcher_from_settings() -> RecognitionBatcher:
+    """Create the recognition batcher configured in settings"""
+    return RecognitionBatcher(
+        window_ms=settings.RECOGNITION_BATCH_WINDOW_MS,
+        max_batch_size=settings.RECOGNITION_BATCH_MAX_SIZE,
+        max_wait_ms=settings.RECOGNITION_BATCH_MAX_WAIT_MS,
+        tolerance=settings.FACE_RECOGNITION_TOLERANCE,
+        detection_model=settings.FACE_DETECTION_MODEL,
+        detection_max_side=settings.DETECTION_MAX_SIDE
+    )
+
+
+# Global batcher instance, started from the application lifespan
+recognition_batcher = batcher_from_settings()
@@ -0,0 +1,167 @@
+"""
+Recognition cache - reuses recent recognition results for repeated frames
+
+Retries and kiosks looking at a motionless person send the same (or nearly
+the same) picture again and again. Results are cached under two keys:
+
+- a content hash of the uploaded bytes, checked before anything is decoded
+- a perceptual hash (dHash) of the detected face crop, which only proposes a
+  candidate: a 64-bit hash of a downscaled crop cannot tell people apart, so
+  the caller confirms the candidate against the fresh encoding (one distance
+  to that person's templates instead of a gallery search)
+
+Entries expire after a TTL, the least recently used ones are evicted beyond
+`max_entries`, and everything is dropped when the gallery version changes
+(enrollment, deletion or an image replacement can change any answer).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any
+from uuid import UUID
+
+from backend.config import settings
+from backend.services.gallery_index import gallery_index
+from backend.utils.metrics import registry
+
+# (person_id, full_name, distance) as returned by the gallery search, or None for no match
+Match = Optional[Tuple[UUID, str, float]]
+
+
+def content_digest(image_bytes: bytes) -> bytes:
+    """Hash of the raw image bytes used as the exact cache key"""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+
+class RecognitionCache:
+    """
+    Bounded LRU / TTL cache of recognition results (thread-safe)
+
+    Face hashes within `max_hamming` bits of a cached one are returned as a
+    candidate; 0 requires an identical hash. Face-hash lookups are not counted
+    here, the caller reports the outcome once the candidate is confirmed
+    (count_face_hit) or rejected (count_miss).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_hamming: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_hamming = max_hamming
+
+        self._lock = threading.Lock()
+        self._by_content: "OrderedDict[bytes, Tuple[Match, float]]" = OrderedDict()
+        self._by_face: "OrderedDict[int, Tuple[Match, float]]" = OrderedDict()
+        self._version = gallery_index.version
+        self.content_hits = 0
+        self.face_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get_by_content(self, digest: bytes) -> Tuple[bool, Match]:
+        """(hit, match) for an exact repeat of an earlier image"""
+        with self._lock:
+            hit, match = self._get(self._by_content, digest)
+            self.content_hits += hit
+            return hit, match
+
+    def get_by_face(self, face_hash: int) -> Match:
+        """Cached match of a face crop that looks like an earlier one, a candidate to confirm"""
+        with self._lock:
+            key = face_hash
+            if self.max_hamming > 0 and face_hash not in self._by_face:
+                key = min(
+                    self._by_face,
+                    key=lambda cached: (cached ^ face_hash).bit_count(),
+                    default=face_hash
+                )
+                if (key ^ face_hash).bit_count() > self.max_hamming:
+                    key = face_hash
+
+            _, match = self._get(self._by_face, key)
+            return match
+
+    def count_face_hit(self):
+        """Record a face-hash candidate that was confirmed"""
+        with self._lock:
+            self.face_hits += 1
+
+    def count_miss(self):
+        """Record a lookup that needed a gallery search"""
+        with self._lock:
+            self.misses += 1
+
+    def put(self, digest: bytes, face_hash: Optional[int], match: Match, version: int):
+        """
+        Cache a result computed against gallery `version`
+
+        Results computed before a gallery change are discarded rather than cached.
+        """
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                return
+            expires_at = time.monotonic() + self.ttl
+            self._set(self._by_content, digest, (match, expires_at))
+            if face_hash is not None:
+                self._set(self._by_face, face_hash, (match, expires_at))
+
+    def clear(self):
+        with self._lock:
+            self._by_content.clear()
+            self._by_face.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.content_hits + self.face_hits + self.misses
+            return {
+                "entries": len(self._by_content) + len(self._by_face),
+                "content_hits": self.content_hits,
+                "face_hits": self.face_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.content_hits + self.face_hits) / lookups if lookups else 0.0
+            }
+
+    def _check_version(self):
+        if gallery_index.version != self._version:
+            self._by_content.clear()
+            self._by_face.clear()
+            self._version = gallery_index.version
+
+    def _get(self, entries: OrderedDict, key) -> Tuple[bool, Match]:
+        self._check_version()
+        entry = entries.get(key)
+        if entry is None:
+            return False, None
+        match, expires_at = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return False, None
+        entries.move_to_end(key)
+        return True, match
+
+    def _set(self, entries: OrderedDict, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+
+# Global cache instance shared by every request in this process
+recognition_cache = RecognitionCache(
+    max_entries=settings.RECOGNITION_CACHE_SIZE,
+    ttl_seconds=settings.RECOGNITION_CACHE_TTL_SECONDS,
+    max_hamming=settings.RECOGNITION_CACHE_MAX_HAMMING
+)
+
+registry.counter(
+    "recognition_cache_hits_total",
+    "Recognition cache hits by key: exact image content or perceptual face hash",
+    ("kind",),
+    function=lambda: {"content": recognition_cache.content_hits, "face": recognition_cache.face_hits}
+)
+registry.counter("recognition_cache_misses_total", "Recognition cache misses", function=lambda: recognition_cache.misses)
+registry.gauge("recognition_cache_entries", "Entries in the recognition cache", function=lambda: recognition_cache.snapshot()["entries"])
@@ -0,0 +1,222 @@
+"""
+Gallery search backends - choose which gallery rows a query is compared against
+"""
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ExactSearchBackend:
+    """Brute-force search: every query is compared against every gallery row"""
+
+    name = "exact"
+    needs_rebuild = False
+
+    def rebuild(self, encodings: np.ndarray, live: np.ndarray):
+        pass
+
+    def add(self, row: int, vector: np.ndarray):
+        pass
+
+    def candidates(self, queries: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to compare the queries against, or None for the whole gallery"""
+        return None
+
+
+class IVFSearchBackend:
+    """
+    Inverted-file approximate search (pure NumPy, CPU only)
+
+    Gallery rows are clustered around `nlist` k-means centroids. A query is only
+    compared against rows in the `nprobe` lists whose centroids are closest to
+    it, so search cost grows with N * nprobe / nlist instead of N.
+
+    Centroids are persisted to `index_path` so restarts only need to re-assign
+    rows (one matrix product) instead of re-training. New rows are assigned to
+    their nearest centroid as they are enrolled; the centroids are re-trained
+    once the gallery has grown well past the size they were trained on.
+    Removed rows are left in their lists - the gallery gives them an infinite
+    distance - and are dropped on the next rebuild.
+    """
+
+    name = "ivf"
+
+    # Re-train once the gallery is this many times larger than the training set
+    RETRAIN_GROWTH = 4.0
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLES_PER_LIST = 32
+
+    def __init__(
+        self,
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_size: int = 5000,
+        index_path: Optional[str] = None,
+        seed: int = 0
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.index_path = index_path
+        self._rng = np.random.default_rng(seed)
+
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_sq_norms: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lists: list = []
+        self._pending: list = []
+        # Live rows (for the training decisions) and the gallery rows seen so far
+        self._size = 0
+        self._rows = 0
+
+        if index_path:
+            self._load_centroids()
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """True when the gallery has outgrown the current centroids"""
+        if self._centroids is None:
+            return self._size >= self.min_size
+        return self._size > self._trained_size * self.RETRAIN_GROWTH
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _target_nlist(self, size: int) -> int:
+        if self.nlist:
+            return self.nlist
+        # Common IVF rule of thumb: ~4 * sqrt(N) lists
+        return max(1, int(4 * np.sqrt(size)))
+
+    # ------------------------------------------------------------------
+    # Training and assignment
+    # ------------------------------------------------------------------
+
+    def _nearest_centroids(self, vectors: np.ndarray, count: int = 1) -> np.ndarray:
+        # Squared distances up to a per-row constant: ||c||^2 - 2 v.c
+        scores = self._centroid_sq_norms - 2.0 * (vectors @ self._centroids.T)
+        if count == 1:
+            return np.argmin(scores, axis=1)[:, None]
+        count = min(count, scores.shape[1])
+        return np.argpartition(scores, count - 1, axis=1)[:, :count]
+
+    def _train(self, vectors: np.ndarray):
+        nlist = min(self._target_nlist(len(vectors)), len(vectors))
+        sample_size = min(len(vectors), nlist * self.KMEANS_SAMPLES_PER_LIST)
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        sample_sq_norms = np.einsum('ij,ij->i', sample, sample)
+
+        for _ in range(self.KMEANS_ITERATIONS):
+            centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+            scores = centroid_sq_norms - 2.0 * (sample @ centroids.T)
+            labels = np.argmin(scores, axis=1)
+
+            counts = np.bincount(labels, minlength=nlist)
+            # Per-cluster sums via one sort + reduceat (np.add.at is far slower)
+            order = np.argsort(labels, kind='stable')
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            sums[counts == 0] = 0.0
+
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                # Re-seed empty lists with the points furthest from their centroid
+                point_sq = scores[np.arange(sample_size), labels] + sample_sq_norms
+                furthest = np.argsort(point_sq)[-int(empty.sum()):]
+                centroids[empty] = sample[furthest]
+
+        self._centroids = centroids.astype(np.float32)
+        self._centroid_sq_norms = np.einsum('ij,ij->i', self._centroids, self._centroids)
+        self._trained_size = len(vectors)
+        self._save_centroids()
+
+    def rebuild(self, encodings: np.ndarray, live: np.ndarray):
+        """Re-assign every live gallery row, training the centroids first if needed"""
+        rows = np.flatnonzero(live)
+        self._size = len(rows)
+        self._rows = len(encodings)
+
+        if self._centroids is None and self._size < self.min_size:
+            self._lists, self._pending = [], []
+            return
+
+        if self._centroids is None or self.needs_rebuild:
+            self._train(encodings[rows])
+
+        labels = self._nearest_centroids(encodings[rows])[:, 0]
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(len(self._centroids) + 1))
+        sorted_rows = rows[order]
+
+        self._lists = [sorted_rows[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        self._pending = [[] for _ in self._lists]
+
+    def add(self, row: int, vector: np.ndarray):
+        """Assign a new or updated gallery row to its nearest list"""
+        if row >= self._rows:
+            # Rows updated in place are already counted
+            self._rows = row + 1
+            self._size += 1
+        if self._centroids is None:
+            return
+        label = int(self._nearest_centroids(vector[None, :])[0, 0])
+        self._pending[label].append(row)
+
+    def candidates(self, queries: np.ndarray) -> Optional[np.ndarray]:
+        """Rows in the nprobe nearest lists of any query, or None for an exact scan"""
+        if self._centroids is None:
+            return None
+
+        probe = np.unique(self._nearest_centroids(queries, self.nprobe))
+        for label in probe:
+            if self._pending[label]:
+                self._lists[label] = np.concatenate([self._lists[label], self._pending[label]])
+                self._pending[label] = []
+
+        return np.unique(np.concatenate([self._lists[label] for label in probe]))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _save_centroids(self):
+        if not self.index_path:
+            return
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated index behind
+        tmp_path = f"{self.index_path}.tmp.npz"
+        np.savez(tmp_path, centroids=self._centroids, trained_size=self._trained_size)
+        os.replace(tmp_path, self.index_path)
+
+    def _load_centroids(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with np.load(self.index_path) as data:
+                centroids = data['centroids'].astype(np.float32)
+                trained_size = int(data['trained_size'])
+        except Exception as e:
+            logger.warning("Ignoring unreadable gallery index %s: %s", self.index_path, e)
+            return
+        self._centroids = centroids
+        self._centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+        self._trained_size = trained_size
+
+
+def create_search_backend(name: str, **options):
+    """Create a search backend by name ('exact' or 'ivf')"""
+    if name == ExactSearchBackend.name:
+        return ExactSearchBackend()
+    if name == IVFSearchBackend.name:
+        return IVFSearchBackend(**options)
+    raise ValueError(f"Unknown gallery search backend: {name}")
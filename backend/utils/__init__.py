@@ -1,3 +1,24 @@
-from .image_utils import bytes_to_ndarray, ndarray_to_bytes
+"""
+Shared helpers
 
-__all__ = ["bytes_to_ndarray", "ndarray_to_bytes"]
+The image helpers are imported on first access (PEP 562) rather than here,
+so light modules such as backend.utils.metrics - imported by database.db -
+do not pull OpenCV into migrations and CLI scripts.
+"""
+from importlib import import_module
+
+__all__ = [
+    "bytes_to_ndarray",
+    "ndarray_to_bytes",
+    "read_image_size",
+    "decode_image_reduced",
+    "downscale_to_max_side",
+    "scale_face_locations",
+    "difference_hash"
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return getattr(import_module(".image_utils", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,210 @@
+"""
+Bulk enrollment uploads - names manifest and ZIP / multi-file image sources
+"""
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple, Any, BinaryIO, Optional
+
+from pydantic import ValidationError
+
+from backend.config import settings
+from backend.models import PersonCreate
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = ("filename", "first_name", "last_name")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Image readers by file name; None marks a name shared by several uploaded files
+ImageSources = Dict[str, Optional[Callable[[], bytes]]]
+
+
+@dataclass
+class EnrollmentItem:
+    """One person to enroll: their image file and names from the manifest"""
+    filename: str
+    first_name: str
+    last_name: str
+    read: Callable[[], bytes]
+
+
+class UploadSpool:
+    """
+    Private copies of uploaded files for a streamed response
+
+    FastAPI closes UploadFiles once the route returns, before a StreamingResponse
+    body runs, so the files are copied to temporary files owned by the stream.
+    Plain images share one file and are read back by (offset, length).
+    """
+
+    def __init__(self):
+        self._images = tempfile.TemporaryFile()
+        self._files = [self._images]
+
+    def add_image(self, fileobj: BinaryIO) -> Callable[[], bytes]:
+        """Copy an image and return a reader for it"""
+        self._images.seek(0, os.SEEK_END)
+        offset = self._images.tell()
+        shutil.copyfileobj(fileobj, self._images)
+        length = self._images.tell() - offset
+
+        def read() -> bytes:
+            self._images.seek(offset)
+            return self._images.read(length)
+
+        return read
+
+    def add_zip(self, fileobj: BinaryIO) -> Tuple[ImageSources, Optional[bytes]]:
+        """Copy a ZIP archive and list its images (see zip_image_sources)"""
+        copy = tempfile.TemporaryFile()
+        self._files.append(copy)
+        shutil.copyfileobj(fileobj, copy)
+        copy.seek(0)
+        return zip_image_sources(copy)
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+
+def read_manifest(data: bytes) -> Tuple[Dict[str, PersonCreate], List[Dict[str, Any]]]:
+    """
+    Parse a names manifest CSV with a filename,first_name,last_name header
+
+    Args:
+        data: CSV file contents (UTF-8, optional BOM)
+
+    Returns:
+        (people by filename, per-row error results)
+
+    Raises:
+        ValueError: If the header is missing a column or a filename is listed twice
+    """
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig')))
+    missing = [column for column in MANIFEST_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Manifest is missing column(s): {', '.join(missing)}")
+
+    people: Dict[str, PersonCreate] = {}
+    errors: List[Dict[str, Any]] = []
+    for line, row in enumerate(reader, start=2):
+        filename = os.path.basename((row['filename'] or '').strip())
+        if not filename:
+            errors.append(enrollment_error(f"line {line}", "Manifest row has no filename"))
+            continue
+        if filename in people:
+            raise ValueError(f"Manifest lists {filename} more than once")
+        try:
+            people[filename] = PersonCreate(first_name=row['first_name'] or '', last_name=row['last_name'] or '')
+        except ValidationError as e:
+            errors.append(enrollment_error(filename, f"Invalid name: {e.errors()[0]['msg']}"))
+
+    return people, errors
+
+
+def read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_size: int) -> bytes:
+    """
+    Decompress one archive member, refusing anything over max_size bytes
+
+    The declared size is checked before decompressing and the read itself is
+    bounded, so a member that lies about its size (a ZIP bomb) cannot expand
+    past max_size + 1 bytes in memory.
+
+    Raises:
+        ValueError: If the member is larger than max_size
+    """
+    too_large = ValueError(f"File too large. Maximum size: {max_size} bytes")
+    if info.file_size > max_size:
+        raise too_large
+    with archive.open(info) as member:
+        data = member.read(max_size + 1)
+    if len(data) > max_size:
+        raise too_large
+    return data
+
+
+def add_image_source(sources: ImageSources, name: str, read: Optional[Callable[[], bytes]]):
+    """
+    Register an image under its file name
+
+    Manifest rows name files without their folder, so a second file with the
+    same name (from another ZIP folder or upload) makes the name ambiguous
+    rather than silently replacing the first one.
+    """
+    sources[name] = None if name in sources else read
+
+
+def zip_image_sources(
+    fileobj: BinaryIO,
+    max_size: int = settings.MAX_UPLOAD_SIZE
+) -> Tuple[ImageSources, Optional[bytes]]:
+    """
+    List the images in a ZIP archive without extracting them
+
+    Args:
+        fileobj: Seekable file object holding the archive
+        max_size: Largest member, in uncompressed bytes, that will be read
+
+    Returns:
+        (lazy readers by image file name - None for a name used in several
+        folders - and the contents of a manifest.csv member if present)
+
+    Raises:
+        ValueError: If the manifest is larger than max_size
+    """
+    archive = zipfile.ZipFile(fileobj)
+    sources: ImageSources = {}
+    manifest = None
+
+    for info in archive.infolist():
+        name = os.path.basename(info.filename)
+        if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+            continue
+        if name == MANIFEST_NAME:
+            manifest = read_zip_member(archive, info, max_size)
+        elif os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+            add_image_source(sources, name, lambda info=info: read_zip_member(archive, info, max_size))
+
+    return sources, manifest
+
+
+def match_manifest(
+    sources: ImageSources,
+    people: Dict[str, PersonCreate]
+) -> Tuple[List[EnrollmentItem], List[Dict[str, Any]]]:
+    """
+    Pair uploaded images with manifest rows by file name
+
+    Returns:
+        (items to enroll, error results for ambiguous names, unlisted images and missing files)
+    """
+    items = [
+        EnrollmentItem(filename, person.first_name, person.last_name, sources[filename])
+        for filename, person in people.items()
+        if sources.get(filename) is not None
+    ]
+    errors = [
+        enrollment_error(filename, "Several uploaded files have this name; file names must be unique")
+        for filename, read in sources.items() if read is None
+    ] + [
+        enrollment_error(filename, "File is not listed in the manifest")
+        for filename, read in sources.items() if read is not None and filename not in people
+    ] + [
+        enrollment_error(filename, "File listed in the manifest was not uploaded")
+        for filename in people if filename not in sources
+    ]
+    return items, errors
+
+
+def enrollment_error(filename: str, message: str) -> Dict[str, Any]:
+    """Per-item result for an image that was not enrolled"""
+    return {
+        "filename": filename,
+        "success": False,
+        "person_id": None,
+        "message": message
+    }
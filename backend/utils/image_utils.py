@@ -1,11 +1,18 @@
 """
 Utility functions for backend
 """
+import struct
+import time
+from typing import Optional, Tuple, List, Dict, Any, Union
+
 import numpy as np
 import cv2
 
+from backend.utils import model_registry
+from backend.utils.metrics import stage_seconds
+
 
-def bytes_to_ndarray(img_bytes: bytes) -> np.ndarray:
+def bytes_to_ndarray(img_bytes: bytes) -> Optional[np.ndarray]:
     """
     Convert image bytes to numpy array
     
@@ -13,8 +20,10 @@ def bytes_to_ndarray(img_bytes: bytes) -> np.ndarray:
         img_bytes: Image data as bytes
         
     Returns:
-        Numpy array in BGR format
+        Numpy array in BGR format, or None if the bytes are not a readable image
     """
+    if not img_bytes:
+        return None
     # Convert bytes to 1D numpy array
     nparr = np.frombuffer(img_bytes, np.uint8)
     # Decode image array from buffer
@@ -22,18 +31,388 @@ def bytes_to_ndarray(img_bytes: bytes) -> np.ndarray:
     return img
 
 
-def ndarray_to_bytes(img: np.ndarray, format: str = '.jpg') -> bytes:
+def ndarray_to_bytes(img: np.ndarray, format: str = '.jpg', params: Optional[List[int]] = None) -> bytes:
     """
     Convert numpy array to image bytes
     
     Args:
         img: Image as numpy array
         format: Image format (default: .jpg)
+        params: Optional cv2.imencode parameters (e.g. JPEG quality)
         
     Returns:
         Image data as bytes
     """
-    success, buffer = cv2.imencode(format, img)
+    success, buffer = cv2.imencode(format, img, params or [])
     if not success:
         raise ValueError("Failed to encode image")
     return buffer.tobytes()
+
+
+# JPEG start-of-frame markers (SOF0-SOF15, excluding DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# (reduction factor, imdecode flag), largest first
+_REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+]
+
+
+def read_image_size(img_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read image dimensions from the JPEG or PNG header without decoding
+    
+    Args:
+        img_bytes: Image data as bytes
+        
+    Returns:
+        (width, height) or None if the header is not recognised
+    """
+    if img_bytes[:8] == b'\x89PNG\r\n\x1a\n' and len(img_bytes) >= 24:
+        width, height = struct.unpack('>II', img_bytes[16:24])
+        return width, height
+    
+    if img_bytes[:2] != b'\xff\xd8':
+        return None
+    
+    # Walk the JPEG marker segments up to the start-of-frame header
+    pos = 2
+    while pos + 4 <= len(img_bytes):
+        if img_bytes[pos] != 0xFF:
+            return None
+        marker = img_bytes[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            # Standalone markers carry no length
+            pos += 2
+            continue
+        (length,) = struct.unpack('>H', img_bytes[pos + 2:pos + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > len(img_bytes):
+                return None
+            height, width = struct.unpack('>HH', img_bytes[pos + 5:pos + 9])
+            return width, height
+        if marker == 0xDA:
+            # Start of scan before any frame header
+            return None
+        pos += 2 + length
+    
+    return None
+
+
+def decode_image_reduced(img_bytes: bytes, max_side: int) -> Tuple[Optional[np.ndarray], float]:
+    """
+    Decode an image with its longest side at most max_side
+    
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale in the DCT domain
+    (cv2.IMREAD_REDUCED_*) when that still covers max_side, which is much
+    cheaper than a full decode; the rest is done with an area resize.
+    
+    Args:
+        img_bytes: Image data as bytes
+        max_side: Longest side of the result in pixels (0 = full resolution)
+        
+    Returns:
+        (BGR image or None, scale) where scale maps result pixels back to the original
+    """
+    if not img_bytes:
+        return None, 1.0
+    
+    nparr = np.frombuffer(img_bytes, np.uint8)
+    size = read_image_size(img_bytes) if max_side > 0 else None
+    
+    flag, factor = cv2.IMREAD_COLOR, 1
+    if size is not None and img_bytes[:2] == b'\xff\xd8':
+        longest = max(size)
+        for candidate, reduced_flag in _REDUCED_DECODE_FLAGS:
+            if longest // candidate >= max_side:
+                flag, factor = reduced_flag, candidate
+                break
+    
+    img = cv2.imdecode(nparr, flag)
+    if img is None:
+        return None, 1.0
+    
+    # The reduced decoders round up, so measure the real scale from the result
+    scale = max(size) / max(img.shape[:2]) if factor > 1 else 1.0
+    img, resize_scale = downscale_to_max_side(img, max_side)
+    return img, scale * resize_scale
+
+
+def downscale_to_max_side(img: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    """
+    Shrink an image so its longest side is at most max_side
+    
+    Args:
+        img: Image as numpy array
+        max_side: Longest side of the result in pixels (0 = no limit)
+        
+    Returns:
+        (image, scale) where scale maps result pixels back to the input
+    """
+    longest = max(img.shape[:2])
+    if max_side <= 0 or longest <= max_side:
+        return img, 1.0
+    
+    factor = max_side / longest
+    height, width = img.shape[:2]
+    small = cv2.resize(
+        img,
+        (max(1, round(width * factor)), max(1, round(height * factor))),
+        interpolation=cv2.INTER_AREA
+    )
+    return small, longest / max(small.shape[:2])
+
+
+def scale_face_locations(
+    face_locations: List[Tuple[int, int, int, int]],
+    scale: float,
+    shape: Tuple[int, ...]
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Map (top, right, bottom, left) boxes found on a downscaled image back to full resolution
+    
+    Args:
+        face_locations: Boxes in downscaled pixel coordinates
+        scale: Full-resolution pixels per downscaled pixel
+        shape: Shape of the full-resolution image
+        
+    Returns:
+        Boxes in full-resolution pixel coordinates, clipped to the image
+    """
+    if scale == 1.0:
+        return list(face_locations)
+    
+    height, width = shape[:2]
+    return [
+        (
+            max(0, int(round(top * scale))),
+            min(width, int(round(right * scale))),
+            min(height, int(round(bottom * scale))),
+            max(0, int(round(left * scale)))
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
+
+def difference_hash(img: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Perceptual difference hash (dHash) of an image region
+    
+    The region is shrunk to (hash_size + 1) x hash_size grey pixels and each
+    bit records whether a pixel is brighter than its right-hand neighbour, so
+    re-encoding, small shifts and sensor noise flip only a few bits.
+    
+    Args:
+        img: RGB, BGR or greyscale image as numpy array
+        hash_size: Bits per row / number of rows (hash_size ** 2 bits in total)
+        
+    Returns:
+        Hash as a non-negative integer
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class DecodedImage:
+    """
+    One uploaded image, decoded at most once per process
+    
+    Caches the decoded pixels, face locations (per detection model), face
+    encodings and the storage JPEG, so detection, encoding and storage on the
+    same request share one cv2.imdecode. Pickling drops the pixel arrays but
+    keeps the cached results, so an instance can be analysed in an inference
+    worker and the results merged back with update_cache().
+    """
+    
+    def __init__(self, image_bytes: bytes, detection_max_side: int = 0):
+        self.image_bytes = image_bytes
+        self.detection_max_side = detection_max_side
+        self._rgb: Optional[np.ndarray] = None
+        self._detection_rgb: Optional[np.ndarray] = None
+        self._detection_scale = 1.0
+        self._decode_failed = False
+        self._face_locations: Dict[str, List[Tuple[int, int, int, int]]] = {}
+        self._face_hashes: Dict[str, List[int]] = {}
+        self._encodings: Dict[str, List[np.ndarray]] = {}
+        self._storage_jpeg: Optional[bytes] = None
+        # Seconds spent per stage (decode/detect/encode) on this copy, see pop_timings()
+        self._timings: Dict[str, float] = {}
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_rgb'] = None
+        state['_detection_rgb'] = None
+        state['_detection_scale'] = 1.0
+        state['_timings'] = {}
+        return state
+    
+    def _record(self, stage: str, started: float):
+        self._timings[stage] = self._timings.get(stage, 0.0) + time.perf_counter() - started
+    
+    def pop_timings(self) -> Dict[str, float]:
+        """Stage timings accumulated since the last call"""
+        timings, self._timings = self._timings, {}
+        return timings
+    
+    @property
+    def rgb(self) -> Optional[np.ndarray]:
+        """Full-resolution RGB pixels, or None if the bytes are not a readable image"""
+        if self._rgb is None and not self._decode_failed:
+            started = time.perf_counter()
+            img_bgr = bytes_to_ndarray(self.image_bytes)
+            if img_bgr is None:
+                self._decode_failed = True
+            else:
+                self._rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+                # Later detection is derived from these pixels
+                self._detection_rgb = None
+            self._record("decode", started)
+        return self._rgb
+    
+    @property
+    def decode_failed(self) -> bool:
+        """True once a decode of the bytes has been attempted and failed"""
+        return self._decode_failed
+    
+    def needs_analysis(self, model: str = "hog", encode: bool = True, storage: bool = False) -> bool:
+        """True if the requested results are not cached yet"""
+        if self._decode_failed:
+            return False
+        cache = self._encodings if encode else self._face_locations
+        return model not in cache or (storage and self._storage_jpeg is None)
+    
+    @property
+    def is_valid(self) -> bool:
+        """True if the bytes decode to an image (or were already analysed)"""
+        if self._face_locations or self._storage_jpeg is not None:
+            return True
+        return self.rgb is not None
+    
+    def _detection_image(self) -> Tuple[Optional[np.ndarray], float]:
+        if self._detection_rgb is None:
+            if self._rgb is not None:
+                self._detection_rgb, self._detection_scale = downscale_to_max_side(
+                    self._rgb, self.detection_max_side
+                )
+            elif not self._decode_failed:
+                # Nothing needs the full pixels yet, so a reduced decode is enough
+                started = time.perf_counter()
+                img_bgr, self._detection_scale = decode_image_reduced(
+                    self.image_bytes, self.detection_max_side
+                )
+                if img_bgr is None:
+                    self._decode_failed = True
+                else:
+                    self._detection_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+                self._record("decode", started)
+        return self._detection_rgb, self._detection_scale
+    
+    def face_locations(self, model: str = "hog") -> List[Tuple[int, int, int, int]]:
+        """(top, right, bottom, left) boxes in full-resolution pixels"""
+        if model not in self._face_locations:
+            img, scale = self._detection_image()
+            if img is None:
+                return []
+            started = time.perf_counter()
+            locations = model_registry.face_locations(img, model=model)
+            self._record("detect", started)
+            self._face_locations[model] = scale_face_locations(locations, scale, self._full_shape(img, scale))
+            self._face_hashes[model] = [
+                difference_hash(img[max(0, top):bottom, max(0, left):right])
+                for top, right, bottom, left in locations
+            ]
+        return self._face_locations[model]
+    
+    def face_hashes(self, model: str = "hog") -> List[int]:
+        """Perceptual hash (difference_hash) of every detected face crop, in face_locations order"""
+        self.face_locations(model)
+        return self._face_hashes.get(model, [])
+    
+    def _full_shape(self, detection_img: np.ndarray, scale: float) -> Tuple[int, int]:
+        if self._rgb is not None:
+            return self._rgb.shape[:2]
+        detection_height, detection_width = detection_img.shape[:2]
+        size = read_image_size(self.image_bytes)
+        if size is None:
+            return round(detection_height * scale), round(detection_width * scale)
+        # The header gives the stored size; the decode has the EXIF orientation applied
+        width, height = size
+        if detection_height != detection_width and (detection_height > detection_width) != (height > width):
+            width, height = height, width
+        return height, width
+    
+    def encodings(self, model: str = "hog") -> List[np.ndarray]:
+        """float32 128-d encodings of every detected face, in face_locations order"""
+        if model not in self._encodings:
+            # Decode the full image before detecting so both share one decode
+            if self.rgb is None:
+                return []
+            locations = self.face_locations(model)
+            if not locations:
+                self._encodings[model] = []
+            else:
+                started = time.perf_counter()
+                encodings = model_registry.face_encodings(
+                    self.rgb,
+                    known_face_locations=locations,
+                    model="large"  # Use large model for better accuracy
+                )
+                self._record("encode", started)
+                self._encodings[model] = [encoding.astype(np.float32) for encoding in encodings]
+        return self._encodings[model]
+    
+    def storage_jpeg(self, max_side: int = 1024, quality: int = 85) -> Optional[bytes]:
+        """
+        JPEG for the images table, no larger than max_side on its longest side
+        
+        Every upload is re-encoded from the decoded pixels, so the stored file has
+        the EXIF orientation baked in and carries no EXIF, ICC or thumbnail data.
+        """
+        if self._storage_jpeg is None:
+            if self.rgb is not None:
+                small, _ = downscale_to_max_side(self.rgb, max_side)
+                self._storage_jpeg = ndarray_to_bytes(
+                    cv2.cvtColor(small, cv2.COLOR_RGB2BGR),
+                    '.jpg',
+                    [cv2.IMWRITE_JPEG_QUALITY, quality]
+                )
+        return self._storage_jpeg
+    
+    def cached_results(self) -> Dict[str, Any]:
+        """Analysis results without pixels or source bytes, cheap to send between processes"""
+        return {
+            "decode_failed": self._decode_failed,
+            "face_locations": self._face_locations,
+            "face_hashes": self._face_hashes,
+            "encodings": self._encodings,
+            "storage_jpeg": self._storage_jpeg
+        }
+    
+    def update_cache(self, results: Dict[str, Any]):
+        """
+        Merge results computed on another copy of this image (see cached_results)
+        Stage timings sent along with the results are recorded in the stage histogram
+        """
+        for stage, seconds in results.get("timings", {}).items():
+            stage_seconds.observe(seconds, stage=stage)
+        self._decode_failed = self._decode_failed or results["decode_failed"]
+        self._face_locations.update(results["face_locations"])
+        self._face_hashes.update(results["face_hashes"])
+        self._encodings.update(results["encodings"])
+        if results["storage_jpeg"] is not None:
+            self._storage_jpeg = results["storage_jpeg"]
+
+
+def as_decoded_image(image: Union[bytes, DecodedImage], detection_max_side: int = 0) -> DecodedImage:
+    """Wrap raw image bytes in a DecodedImage (DecodedImage instances pass through)"""
+    if isinstance(image, DecodedImage):
+        return image
+    return DecodedImage(image, detection_max_side)
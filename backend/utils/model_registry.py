@@ -0,0 +1,148 @@
+"""
+Model registry - lazily loaded dlib face models
+
+Importing face_recognition loads every dlib model it ships (HOG and CNN
+detectors, both landmark predictors and the encoder) at import time, which
+costs seconds and well over 100 MB in processes that never run inference.
+The registry loads each model from the face_recognition_models files the
+first time it is used, or up front through warm(), and records how long each
+load took and how much memory it added. dlib itself is only imported by the
+first load, so importing this module (and the services built on it) is cheap.
+
+face_locations() and face_encodings() mirror the face_recognition functions
+of the same name on top of the registry.
+"""
+import os
+import threading
+import time
+from typing import Optional, Tuple, List, Dict, Any
+
+import numpy as np
+
+# name -> (face_recognition_models function locating the model file or None, dlib loader)
+MODEL_SPECS = {
+    "hog_detector": (None, "get_frontal_face_detector"),
+    "cnn_detector": ("cnn_face_detector_model_location", "cnn_face_detection_model_v1"),
+    "landmarks_68": ("pose_predictor_model_location", "shape_predictor"),
+    "landmarks_5": ("pose_predictor_five_point_model_location", "shape_predictor"),
+    "encoder": ("face_recognition_model_location", "face_recognition_model_v1"),
+}
+
+DETECTORS = {"hog": "hog_detector", "cnn": "cnn_detector"}
+LANDMARKS = {"large": "landmarks_68", "small": "landmarks_5"}
+
+
+def _model_path(location: Optional[str]) -> Optional[str]:
+    """Path of a model file in the face_recognition_models package"""
+    if location is None:
+        return None
+    import face_recognition_models
+    return getattr(face_recognition_models, location)()
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident memory of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """Loads each dlib model once per process, on first use"""
+
+    _models: Dict[str, Any] = {}
+    _stats: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, name: str):
+        """The named model, loading it now if this process has not used it yet"""
+        model = cls._models.get(name)
+        if model is None:
+            with cls._lock:
+                model = cls._models.get(name)
+                if model is None:
+                    model = cls._load(name)
+        return model
+
+    @classmethod
+    def _load(cls, name: str):
+        import dlib
+
+        location, loader = MODEL_SPECS[name]
+        path = _model_path(location)
+
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        model = getattr(dlib, loader)(path) if path else getattr(dlib, loader)()
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        cls._stats[name] = {
+            "load_seconds": load_seconds,
+            "memory_mb": (rss_after - rss_before) / 2**20 if rss_before is not None and rss_after is not None else None
+        }
+        cls._models[name] = model
+        return model
+
+    @classmethod
+    def is_loaded(cls, name: str) -> bool:
+        return name in cls._models
+
+    @classmethod
+    def warm(cls, detection_model: str = "hog", landmark_model: str = "large"):
+        """Load the models a recognition needs and run each once on a blank frame"""
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        face_locations(blank, model=detection_model)
+        face_encodings(blank, [(0, 64, 64, 0)], model=landmark_model)
+
+    @classmethod
+    def report(cls) -> List[Dict[str, Any]]:
+        """Load state, time and memory of every known model in this process"""
+        report = []
+        for name, (location, _) in MODEL_SPECS.items():
+            path = _model_path(location)
+            stats = cls._stats.get(name, {})
+            report.append({
+                "name": name,
+                "loaded": name in cls._models,
+                "file_mb": os.path.getsize(path) / 2**20 if path and os.path.exists(path) else 0.0,
+                "load_seconds": stats.get("load_seconds"),
+                "memory_mb": stats.get("memory_mb")
+            })
+        return report
+
+
+def _trim_css_to_bounds(css: Tuple[int, int, int, int], image_shape) -> Tuple[int, int, int, int]:
+    return max(css[0], 0), min(css[1], image_shape[1]), min(css[2], image_shape[0]), max(css[3], 0)
+
+
+def face_locations(img: np.ndarray, number_of_times_to_upsample: int = 1, model: str = "hog") -> List[Tuple[int, int, int, int]]:
+    """(top, right, bottom, left) boxes of the faces in an RGB image"""
+    detector = ModelRegistry.get(DETECTORS.get(model, "hog_detector"))
+    detections = detector(img, number_of_times_to_upsample)
+    rects = [detection.rect for detection in detections] if model == "cnn" else detections
+    return [
+        _trim_css_to_bounds((rect.top(), rect.right(), rect.bottom(), rect.left()), img.shape)
+        for rect in rects
+    ]
+
+
+def face_encodings(
+    face_image: np.ndarray,
+    known_face_locations: List[Tuple[int, int, int, int]],
+    num_jitters: int = 1,
+    model: str = "large"
+) -> List[np.ndarray]:
+    """128-d encodings of the faces at the given (top, right, bottom, left) boxes"""
+    import dlib
+
+    predictor = ModelRegistry.get(LANDMARKS.get(model, "landmarks_68"))
+    encoder = ModelRegistry.get("encoder")
+    encodings = []
+    for top, right, bottom, left in known_face_locations:
+        landmarks = predictor(face_image, dlib.rectangle(left, top, right, bottom))
+        encodings.append(np.array(encoder.compute_face_descriptor(face_image, landmarks, num_jitters)))
+    return encodings
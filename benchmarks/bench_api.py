@@ -0,0 +1,150 @@
+"""
+End-to-end API latency benchmark - recognition and attendance requests through FastAPI
+
+Seeds the configured Postgres with a synthetic gallery, starts the app in
+process with FastAPI's TestClient (full lifespan: pool, gallery load,
+batcher) and replays synthetic webcam frames against
+POST /face-recognition/recognize and POST /attendance/mark/face. The dlib
+models are replaced by the stand-ins from benchmarks/common.py, so the timing
+covers upload parsing, decoding, caching, gallery search and database work.
+
+Frames are noisy so every request is byte-unique; the recognition cache is
+off unless --cache is given. Benchmark people are removed at the end.
+
+Usage:
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --sizes 1000 --requests 500 --endpoints mark --json
+    python benchmarks/bench_api.py --cost-ms 40 --workers 2 --batch-window-ms 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    ENDPOINTS,
+    configure_app,
+    install_stand_in_models,
+    synthetic_gallery,
+    synthetic_frame,
+    insert_bench_people,
+    delete_bench_people,
+    response_outcome,
+    latency_summary,
+    print_rows
+)
+
+
+def frame_plan(size: int, requests: int, unknown_ratio: float, no_face_ratio: float, seed: int):
+    """Identity per request: gallery people without repeats while possible, strangers, or None (no face)"""
+    rng = np.random.default_rng(seed)
+    people = np.concatenate([rng.permutation(size) for _ in range(requests // size + 1)])[:requests]
+    plan = []
+    for i in range(requests):
+        draw = rng.random()
+        if draw < no_face_ratio:
+            plan.append(None)
+        elif draw < no_face_ratio + unknown_ratio:
+            plan.append(size + int(rng.integers(0, size)))
+        else:
+            plan.append(int(people[i]))
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Gallery sizes, in people")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and size")
+    parser.add_argument("--unknown-ratio", type=float, default=0.1, help="Share of frames showing a stranger")
+    parser.add_argument("--no-face-ratio", type=float, default=0.05, help="Share of frames without a face")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--cost-ms", type=float, default=0.0,
+                        help="CPU burnt per stand-in detection + encoding, to mimic the dlib models")
+    parser.add_argument("--workers", type=int, default=0, help="INFERENCE_WORKERS (0 = inline)")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="RECOGNITION_BATCH_WINDOW_MS")
+    parser.add_argument("--backend", default="exact", choices=["exact", "ivf"], help="GALLERY_SEARCH_BACKEND")
+    parser.add_argument("--cache", action="store_true", help="Keep the recognition cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    overrides = {
+        "INFERENCE_WORKERS": args.workers,
+        "RECOGNITION_BATCH_WINDOW_MS": args.batch_window_ms,
+        "GALLERY_SEARCH_BACKEND": args.backend,
+    }
+    if not args.cache:
+        overrides["RECOGNITION_CACHE_SIZE"] = 0
+    configure_app(**overrides)
+
+    from fastapi.testclient import TestClient
+    from backend.config import settings
+    from backend.main import app
+    from database.db import get_connection, close_connection
+
+    install_stand_in_models(args.cost_ms, args.seed)
+
+    conn = get_connection()
+    rows = []
+    try:
+        delete_bench_people(conn)
+        for size in args.sizes:
+            person_ids = insert_bench_people(conn, synthetic_gallery(size, args.seed))
+
+            with TestClient(app) as client:
+                for endpoint in args.endpoints:
+                    url = settings.API_PREFIX + ENDPOINTS[endpoint]
+                    rng = np.random.default_rng(args.seed)
+                    plan = frame_plan(size, args.requests, args.unknown_ratio, args.no_face_ratio, args.seed)
+                    frames = [synthetic_frame(identity, args.width, args.height, rng=rng) for identity in plan]
+
+                    # One untimed faceless request to settle connections and lazy imports
+                    warmup = synthetic_frame(None, args.width, args.height)
+                    client.post(url, files={"image": ("warmup.jpg", warmup, "image/jpeg")})
+
+                    latencies = []
+                    outcomes = {}
+                    correct = 0
+                    started = time.perf_counter()
+                    for identity, frame in zip(plan, frames):
+                        request_started = time.perf_counter()
+                        response = client.post(url, files={"image": ("frame.jpg", frame, "image/jpeg")})
+                        latencies.append(time.perf_counter() - request_started)
+
+                        body = response.json() if response.status_code == 200 else None
+                        outcome = response_outcome(response.status_code, body)
+                        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                        expected = str(person_ids[identity]) if identity is not None and identity < size else None
+                        if (body or {}).get("person_id") == expected:
+                            correct += 1
+                    elapsed = time.perf_counter() - started
+
+                    rows.append({
+                        "benchmark": "api",
+                        "endpoint": endpoint,
+                        "size": size,
+                        "workers": args.workers,
+                        "cost_ms": args.cost_ms,
+                        "requests_per_s": len(frames) / elapsed,
+                        **latency_summary(latencies),
+                        "accuracy": correct / len(frames),
+                        "outcomes": outcomes
+                    })
+
+            delete_bench_people(conn)
+    finally:
+        delete_bench_people(conn)
+        close_connection(conn)
+
+    print_rows(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Attendance-marking throughput benchmark against the configured Postgres
+
+Marks synthetic people present through the same code the API uses, from one
+or more threads with pooled connections:
+
+- single:  AttendanceService.mark_recognized_person per person (one upsert each)
+- repeat:  the same people again - answered by the in-memory presence set
+- batch:   AttendanceRepository.mark_attendance_many in batches (multi-face path)
+
+Benchmark people and their attendance rows are removed at the end.
+
+Usage:
+    python benchmarks/bench_attendance.py
+    python benchmarks/bench_attendance.py --people 5000 --threads 1 4 8 --batch-size 50 --json
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    configure_app,
+    random_encodings,
+    insert_bench_people,
+    delete_bench_people,
+    latency_summary,
+    print_rows
+)
+
+
+def run_threads(work, chunks, threads: int):
+    """Run work(chunk) for every chunk on a thread pool; returns (per-call seconds, wall seconds)"""
+    def timed(chunk):
+        started = time.perf_counter()
+        work(chunk)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(timed, chunks))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=2000, help="People marked per scenario")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--batch-size", type=int, default=20, help="People per mark_attendance_many call")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    # Pin everything that could change a mark's cost rather than inherit it from .env
+    configure_app(
+        INFERENCE_WORKERS=0,
+        RECOGNITION_BATCH_WINDOW_MS=0,
+        RECOGNITION_CACHE_SIZE=0,
+        GALLERY_SEARCH_BACKEND="exact"
+    )
+
+    from backend.services.attendance_service import AttendanceService
+    from database.db import DatabaseManager, get_db_connection, get_connection, close_connection
+    from database.repositories import attendance_presence
+    from database.repositories.attendance_repository import AttendanceRepository
+
+    def mark_one(person_id):
+        with get_db_connection() as conn:
+            result = AttendanceService(conn).mark_recognized_person(person_id, "Bench", 1.0)
+        if not (result["success"] or result["already_marked"]):
+            raise RuntimeError(result["message"])
+
+    def mark_batch(person_ids):
+        with get_db_connection() as conn:
+            AttendanceRepository(conn).mark_attendance_many(person_ids)
+
+    conn = get_connection()
+    rows = []
+    try:
+        DatabaseManager.initialize_pool(maxconn=max(args.threads) + 1)
+        delete_bench_people(conn)
+
+        for threads in args.threads:
+            person_ids = insert_bench_people(conn, random_encodings(args.people))
+            attendance_presence.warm(conn)
+
+            scenarios = [
+                ("single", mark_one, person_ids),
+                ("repeat", mark_one, person_ids),
+            ]
+            for name, work, chunks in scenarios:
+                latencies, elapsed = run_threads(work, chunks, threads)
+                rows.append({
+                    "benchmark": "attendance",
+                    "scenario": name,
+                    "threads": threads,
+                    "people": len(person_ids),
+                    "marks_per_s": len(person_ids) / elapsed,
+                    **latency_summary(latencies)
+                })
+            delete_bench_people(conn)
+
+            person_ids = insert_bench_people(conn, random_encodings(args.people))
+            attendance_presence.warm(conn)
+            batches = [person_ids[i:i + args.batch_size] for i in range(0, len(person_ids), args.batch_size)]
+            latencies, elapsed = run_threads(mark_batch, batches, threads)
+            rows.append({
+                "benchmark": "attendance",
+                "scenario": "batch",
+                "threads": threads,
+                "people": len(person_ids),
+                "batch_size": args.batch_size,
+                "marks_per_s": len(person_ids) / elapsed,
+                **latency_summary(latencies)
+            })
+            delete_bench_people(conn)
+    finally:
+        delete_bench_people(conn)
+        close_connection(conn)
+        DatabaseManager.close_all_connections()
+
+    print_rows(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Latency/accuracy benchmark of downscaled face detection (DETECTION_MAX_SIDE)
+
+Each input photo is resampled to a range of resolutions (to mimic phone and
+webcam captures) and JPEG-encoded. For every resolution the full pipeline in
+compute_face_encodings is timed at several detection max sides and compared
+against full-resolution detection: were the same faces found, how far did the
+encoding move, and would it still match the reference within tolerance.
+
+Usage:
+    python benchmarks/bench_detection_downscale.py photo1.jpg photo2.jpg
+    python benchmarks/bench_detection_downscale.py face.jpg --resolutions 1280 4000 --max-sides 0 640 800 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.image_utils import DecodedImage
+
+
+def compute_face_encodings(
+    image_bytes: bytes,
+    detection_model: str,
+    detection_max_side: int = 0
+) -> Optional[Tuple[List[Tuple[int, int, int, int]], List[np.ndarray]]]:
+    """
+    Decode an image, detect faces and compute their 128-d encodings
+    Detection runs on a copy downscaled to detection_max_side (0 = full
+    resolution); the boxes are mapped back so encodings use full-resolution pixels
+    Returns (face_locations, encodings) or None if the image cannot be decoded
+    """
+    image = DecodedImage(image_bytes, detection_max_side)
+    encodings = image.encodings(detection_model)
+    if not image.is_valid:
+        return None
+    return image.face_locations(detection_model), encodings
+
+
+def count_faces(image_bytes: bytes, detection_model: str, detection_max_side: int = 0) -> int:
+    """Decode an image (at reduced resolution when possible) and count the faces in it"""
+    return len(DecodedImage(image_bytes, detection_max_side).face_locations(detection_model))
+
+
+def resample_jpeg(img_bgr: np.ndarray, long_side: int, quality: int = 92) -> bytes:
+    """Resize an image to the given longest side and JPEG-encode it"""
+    height, width = img_bgr.shape[:2]
+    factor = long_side / max(height, width)
+    resized = cv2.resize(
+        img_bgr,
+        (round(width * factor), round(height * factor)),
+        interpolation=cv2.INTER_AREA if factor < 1 else cv2.INTER_CUBIC
+    )
+    success, buffer = cv2.imencode('.jpg', resized, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ValueError("Failed to encode image")
+    return buffer.tobytes()
+
+
+def time_call(fn, *args, repeats: int):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+", help="Photos containing at least one face")
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[640, 1280, 2000, 3000, 4000])
+    parser.add_argument("--max-sides", type=int, nargs="+", default=[0, 480, 640, 800, 1024])
+    parser.add_argument("--model", default="hog")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    for path in args.images:
+        img_bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            print(f"Skipping unreadable image: {path}", file=sys.stderr)
+            continue
+
+        for resolution in args.resolutions:
+            image_bytes = resample_jpeg(img_bgr, resolution)
+            reference, _ = time_call(compute_face_encodings, image_bytes, args.model, 0, repeats=1)
+            reference_faces = len(reference[0]) if reference else 0
+
+            for max_side in args.max_sides:
+                result, encode_ms = time_call(
+                    compute_face_encodings, image_bytes, args.model, max_side, repeats=args.repeats
+                )
+                _, count_ms = time_call(count_faces, image_bytes, args.model, max_side, repeats=args.repeats)
+
+                faces = len(result[0]) if result else 0
+                drift = None
+                if reference_faces and faces:
+                    drift = float(np.linalg.norm(result[1][0] - reference[1][0]))
+
+                row = {
+                    "image": os.path.basename(path),
+                    "resolution": resolution,
+                    "max_side": max_side,
+                    "encode_ms": encode_ms,
+                    "count_ms": count_ms,
+                    "faces": faces,
+                    "reference_faces": reference_faces,
+                    "encoding_drift": drift,
+                    "match": drift is not None and drift <= args.tolerance
+                }
+
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    drift_text = f"{drift:.4f}" if drift is not None else "   -  "
+                    print(
+                        f"{row['image']:<20} {resolution:>5}px  max_side={max_side or 'full':<5}"
+                        f" encode={encode_ms:8.1f} ms  count={count_ms:8.1f} ms"
+                        f"  faces={faces}/{reference_faces}  drift={drift_text}"
+                        f"  match={'yes' if row['match'] else 'no'}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
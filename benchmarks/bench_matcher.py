@@ -0,0 +1,95 @@
+"""
+Matcher throughput benchmark - GalleryIndex search over synthetic galleries
+
+Times the in-process gallery search that recognize_face and the recognition
+batcher use, for gallery sizes from 100 to 100k random 128-d encodings, one
+query at a time and in batches. Runs without photos or a database.
+
+Usage:
+    python benchmarks/bench_matcher.py
+    python benchmarks/bench_matcher.py --sizes 1000 100000 --batch-sizes 1 32 --backends exact ivf --json
+    python benchmarks/bench_matcher.py --templates 5 --reduction mean
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.gallery_index import GalleryIndex
+from backend.services.search_backends import ExactSearchBackend, IVFSearchBackend
+from benchmarks.common import random_encodings, probe_encodings, print_rows
+
+
+def make_backend(name: str):
+    if name == "ivf":
+        return IVFSearchBackend(nlist=0, nprobe=8, min_size=0)
+    return ExactSearchBackend()
+
+
+def time_search(index: GalleryIndex, probes: np.ndarray, batch_size: int, tolerance: float):
+    """Run every probe through search_batch in batches; returns (results, seconds)"""
+    results = []
+    start = time.perf_counter()
+    for offset in range(0, len(probes), batch_size):
+        results.extend(index.search_batch(probes[offset:offset + batch_size], tolerance))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="Gallery sizes, in people")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--backends", nargs="+", default=["exact"], choices=["exact", "ivf"])
+    parser.add_argument("--templates", type=int, default=1, help="Encodings per person")
+    parser.add_argument("--reduction", default="min", choices=["min", "mean"])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        encodings = random_encodings(size * args.templates, args.seed)
+        probes, targets = probe_encodings(encodings, args.queries, args.seed + 1)
+        person_ids = [uuid.uuid4() for _ in range(size)]
+        row_person_ids = [person_ids[row // args.templates] for row in range(len(encodings))]
+        row_names = [f"person-{row // args.templates}" for row in range(len(encodings))]
+        expected = [person_ids[target // args.templates] for target in targets]
+
+        for backend_name in args.backends:
+            index = GalleryIndex(backend=make_backend(backend_name), template_mode="all", reduction=args.reduction)
+            start = time.perf_counter()
+            index.load_encodings(encodings, row_person_ids, row_names)
+            build_s = time.perf_counter() - start
+
+            # Warm caches and any lazily built structures before timing
+            time_search(index, probes[:min(len(probes), 32)], 32, args.tolerance)
+
+            for batch_size in args.batch_sizes:
+                results, seconds = time_search(index, probes, batch_size, args.tolerance)
+                correct = sum(1 for result, person_id in zip(results, expected) if result and result[0] == person_id)
+                rows.append({
+                    "benchmark": "matcher",
+                    "backend": backend_name,
+                    "size": size,
+                    "templates": args.templates,
+                    "reduction": args.reduction,
+                    "batch_size": batch_size,
+                    "build_s": build_s,
+                    "queries_per_s": len(probes) / seconds,
+                    "ms_per_query": seconds / len(probes) * 1000,
+                    "accuracy": correct / len(probes)
+                })
+
+    print_rows(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark EncodingRepository.find_nearest: pgvector (in Postgres) vs Python scan
+
+Inserts a synthetic gallery into the configured database inside a transaction
+that is rolled back at the end, so no rows are left behind. Requires the
+002_pgvector_embedding migration to have been applied for the pgvector path.
+
+Usage:
+    python benchmarks/bench_pgvector.py
+    python benchmarks/bench_pgvector.py --sizes 1000 10000 --queries 50 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import get_connection, close_connection
+from database.repositories import EncodingRepository, encode_face_encoding
+from benchmarks.bench_search_backends import synthetic_gallery
+
+
+def insert_gallery(conn, gallery: np.ndarray):
+    rows = [(uuid.uuid4(), vector) for vector in gallery]
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO name (id, first_name, last_name, full_name) VALUES (%s, 'bench', %s, %s)",
+            [(person_id, str(i), f"bench {i}") for i, (person_id, _) in enumerate(rows)]
+        )
+        cursor.executemany(
+            "INSERT INTO encoding (person_id, face_encoding) VALUES (%s, %s)",
+            [(person_id, encode_face_encoding(vector)) for person_id, vector in rows]
+        )
+        cursor.execute("ANALYZE encoding")
+
+
+def time_queries(search, probes: np.ndarray, tolerance: float):
+    results = []
+    start = time.perf_counter()
+    for probe in probes:
+        nearest = search(probe, 1, tolerance)
+        results.append(nearest[0]['person_id'] if nearest else None)
+    return results, (time.perf_counter() - start) / len(probes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        repo = EncodingRepository(conn)
+        if not repo.has_vector_search():
+            print("pgvector embedding column not found - only the Python scan will be timed")
+
+        for size in args.sizes:
+            gallery, probes = synthetic_gallery(size, args.queries)
+            with conn.transaction(force_rollback=True):
+                insert_gallery(conn, gallery)
+
+                truth, scan_ms = time_queries(repo._find_nearest_scan, probes, args.tolerance)
+                rows = [{"method": "python_scan", "size": size, "ms_per_query": scan_ms, "recall": 1.0}]
+
+                if repo.has_vector_search():
+                    found, vector_ms = time_queries(repo._find_nearest_pgvector, probes, args.tolerance)
+                    recall = float(np.mean([a == b for a, b in zip(found, truth)]))
+                    rows.append({"method": "pgvector", "size": size, "ms_per_query": vector_ms, "recall": recall})
+
+            for row in rows:
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"N={size:>7}  {row['method']:<12} {row['ms_per_query']:9.3f} ms/query  recall@1={row['recall']:.3f}")
+    finally:
+        close_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Recall/latency benchmark of the IVF gallery search backend against exact search
+
+Uses a synthetic gallery of 128-d encodings (identities drawn around a set of
+cluster centres, queries drawn around identities) so it runs without photos
+or a database.
+
+Usage:
+    python benchmarks/bench_search_backends.py
+    python benchmarks/bench_search_backends.py --sizes 10000 50000 --nprobe 4 8 16 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.gallery_index import GalleryIndex, ENCODING_DIM
+from backend.services.search_backends import ExactSearchBackend, IVFSearchBackend
+
+
+def synthetic_gallery(size: int, queries: int, seed: int = 0):
+    """Generate a clustered gallery and noisy probe queries of known identities"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0.0, 0.08, (max(1, size // 500), ENCODING_DIM))
+    gallery = centres[rng.integers(0, len(centres), size)] + rng.normal(0.0, 0.05, (size, ENCODING_DIM))
+    targets = rng.integers(0, size, queries)
+    probes = gallery[targets] + rng.normal(0.0, 0.02, (queries, ENCODING_DIM))
+    return gallery.astype(np.float32), probes.astype(np.float32)
+
+
+def time_queries(index: GalleryIndex, probes: np.ndarray, tolerance: float):
+    results = []
+    start = time.perf_counter()
+    for probe in probes:
+        match = index.search(probe, tolerance)
+        results.append(match[0] if match else None)
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(probes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--nlist", type=int, default=0, help="0 = ~4*sqrt(N)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        gallery, probes = synthetic_gallery(size, args.queries)
+        person_ids = [uuid.uuid4() for _ in range(size)]
+        names = [f"person-{i}" for i in range(size)]
+
+        exact = GalleryIndex(backend=ExactSearchBackend())
+        exact.load_encodings(gallery, person_ids, names)
+        truth, exact_ms = time_queries(exact, probes, args.tolerance)
+        rows = [{"backend": "exact", "size": size, "ms_per_query": exact_ms, "recall": 1.0}]
+
+        for nprobe in args.nprobe:
+            backend = IVFSearchBackend(nlist=args.nlist, nprobe=nprobe, min_size=0)
+            start = time.perf_counter()
+            ivf = GalleryIndex(backend=backend)
+            ivf.load_encodings(gallery, person_ids, names)
+            build_s = time.perf_counter() - start
+
+            found, ivf_ms = time_queries(ivf, probes, args.tolerance)
+            recall = float(np.mean([a == b for a, b in zip(found, truth)]))
+            rows.append({
+                "backend": "ivf",
+                "size": size,
+                "nlist": len(backend._lists),
+                "nprobe": nprobe,
+                "build_s": build_s,
+                "ms_per_query": ivf_ms,
+                "recall": recall
+            })
+
+        for row in rows:
+            if args.json:
+                print(json.dumps(row))
+            elif row["backend"] == "exact":
+                print(f"N={size:>7}  exact             {row['ms_per_query']:8.3f} ms/query")
+            else:
+                print(
+                    f"N={size:>7}  ivf nlist={row['nlist']:<5} nprobe={row['nprobe']:<3}"
+                    f" {row['ms_per_query']:8.3f} ms/query  recall@1={row['recall']:.3f}"
+                    f"  build={row['build_s']:.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup benchmark - import time and memory with eager vs lazily loaded face models
+
+Each scenario runs in a fresh interpreter (so nothing is cached in-process)
+and reports the median wall time and peak RSS over several runs:
+
+- eager:  import face_recognition, which loads every dlib model at import
+          (what importing the backend used to cost)
+- lazy:   import backend.main with no model loaded
+- warm:   import backend.main, then ModelRegistry.warm() - what a worker or
+          the first request pays to become ready
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --model cnn --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, time
+started = time.perf_counter()
+{code}
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+SCENARIOS = {
+    "eager": "import face_recognition",
+    "lazy": "import backend.main",
+    "warm": (
+        "import backend.main\n"
+        "from backend.utils.model_registry import ModelRegistry\n"
+        "ModelRegistry.warm({model!r})"
+    ),
+}
+
+
+def run_probe(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--model", default="hog", help="Detection model warmed in the 'warm' scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name, code in SCENARIOS.items():
+        samples = [run_probe(code.format(model=args.model)) for _ in range(args.runs)]
+        results.append({
+            "scenario": name,
+            "median_seconds": statistics.median(sample["seconds"] for sample in samples),
+            "peak_rss_mb": statistics.median(sample["peak_rss_mb"] for sample in samples)
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'scenario':<10}{'median s':>10}{'peak RSS MB':>14}")
+    for result in results:
+        print(f"{result['scenario']:<10}{result['median_seconds']:>10.3f}{result['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Shared fixtures for the benchmark suite - synthetic galleries, frames and stand-in face models
+
+Benchmarks must run without photos and without paying for dlib, so the real
+detector and encoder are swapped for stand-ins:
+
+- synthetic_frame(identity) renders a JPEG whose centre carries the identity
+  as a stripe code (a frame without a code holds "no face")
+- the stand-in detector finds the code and returns its box as the face
+- the stand-in encoder returns identity_encoding(identity) plus a little
+  noise, so the frame matches that identity in a synthetic_gallery() and
+  identities outside the gallery come back as unknown faces
+
+Everything else (decoding, downscaling, caching, batching, gallery search,
+database writes) is the real code path. The stand-ins can burn a fixed
+amount of CPU per call to stand in for the cost of the real models.
+"""
+import json
+import os
+import time
+import uuid
+from typing import Optional, Tuple, List, Dict, Any, Iterable
+
+import cv2
+import numpy as np
+
+ENCODING_DIM = 128
+
+# Distinct people in 128-d are ~1.3 apart and a probe of the same identity
+# ~0.25 from its template, well either side of the default 0.6 tolerance
+ENCODING_SCALE = 0.08
+PROBE_NOISE = 0.02
+
+# Stripe code: start marker, 24 identity bits, end marker
+CODE_START = (1, 0, 1, 1)
+CODE_END = (1, 1, 0, 1)
+CODE_ID_BITS = 24
+CODE_BITS = len(CODE_START) + CODE_ID_BITS + len(CODE_END)
+
+# First name given to every person the benchmarks insert, so they can be removed
+BENCH_FIRST_NAME = "__bench__"
+
+# Namespace of the deterministic person ids from bench_person_ids()
+BENCH_NAMESPACE = uuid.UUID("4f0c2f9e-7d1b-5a53-9a8e-2b6f1c0d3e41")
+
+# Read by install_stand_in_models() in spawned inference workers
+ENV_STAND_IN_COST_MS = "BENCH_STAND_IN_COST_MS"
+ENV_STAND_IN_SEED = "BENCH_STAND_IN_SEED"
+
+
+def identity_encoding(identity: int, seed: int = 0) -> np.ndarray:
+    """The synthetic 128-d encoding of an identity (same value in every process)"""
+    rng = np.random.default_rng([seed, identity])
+    return rng.normal(0.0, ENCODING_SCALE, ENCODING_DIM).astype(np.float32)
+
+
+def synthetic_gallery(size: int, seed: int = 0) -> np.ndarray:
+    """(size, 128) encodings of identities 0..size-1"""
+    gallery = np.empty((size, ENCODING_DIM), dtype=np.float32)
+    for identity in range(size):
+        gallery[identity] = identity_encoding(identity, seed)
+    return gallery
+
+
+def random_encodings(count: int, seed: int = 0) -> np.ndarray:
+    """Unstructured random encodings - faster than synthetic_gallery for matcher-only runs"""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, ENCODING_SCALE, (count, ENCODING_DIM)).astype(np.float32)
+
+
+def probe_encodings(gallery: np.ndarray, count: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Noisy probes of random gallery rows; returns (probes, row of each probe)"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, len(gallery), count)
+    probes = gallery[targets] + rng.normal(0.0, PROBE_NOISE, (count, ENCODING_DIM))
+    return probes.astype(np.float32), targets
+
+
+def _code_box(shape) -> Tuple[int, int, int, int]:
+    """(top, right, bottom, left) of the stripe code - the centre half of the frame"""
+    height, width = shape[:2]
+    return height // 4, width * 3 // 4, height * 3 // 4, width // 4
+
+
+def synthetic_frame(
+    identity: Optional[int],
+    width: int = 640,
+    height: int = 480,
+    quality: int = 85,
+    rng: Optional[np.random.Generator] = None
+) -> bytes:
+    """
+    A webcam-sized JPEG carrying an identity code, or no face when identity is None
+    Pass an rng to add sensor noise so consecutive frames differ byte-wise
+    """
+    frame = np.full((height, width, 3), 96, dtype=np.uint8)
+    if rng is not None:
+        noise = rng.normal(0.0, 4.0, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+    if identity is not None:
+        if not 0 <= identity < 2 ** CODE_ID_BITS:
+            raise ValueError(f"identity must fit in {CODE_ID_BITS} bits")
+        id_bits = tuple((identity >> bit) & 1 for bit in range(CODE_ID_BITS))
+        top, right, bottom, left = _code_box(frame.shape)
+        edges = np.linspace(left, right, CODE_BITS + 1).round().astype(int)
+        for bit, start, end in zip(CODE_START + id_bits + CODE_END, edges, edges[1:]):
+            frame[top:bottom, start:end] = 224 if bit else 32
+
+    success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ValueError("Failed to encode image")
+    return buffer.tobytes()
+
+
+def read_identity(img: np.ndarray, box: Optional[Tuple[int, int, int, int]] = None) -> Optional[int]:
+    """Identity coded in a frame (within box, default the frame centre), or None"""
+    top, right, bottom, left = box or _code_box(img.shape)
+    # The stripes are vertical, so a band of rows through the middle is enough
+    middle = (top + bottom) // 2
+    region = img[max(top, middle - 4):min(bottom, middle + 4), left:right]
+    if region.size == 0 or region.shape[1] < CODE_BITS:
+        return None
+
+    columns = region.mean(axis=(0, 2)) if region.ndim == 3 else region.mean(axis=0)
+    edges = np.linspace(0, len(columns), CODE_BITS + 1)
+    bits = []
+    for start, end in zip(edges, edges[1:]):
+        # Sample the middle of each stripe, away from JPEG ringing at the edges
+        lo = int(start + (end - start) / 4)
+        hi = max(int(end - (end - start) / 4), lo + 1)
+        bits.append(int(columns[lo:hi].mean() > 128))
+
+    start_bits = tuple(bits[:len(CODE_START)])
+    end_bits = tuple(bits[-len(CODE_END):])
+    if start_bits != CODE_START or end_bits != CODE_END:
+        return None
+    id_bits = bits[len(CODE_START):len(CODE_START) + CODE_ID_BITS]
+    return sum(bit << i for i, bit in enumerate(id_bits))
+
+
+def _burn_cpu(milliseconds: float):
+    """Hold the CPU (and the GIL) like a dlib call would"""
+    if milliseconds <= 0:
+        return
+    deadline = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StandInModels:
+    """Stand-in detector and encoder with the signatures of the model_registry functions"""
+
+    def __init__(self, cost_ms: float = 0.0, seed: int = 0):
+        self.cost_ms = cost_ms
+        self.seed = seed
+        self._rng = np.random.default_rng()
+
+    def face_locations(self, img: np.ndarray, number_of_times_to_upsample: int = 1, model: str = "hog"):
+        _burn_cpu(self.cost_ms / 2)
+        if read_identity(img) is None:
+            return []
+        return [_code_box(img.shape)]
+
+    def face_encodings(self, face_image: np.ndarray, known_face_locations, num_jitters: int = 1, model: str = "large"):
+        _burn_cpu(self.cost_ms / 2)
+        encodings = []
+        for box in known_face_locations:
+            identity = read_identity(face_image, box)
+            if identity is None:
+                encoding = self._rng.normal(0.0, ENCODING_SCALE, ENCODING_DIM)
+            else:
+                encoding = identity_encoding(identity, self.seed) + self._rng.normal(0.0, PROBE_NOISE, ENCODING_DIM)
+            encodings.append(encoding.astype(np.float64))
+        return encodings
+
+
+def _stand_in_worker():
+    """Inference worker setup hook installing the stand-ins"""
+    install_stand_in_models(
+        float(os.environ.get(ENV_STAND_IN_COST_MS, "0")),
+        int(os.environ.get(ENV_STAND_IN_SEED, "0"))
+    )
+
+
+def install_stand_in_models(cost_ms: float = 0.0, seed: int = 0) -> StandInModels:
+    """
+    Replace the dlib detector and encoder in this process and in inference
+    workers started after this call
+    """
+    from backend.services.inference_pool import InferencePool
+    from backend.utils import model_registry
+
+    models = StandInModels(cost_ms, seed)
+    model_registry.face_locations = models.face_locations
+    model_registry.face_encodings = models.face_encodings
+
+    # Spawned workers re-import everything; they install the stand-ins
+    # from the environment before anything else runs
+    os.environ[ENV_STAND_IN_COST_MS] = str(cost_ms)
+    os.environ[ENV_STAND_IN_SEED] = str(seed)
+    InferencePool.worker_setup = _stand_in_worker
+    return models
+
+
+def configure_app(**overrides: Any):
+    """
+    Set application settings through the environment - call before importing backend
+    Defaults suit benchmarking: no model warmup, no noisy logging
+    """
+    values = {"MODEL_WARMUP": False, "LOG_LEVEL": "WARNING", **overrides}
+    for name, value in values.items():
+        os.environ[name] = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def bench_person_ids(count: int, seed: int = 0) -> List[uuid.UUID]:
+    """Person ids for synthetic identities 0..count-1, the same in every process for a seed"""
+    return [uuid.uuid5(BENCH_NAMESPACE, f"{seed}:{identity}") for identity in range(count)]
+
+
+def insert_bench_people(
+    conn,
+    encodings: np.ndarray,
+    templates_per_person: int = 1,
+    person_ids: Optional[List[uuid.UUID]] = None
+) -> List[uuid.UUID]:
+    """
+    Insert one person per `templates_per_person` encodings with COPY and commit
+    Random person ids are used unless given; remove the people again with delete_bench_people()
+    """
+    from database.repositories import encode_face_encoding
+
+    if person_ids is None:
+        person_ids = [uuid.uuid4() for _ in range(len(encodings) // templates_per_person)]
+    with conn.cursor() as cursor:
+        with cursor.copy("COPY name (id, first_name, last_name, full_name) FROM STDIN") as copy:
+            for i, person_id in enumerate(person_ids):
+                copy.write_row((person_id, BENCH_FIRST_NAME, str(i), f"Bench {i}"))
+        with cursor.copy("COPY encoding (person_id, face_encoding) FROM STDIN") as copy:
+            for i, encoding in enumerate(encodings[:len(person_ids) * templates_per_person]):
+                copy.write_row((person_ids[i // templates_per_person], encode_face_encoding(encoding)))
+        cursor.execute("ANALYZE name")
+        cursor.execute("ANALYZE encoding")
+    conn.commit()
+    return person_ids
+
+
+def delete_bench_people(conn) -> int:
+    """Remove every benchmark person (their encodings and attendance cascade)"""
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM name WHERE first_name = %s", (BENCH_FIRST_NAME,))
+        deleted = cursor.rowcount
+    conn.commit()
+    return deleted
+
+
+# API routes exercised by the end-to-end and load benchmarks, below API_PREFIX
+ENDPOINTS = {
+    "recognize": "/face-recognition/recognize",
+    "mark": "/attendance/mark/face",
+}
+
+
+def response_outcome(status_code: int, body: Optional[Dict[str, Any]]) -> str:
+    """
+    Classify a /recognize or /mark/face response:
+    recognized, marked, already_marked, no_match or error
+    """
+    if status_code != 200 or body is None:
+        return "error"
+    if body.get("success"):
+        return "marked" if "timestamp" in body else "recognized"
+    if body.get("person_id"):
+        return "already_marked" if "already marked" in body.get("message", "") else "error"
+    return "no_match"
+
+
+def latency_summary(seconds: Iterable[float]) -> Dict[str, Any]:
+    """Count, mean and percentiles (in ms) of a list of durations in seconds"""
+    samples = np.asarray(list(seconds), dtype=np.float64) * 1000
+    if samples.size == 0:
+        return {"count": 0}
+    p50, p90, p95, p99 = np.percentile(samples, [50, 90, 95, 99])
+    return {
+        "count": int(samples.size),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(samples.max())
+    }
+
+
+def print_rows(rows: List[Dict[str, Any]], as_json: bool):
+    """One JSON object per line, or an aligned table"""
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    if not rows:
+        return
+
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+
+    def cell(value) -> str:
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    widths = {column: max(len(column), *(len(cell(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(cell(row.get(column, "")).rjust(widths[column]) for column in columns))
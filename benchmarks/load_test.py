@@ -0,0 +1,441 @@
+"""
+Load test - many webcam kiosks polling the recognition and attendance endpoints at once
+
+Each simulated kiosk behaves like WebcamCapture.vue: it posts a JPEG frame to
+POST /attendance/mark/face or POST /face-recognition/recognize every
+1/--fps seconds, without waiting for the previous response (setInterval), or
+waiting for it with --closed-loop. Kiosks start at random offsets within one
+interval. Frames are either recorded JPEGs (--frames, files or directories,
+replayed in a loop) or synthetic frames of the stand-in gallery people.
+Every frame sent is byte-unique (a random JPEG comment), like a real camera.
+With synthetic frames each answer is checked: a response counts as correct
+only if it names the person in the frame (or nobody, for strangers and empty
+frames), and the report gives the accuracy per endpoint.
+
+While the test runs, /metrics is polled for database pool and inference pool
+saturation; the report covers throughput, latency percentiles, error rates,
+response outcomes and DB pool wait times. Each /metrics scrape is answered by
+one uvicorn worker, so the harness scrapes repeatedly over new connections
+and tells the workers apart by process_start_time_seconds.
+
+Against real models and recorded frames:
+    uvicorn backend.main:app --workers 2
+    python benchmarks/load_test.py --frames recordings/ --kiosks 20
+
+Against stand-in models (synthetic frames are recognized as gallery people):
+    python benchmarks/stand_in_server.py --people 1000 --workers 2
+    python benchmarks/load_test.py --kiosks 50 --fps 0.5 --duration 60 --people 1000 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Optional, Tuple, List, Dict, Any
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import ENDPOINTS, bench_person_ids, synthetic_frame, response_outcome, latency_summary
+
+FRAME_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def load_frames(paths: List[str]) -> List[bytes]:
+    """Read recorded frames from files and directories (sorted, non-recursive)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(FRAME_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    frames = []
+    for file in files:
+        with open(file, "rb") as f:
+            frames.append(f.read())
+    return frames
+
+
+def synthetic_frames(count: int, people: int, unknown_ratio: float, no_face_ratio: float,
+                     width: int, height: int, seed: int) -> Tuple[List[bytes], List[Optional[str]]]:
+    """
+    Frames of random gallery people (identities 0..people-1), strangers, or nobody,
+    and the person_id each should be answered with (None for no match)
+    """
+    rng = np.random.default_rng(seed)
+    person_ids = bench_person_ids(people, seed)
+    frames, expected = [], []
+    for _ in range(count):
+        draw = rng.random()
+        if draw < no_face_ratio:
+            identity = None
+        elif draw < no_face_ratio + unknown_ratio:
+            identity = people + int(rng.integers(0, max(people, 1)))
+        else:
+            identity = int(rng.integers(0, people))
+        frames.append(synthetic_frame(identity, width, height, rng=rng))
+        expected.append(str(person_ids[identity]) if identity is not None and identity < people else None)
+    return frames, expected
+
+
+def unique_jpeg(frame: bytes) -> bytes:
+    """The same JPEG with a random comment segment, so no two uploads are byte-identical"""
+    if not frame.startswith(b"\xff\xd8"):
+        return frame
+    comment = os.urandom(16)
+    return frame[:2] + b"\xff\xfe" + (len(comment) + 2).to_bytes(2, "big") + comment + frame[2:]
+
+
+def parse_metrics(text: str) -> Dict[str, List[tuple]]:
+    """Prometheus text format -> {sample name: [(labels dict, value)]}"""
+    samples: Dict[str, List[tuple]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples.setdefault(name, []).append((dict(LABEL.findall(labels or "")), float(value)))
+    return samples
+
+
+def metric_value(samples: Dict[str, List[tuple]], name: str, **labels) -> Optional[float]:
+    for sample_labels, value in samples.get(name, []):
+        if all(sample_labels.get(key) == str(expected) for key, expected in labels.items()):
+            return value
+    return None
+
+
+def histogram_delta(before: Dict[float, Dict], after: Dict[float, Dict], name: str, **labels) -> Dict[str, Any]:
+    """
+    Count, mean and bucket-estimated p95 of the observations made between two
+    sets of per-worker scrapes (workers missing from either set are skipped)
+    """
+    def series(samples):
+        buckets = {}
+        for sample_labels, value in samples.get(f"{name}_bucket", []):
+            if all(sample_labels.get(key) == str(expected) for key, expected in labels.items()):
+                buckets[float(sample_labels["le"])] = value
+        total = metric_value(samples, f"{name}_sum", **labels) or 0.0
+        count = metric_value(samples, f"{name}_count", **labels) or 0.0
+        return buckets, total, count
+
+    buckets: Dict[float, float] = {}
+    total = count = 0.0
+    for worker in before.keys() & after.keys():
+        buckets_before, sum_before, count_before = series(before[worker])
+        buckets_after, sum_after, count_after = series(after[worker])
+        for bound, value in buckets_after.items():
+            buckets[bound] = buckets.get(bound, 0.0) + value - buckets_before.get(bound, 0.0)
+        total += sum_after - sum_before
+        count += count_after - count_before
+    if count <= 0:
+        return {"count": 0}
+
+    # Upper bound of the bucket holding the 95th percentile; None above the last finite bucket
+    p95 = next((bound for bound in sorted(buckets) if buckets[bound] >= 0.95 * count), None)
+    return {
+        "count": int(count),
+        "mean_ms": total / count * 1000,
+        "p95_le_ms": p95 * 1000 if p95 is not None and p95 != float("inf") else None
+    }
+
+
+class LoadTest:
+    """Simulated kiosks sharing one HTTP client, and the results they collect"""
+
+    def __init__(self, args, frames: List[bytes], expected: Optional[List[Optional[str]]] = None):
+        self.args = args
+        self.frames = frames
+        # person_id expected for each frame; None when the frames are recorded and cannot be checked
+        self.expected = expected
+        self.results: List[Dict[str, Any]] = []
+        self.late_ticks = 0
+        self.pool_samples: List[Dict[str, float]] = []
+        self.measure_from = 0.0
+
+    async def send(self, client: httpx.AsyncClient, endpoint: str, position: int):
+        url = self.args.url.rstrip("/") + self.args.api_prefix + ENDPOINTS[endpoint]
+        frame = unique_jpeg(self.frames[position])
+        body = None
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, files={"image": ("frame.jpg", frame, "image/jpeg")})
+            try:
+                body = response.json() if response.status_code == 200 else None
+            except ValueError:
+                body = None
+            outcome = response_outcome(response.status_code, body)
+            status = response.status_code
+        except httpx.TimeoutException:
+            outcome, status = "timeout", None
+        except httpx.HTTPError:
+            outcome, status = "connection_error", None
+
+        if started >= self.measure_from:
+            correct = None
+            if self.expected is not None:
+                correct = body is not None and body.get("person_id") == self.expected[position]
+            self.results.append({
+                "endpoint": endpoint,
+                "status": status,
+                "outcome": outcome,
+                "correct": correct,
+                "seconds": time.perf_counter() - started
+            })
+
+    async def kiosk(self, client: httpx.AsyncClient, number: int, deadline: float):
+        endpoint = self.args.endpoints[number % len(self.args.endpoints)]
+        interval = 1.0 / self.args.fps
+        position = random.randrange(len(self.frames))
+        next_tick = time.perf_counter() + random.uniform(0, interval)
+        pending = set()
+
+        while next_tick < deadline:
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+            frame = position % len(self.frames)
+            position += 1
+
+            if self.args.closed_loop:
+                await self.send(client, endpoint, frame)
+                # Ticks that passed while waiting for the response are dropped
+                missed = int((time.perf_counter() - next_tick) // interval)
+                self.late_ticks += missed
+                next_tick += (missed + 1) * interval
+            else:
+                task = asyncio.create_task(self.send(client, endpoint, frame))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                next_tick += interval
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def scrape(self, client: httpx.AsyncClient) -> Optional[Dict]:
+        try:
+            response = await client.get(self.args.url.rstrip("/") + "/metrics", timeout=5.0)
+            response.raise_for_status()
+            return parse_metrics(response.text)
+        except httpx.HTTPError:
+            return None
+
+    async def scrape_workers(self, client: httpx.AsyncClient) -> Dict[float, Dict]:
+        """The latest scrape of every worker reached in --metrics-scrapes attempts, by worker"""
+        snapshots = {}
+        for _ in range(self.args.metrics_scrapes):
+            samples = await self.scrape(client)
+            if samples is not None:
+                snapshots[metric_value(samples, "process_start_time_seconds") or 0.0] = samples
+        return snapshots
+
+    async def sample_pools(self, client: httpx.AsyncClient, stop: asyncio.Event):
+        while not stop.is_set():
+            samples = await self.scrape(client)
+            if samples is not None:
+                open_connections = metric_value(samples, "db_pool_connections", state="open") or 0.0
+                idle_connections = metric_value(samples, "db_pool_connections", state="idle") or 0.0
+                self.pool_samples.append({
+                    "worker": metric_value(samples, "process_start_time_seconds") or 0.0,
+                    "db_in_use": open_connections - idle_connections,
+                    "db_waiting": metric_value(samples, "db_pool_connections", state="waiting") or 0.0,
+                    "db_max": metric_value(samples, "db_pool_connections", state="max") or 0.0,
+                    "inference_in_flight": metric_value(samples, "inference_pool_in_flight") or 0.0,
+                    "inference_workers": metric_value(samples, "inference_pool_workers") or 0.0
+                })
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.args.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=self.args.kiosks)
+        # A kept-alive connection stays on one uvicorn worker, so scrapes open a new one each time
+        metrics_limits = httpx.Limits(max_keepalive_connections=0)
+        async with httpx.AsyncClient(timeout=self.args.timeout, limits=limits) as client, \
+                httpx.AsyncClient(limits=metrics_limits) as metrics_client:
+            start = time.perf_counter()
+            self.measure_from = start + self.args.warmup
+            deadline = self.measure_from + self.args.duration
+
+            kiosks = asyncio.gather(*(self.kiosk(client, number, deadline) for number in range(self.args.kiosks)))
+            # Wait out the warm-up so the metric deltas cover the measured window only
+            await asyncio.sleep(self.args.warmup)
+            metrics_before = await self.scrape_workers(metrics_client)
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(self.sample_pools(metrics_client, stop))
+
+            await kiosks
+            elapsed = time.perf_counter() - self.measure_from
+            stop.set()
+            await sampler
+            metrics_after = await self.scrape_workers(metrics_client)
+
+        return self.report(elapsed, metrics_before, metrics_after)
+
+    def report(self, elapsed: float, metrics_before: Dict[float, Dict], metrics_after: Dict[float, Dict]) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint in self.args.endpoints:
+            results = [result for result in self.results if result["endpoint"] == endpoint]
+            outcomes: Dict[str, int] = {}
+            for result in results:
+                outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+            failed = sum(outcomes.get(outcome, 0) for outcome in ("error", "timeout", "connection_error"))
+            completed = [result["seconds"] for result in results if result["status"] is not None]
+            checked = [result["correct"] for result in results if result["correct"] is not None]
+            endpoints[endpoint] = {
+                "kiosks": sum(1 for number in range(self.args.kiosks)
+                              if self.args.endpoints[number % len(self.args.endpoints)] == endpoint),
+                "requests": len(results),
+                "requests_per_s": len(completed) / elapsed if elapsed > 0 else 0.0,
+                "error_rate": failed / len(results) if results else 0.0,
+                # Share of answers naming the person in the frame; None for recorded frames
+                "accuracy": sum(checked) / len(checked) if checked else None,
+                "latency": latency_summary(completed),
+                "outcomes": outcomes
+            }
+
+        completed_total = sum(1 for result in self.results if result["status"] is not None)
+        report = {
+            "config": {
+                "url": self.args.url,
+                "kiosks": self.args.kiosks,
+                "fps": self.args.fps,
+                "offered_requests_per_s": self.args.kiosks * self.args.fps,
+                "closed_loop": self.args.closed_loop,
+                "duration_s": self.args.duration,
+                "frames": "recorded" if self.args.frames else "synthetic"
+            },
+            # Responses per second, including the drain after the last frame was sent
+            "elapsed_s": elapsed,
+            "requests_per_s": completed_total / elapsed if elapsed > 0 else 0.0,
+            "late_ticks": self.late_ticks,
+            "endpoints": endpoints
+        }
+
+        if self.pool_samples:
+            # Each sample describes the one worker that answered it
+            report["pools"] = {
+                "samples": len(self.pool_samples),
+                "workers_seen": len({sample["worker"] for sample in self.pool_samples}),
+                "db_max": max(sample["db_max"] for sample in self.pool_samples),
+                "db_in_use_mean": float(np.mean([sample["db_in_use"] for sample in self.pool_samples])),
+                "db_in_use_peak": max(sample["db_in_use"] for sample in self.pool_samples),
+                "db_waiting_peak": max(sample["db_waiting"] for sample in self.pool_samples),
+                "inference_workers": max(sample["inference_workers"] for sample in self.pool_samples),
+                "inference_in_flight_peak": max(sample["inference_in_flight"] for sample in self.pool_samples)
+            }
+        if metrics_before and metrics_after:
+            report["metrics_workers"] = len(metrics_before.keys() & metrics_after.keys())
+            report["db_pool_wait"] = histogram_delta(metrics_before, metrics_after, "db_pool_wait_seconds")
+            report["db_query"] = histogram_delta(metrics_before, metrics_after, "db_query_seconds")
+            report["stages"] = {
+                stage: histogram_delta(metrics_before, metrics_after, "recognition_stage_seconds", stage=stage)
+                for stage in ("decode", "detect", "encode", "search")
+            }
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    config = report["config"]
+    print(
+        f"{config['kiosks']} kiosks x {config['fps']} fps ({config['offered_requests_per_s']:.1f} req/s offered,"
+        f" {'closed' if config['closed_loop'] else 'open'} loop, {config['frames']} frames)"
+        f" for {config['duration_s']:.0f} s against {config['url']}"
+    )
+    drain = report["elapsed_s"] - config["duration_s"]
+    print(f"Throughput: {report['requests_per_s']:.1f} responses/s"
+          + (f" ({drain:.1f} s waiting for the last responses)" if drain >= 1 else "")
+          + (f", {report['late_ticks']} frames dropped while waiting" if config["closed_loop"] else ""))
+    print()
+    print(f"{'endpoint':<10}{'kiosks':>7}{'requests':>9}{'req/s':>8}{'errors':>8}{'correct':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  outcomes")
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency"]
+        percentiles = "".join(
+            f"{latency[key]:>9.1f}" if key in latency else f"{'-':>9}"
+            for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+        )
+        outcomes = ", ".join(f"{name} {count}" for name, count in sorted(stats["outcomes"].items()))
+        accuracy = f"{stats['accuracy']:>9.1%}" if stats["accuracy"] is not None else f"{'-':>9}"
+        print(f"{endpoint:<10}{stats['kiosks']:>7}{stats['requests']:>9}{stats['requests_per_s']:>8.1f}"
+              f"{stats['error_rate']:>8.1%}{accuracy}{percentiles}  {outcomes}")
+
+    if "pools" in report:
+        pools = report["pools"]
+        print()
+        print(f"DB pool (per worker, {pools['workers_seen']} seen): {pools['db_in_use_mean']:.1f} in use on average,"
+              f" peak {pools['db_in_use_peak']:.0f} of {pools['db_max']:.0f}, peak {pools['db_waiting_peak']:.0f} requests waiting")
+        print(f"Inference pool (per worker): {pools['inference_workers']:.0f} processes,"
+              f" peak {pools['inference_in_flight_peak']:.0f} jobs in flight")
+    if report.get("db_pool_wait", {}).get("count"):
+        wait = report["db_pool_wait"]
+        p95 = f"<= {wait['p95_le_ms']:.1f} ms" if wait["p95_le_ms"] is not None else "above the largest bucket"
+        print(f"DB pool wait ({report['metrics_workers']} worker(s)): {wait['count']} checkouts,"
+              f" mean {wait['mean_ms']:.2f} ms, p95 {p95}")
+    if report.get("db_query", {}).get("count"):
+        query = report["db_query"]
+        print(f"DB queries: {query['count']} statements, mean {query['mean_ms']:.2f} ms")
+    stages = {stage: stats for stage, stats in report.get("stages", {}).items() if stats.get("count")}
+    if stages:
+        print("Stages: " + ", ".join(f"{stage} {stats['mean_ms']:.1f} ms" for stage, stats in stages.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-prefix", default="/api/v1")
+    parser.add_argument("--kiosks", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=0.5, help="Frames per second per kiosk (WebcamCapture polls every 2 s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--endpoints", nargs="+", default=["mark"], choices=list(ENDPOINTS),
+                        help="Endpoints, assigned to kiosks round-robin")
+    parser.add_argument("--closed-loop", action="store_true", help="Wait for each response before the next frame")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--frames", nargs="+", help="Recorded JPEG/PNG frames or directories of them")
+    parser.add_argument("--people", type=int, default=1000,
+                        help="Gallery people shown in synthetic frames (--people and --seed as given to stand_in_server.py)")
+    parser.add_argument("--unknown-ratio", type=float, default=0.1)
+    parser.add_argument("--no-face-ratio", type=float, default=0.1)
+    parser.add_argument("--frame-pool", type=int, default=200, help="Distinct synthetic frames to generate")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between /metrics samples")
+    parser.add_argument("--metrics-scrapes", type=int, default=8,
+                        help="Scrapes before and after the run, to reach every uvicorn worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.kiosks < 1 or args.fps <= 0:
+        parser.error("--kiosks and --fps must be positive")
+
+    random.seed(args.seed)
+    if args.frames:
+        frames, expected = load_frames(args.frames), None
+        if not frames:
+            parser.error("no frames found")
+    else:
+        frames, expected = synthetic_frames(args.frame_pool, args.people, args.unknown_ratio, args.no_face_ratio,
+                                            args.width, args.height, args.seed)
+
+    report = asyncio.run(LoadTest(args, frames, expected).run())
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
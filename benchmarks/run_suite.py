@@ -0,0 +1,150 @@
+"""
+Benchmark suite runner - runs every synthetic benchmark and saves one JSON result file
+
+Runs bench_matcher.py, bench_api.py and bench_attendance.py (each in a fresh
+interpreter, with --json) and writes their rows together with the git commit,
+machine to <output-dir>/<commit>.json. Two result files can then
+be compared metric by metric:
+
+    python benchmarks/run_suite.py                          # full suite
+    python benchmarks/run_suite.py --quick                  # smaller sizes, under a minute
+    python benchmarks/run_suite.py --only matcher           # no database needed
+    python benchmarks/run_suite.py --compare data/benchmarks/abc1234.json data/benchmarks/def5678.json
+
+bench_api.py and bench_attendance.py need the database from .env (or DB_*
+environment variables); they insert and then remove their own people.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = {
+    "matcher": ("bench_matcher.py", ["--sizes", "100", "1000", "10000", "--queries", "300"]),
+    "api": ("bench_api.py", ["--sizes", "100", "1000", "--requests", "100"]),
+    "attendance": ("bench_attendance.py", ["--people", "500"]),
+}
+
+# Compared metrics and whether a higher value is better
+METRICS = {
+    "queries_per_s": True,
+    "requests_per_s": True,
+    "marks_per_s": True,
+    "accuracy": True,
+    "ms_per_query": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+# Row fields that are results rather than part of what was measured
+RESULT_FIELDS = set(METRICS) | {"count", "mean_ms", "p90_ms", "max_ms", "build_s", "outcomes"}
+
+
+def git_revision() -> dict:
+    def git(*args) -> str:
+        result = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "subject": git("log", "-1", "--format=%s"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))
+    }
+
+
+def run_benchmark(name: str, quick: bool) -> list:
+    script, quick_args = BENCHMARKS[name]
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", script), "--json"]
+    if quick:
+        command += quick_args
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} failed:\n{result.stderr.strip()}")
+    return [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+
+
+def row_key(row: dict) -> tuple:
+    return tuple(sorted((name, json.dumps(value)) for name, value in row.items() if name not in RESULT_FIELDS))
+
+
+def compare(base_path: str, new_path: str):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    base_rows = {row_key(row): row for row in base["results"]}
+    lines = []
+    for row in new["results"]:
+        previous = base_rows.get(row_key(row))
+        if previous is None:
+            continue
+        label = " ".join(
+            [row.get("benchmark", "")]
+            + [f"{name}={json.loads(value)}" for name, value in row_key(row) if name != "benchmark"]
+        )
+        for metric, higher_is_better in METRICS.items():
+            if metric not in row or metric not in previous or not previous[metric]:
+                continue
+            change = (row[metric] - previous[metric]) / previous[metric] * 100
+            # Flag changes of 5% or more as better (+) or worse (-)
+            flag = "" if abs(change) < 5 else "+" if (change > 0) == higher_is_better else "-"
+            lines.append((label, metric, previous[metric], row[metric], change, flag))
+
+    width = max([len(line[0]) for line in lines] + [len("benchmark")])
+    print(f"base {base['revision']['commit']} ({base['revision']['subject']})")
+    print(f"new  {new['revision']['commit']} ({new['revision']['subject']})")
+    print(f"{'benchmark':<{width}}{'metric':>16}{'base':>12}{'new':>12}{'change':>10}")
+    for label, metric, before, after, change, flag in lines:
+        print(f"{label:<{width}}{metric:>16}{before:>12.3f}{after:>12.3f}{change:>+9.1f}% {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller galleries and fewer requests")
+    parser.add_argument("--output-dir", default="./data/benchmarks")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    revision = git_revision()
+    results = []
+    started = time.time()
+    for name in args.only or list(BENCHMARKS):
+        print(f"Running {name}...", file=sys.stderr)
+        results.extend(run_benchmark(name, args.quick))
+
+    report = {
+        "revision": revision,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+        "duration_s": time.time() - started,
+        "quick": args.quick,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    suffix = "-dirty" if revision["dirty"] else ""
+    path = os.path.join(args.output_dir, f"{revision['commit']}{suffix}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {path}")
+
+
+if __name__ == "__main__":
+    main()
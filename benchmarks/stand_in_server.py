@@ -0,0 +1,94 @@
+"""
+Run the API with stand-in face models and a synthetic gallery, for load testing
+
+Inserts --people synthetic people into the configured Postgres, then serves
+backend.main:app with uvicorn. Every uvicorn worker (and every inference
+worker it starts) uses the stand-in detector and encoder from
+benchmarks/common.py, so synthetic frames from benchmarks/load_test.py are
+recognized as those people and each recognition costs --cost-ms of CPU
+instead of running dlib. People get the ids from bench_person_ids(), so the
+load test can check every answer. The recognition cache is off unless --cache
+is given, so every request runs detection, encoding and search. The people are
+removed again on shutdown.
+
+Usage:
+    python benchmarks/stand_in_server.py
+    python benchmarks/stand_in_server.py --people 5000 --workers 4 --inference-workers 0 --cost-ms 60
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    ENV_STAND_IN_COST_MS,
+    ENV_STAND_IN_SEED,
+    configure_app,
+    install_stand_in_models,
+    synthetic_gallery,
+    bench_person_ids,
+    insert_bench_people,
+    delete_bench_people
+)
+
+
+def create_app():
+    """uvicorn app factory - runs in every uvicorn worker process"""
+    install_stand_in_models(
+        float(os.environ.get(ENV_STAND_IN_COST_MS, "0")),
+        int(os.environ.get(ENV_STAND_IN_SEED, "0"))
+    )
+    from backend.main import app
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=1000, help="Synthetic people in the gallery")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--inference-workers", type=int, default=None,
+                        help="INFERENCE_WORKERS per uvicorn worker (default: from settings)")
+    parser.add_argument("--cost-ms", type=float, default=50.0,
+                        help="CPU burnt per stand-in detection + encoding (HOG + encoder on a webcam frame is ~50 ms)")
+    parser.add_argument("--cache", action="store_true", help="Keep the recognition cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    overrides = {"LOG_LEVEL": "INFO"}
+    if args.inference_workers is not None:
+        overrides["INFERENCE_WORKERS"] = args.inference_workers
+    if not args.cache:
+        overrides["RECOGNITION_CACHE_SIZE"] = 0
+    configure_app(**overrides)
+    os.environ[ENV_STAND_IN_COST_MS] = str(args.cost_ms)
+    os.environ[ENV_STAND_IN_SEED] = str(args.seed)
+
+    import uvicorn
+    from database.db import get_connection, close_connection
+
+    conn = get_connection()
+    try:
+        delete_bench_people(conn)
+        insert_bench_people(
+            conn,
+            synthetic_gallery(args.people, args.seed),
+            person_ids=bench_person_ids(args.people, args.seed)
+        )
+        print(f"Inserted {args.people} synthetic people; serving on http://{args.host}:{args.port}")
+        uvicorn.run(
+            "benchmarks.stand_in_server:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers
+        )
+    finally:
+        delete_bench_people(conn)
+        close_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Attendance retention - archives old monthly partitions to compressed CSV files
+
+Every monthly partition of `attendance` older than the retention window is
+copied to <output-dir>/attendance_YYYY_MM.csv.gz, then detached and dropped.
+Copy, detach and drop run in one transaction that commits only after the file
+is safely on disk, so a failed run leaves the partition in place. Future
+partitions are created on every run, so this is suitable for a monthly cron.
+
+To restore a month:
+    SELECT create_attendance_partition('2024-01-01');
+    gunzip -c attendance_2024_01.csv.gz | psql -c "\\copy attendance FROM STDIN WITH (FORMAT csv, HEADER)"
+
+Usage:
+    python database/archive_attendance.py
+    python database/archive_attendance.py --keep-months 12 --output-dir ./archive/attendance
+    python database/archive_attendance.py --dry-run
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg import sql
+
+from backend.config import settings
+from database.db import get_connection, close_connection
+
+PARTITION_NAME = re.compile(r"^attendance_p(\d{4})_(\d{2})$")
+
+
+def list_partitions(conn) -> list:
+    """(month, partition name) for every monthly attendance partition, oldest first"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'attendance'::regclass
+            """
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def retention_cutoff(keep_months: int, today: date = None) -> date:
+    """First day of the oldest month kept online (the current month counts as one)"""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - max(keep_months - 1, 0)
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def archive_partition(conn, name: str, path: str) -> int:
+    """
+    Copy a partition to a gzip CSV file, then detach and drop it
+    Returns number of rows archived
+    """
+    partial_path = path + ".partial"
+    rows = 0
+    with conn.transaction():
+        with conn.cursor() as cursor:
+            # Block writers to the month while it is copied
+            cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(sql.Identifier(name)))
+
+            copy_sql = sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(name))
+            with gzip.open(partial_path, "wb") as archive:
+                with cursor.copy(copy_sql) as copy:
+                    for data in copy:
+                        archive.write(data)
+                rows = max(cursor.rowcount, 0)
+            with open(partial_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(partial_path, path)
+
+            cursor.execute(sql.SQL("ALTER TABLE attendance DETACH PARTITION {}").format(sql.Identifier(name)))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=settings.ATTENDANCE_RETENTION_MONTHS,
+                        help="Months kept online, including the current one")
+    parser.add_argument("--months-ahead", type=int, default=settings.ATTENDANCE_PARTITION_MONTHS_AHEAD,
+                        help="Future monthly partitions to create")
+    parser.add_argument("--output-dir", default="./archive/attendance")
+    parser.add_argument("--dry-run", action="store_true", help="List partitions that would be archived")
+    args = parser.parse_args()
+
+    if args.keep_months < 1:
+        parser.error("--keep-months must be at least 1")
+
+    try:
+        conn = get_connection()
+
+        if args.dry_run:
+            print(f"Would create missing partitions up to {args.months_ahead} month(s) ahead")
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT ensure_attendance_partitions(%s)", (args.months_ahead,))
+                created = cursor.fetchone()[0]
+            print(f"Created {created} future partition(s)")
+
+        cutoff = retention_cutoff(args.keep_months)
+        expired = [(month, name) for month, name in list_partitions(conn) if month < cutoff]
+        print(f"Keeping months from {cutoff:%Y-%m}; {len(expired)} partition(s) to archive")
+
+        if not args.dry_run:
+            os.makedirs(args.output_dir, exist_ok=True)
+
+        for month, name in expired:
+            path = os.path.join(args.output_dir, f"attendance_{month:%Y_%m}.csv.gz")
+            if args.dry_run:
+                print(f"  would archive {name} -> {path}")
+                continue
+            rows = archive_partition(conn, name, path)
+            print(f"  archived {name}: {rows} row(s) -> {path}")
+
+        close_connection(conn)
+        print("✅ Archival completed successfully!")
+
+    except Exception as e:
+        print(f"Archival failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
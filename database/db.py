@@ -4,13 +4,37 @@ Database connection manager (psycopg v3)
 from contextlib import contextmanager
 import sys
 import os
+import time
 import psycopg
 from psycopg_pool import ConnectionPool
 
 # Add backend to path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config.settings import settings
+from backend.utils.metrics import registry
+
+db_query_seconds = registry.histogram("db_query_seconds", "Time spent executing SQL statements on pooled connections")
+db_pool_wait_seconds = registry.histogram("db_pool_wait_seconds", "Time spent waiting for a connection from the pool")
+
+
+class TimedCursor(psycopg.Cursor):
+    """Cursor that records statement execution time in db_query_seconds"""
+
+    def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            db_query_seconds.observe(time.perf_counter() - started)
+
+    def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            db_query_seconds.observe(time.perf_counter() - started)
 
 
 class DatabaseManager:
@@ -32,7 +56,12 @@ class DatabaseManager:
     def initialize_pool(cls, minconn: int = 1, maxconn: int = 10):
         """Initialize the connection pool"""
         if cls._pool is None:
-            cls._pool = ConnectionPool(conninfo=cls._dsn(), min_size=minconn, max_size=maxconn)
+            cls._pool = ConnectionPool(
+                conninfo=cls._dsn(),
+                min_size=minconn,
+                max_size=maxconn,
+                kwargs={"cursor_factory": TimedCursor}
+            )
 
     @classmethod
     def get_connection(cls):
@@ -40,7 +69,8 @@ class DatabaseManager:
         if cls._pool is None:
             cls.initialize_pool()
         # psycopg_pool returns a connection via getconn()
-        return cls._pool.getconn()
+        with db_pool_wait_seconds.time():
+            return cls._pool.getconn()
 
     @classmethod
     def return_connection(cls, conn):
@@ -48,6 +78,19 @@ class DatabaseManager:
         if cls._pool is not None and conn is not None:
             cls._pool.putconn(conn)
 
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Connections by state: max, open, idle, and requests waiting for one"""
+        if cls._pool is None:
+            return {"max": 0, "open": 0, "idle": 0, "waiting": 0}
+        stats = cls._pool.get_stats()
+        return {
+            "max": cls._pool.max_size,
+            "open": stats.get("pool_size", 0),
+            "idle": stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0)
+        }
+
     @classmethod
     def close_all_connections(cls):
         """Close all connections in the pool"""
@@ -66,6 +109,14 @@ def get_db_connection():
         DatabaseManager.return_connection(conn)
 
 
+registry.gauge(
+    "db_pool_connections",
+    "Database pool connections by state; waiting > 0 means the pool is saturated",
+    ("state",),
+    function=DatabaseManager.pool_stats
+)
+
+
 # Legacy function for backward compatibility
 def get_connection():
     """Get a database connection (legacy method)"""
@@ -0,0 +1,25 @@
+-- Convert encoding.face_encoding from JSONB text to packed float32 BYTEA.
+-- float4send() emits network byte order, matching encode_face_encoding().
+DO $$
+BEGIN
+    IF (
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'encoding' AND column_name = 'face_encoding'
+    ) = 'jsonb' THEN
+        ALTER TABLE encoding ADD COLUMN face_encoding_bin BYTEA;
+
+        UPDATE encoding e SET face_encoding_bin = (
+            SELECT string_agg(float4send(v.value::float4), ''::bytea ORDER BY v.ord)
+            FROM jsonb_array_elements_text(
+                -- Some rows were written as a JSON string holding the array
+                CASE jsonb_typeof(e.face_encoding)
+                    WHEN 'string' THEN (e.face_encoding #>> '{}')::jsonb
+                    ELSE e.face_encoding
+                END
+            ) WITH ORDINALITY AS v(value, ord)
+        );
+
+        ALTER TABLE encoding DROP COLUMN face_encoding;
+        ALTER TABLE encoding RENAME COLUMN face_encoding_bin TO face_encoding;
+    END IF;
+END $$;
@@ -0,0 +1,51 @@
+-- Optional pgvector support for server-side nearest-neighbour search
+-- (EncodingRepository.find_nearest). Skipped with a notice when the
+-- extension is not installed; the repository then falls back to scanning
+-- encodings in Python.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'vector') THEN
+        RAISE NOTICE 'pgvector is not installed - skipping encoding.embedding';
+        RETURN;
+    END IF;
+
+    CREATE EXTENSION IF NOT EXISTS vector;
+
+    -- Decode the packed network-order float32 BYTEA written by the application
+    CREATE OR REPLACE FUNCTION face_encoding_to_float4(data BYTEA) RETURNS float4[] AS $fn$
+        SELECT array_agg(
+            (CASE WHEN bits >> 31 = 1 THEN -1 ELSE 1 END) *
+            (CASE WHEN (bits >> 23) & 255 = 0
+                THEN (bits & 8388607) * 2 ^ -149
+                ELSE (1 + (bits & 8388607) / 8388608.0) * 2 ^ (((bits >> 23) & 255) - 127)
+            END)::float4
+            ORDER BY i
+        )
+        FROM (
+            SELECT i, (get_byte(data, i)::bigint << 24) | (get_byte(data, i + 1) << 16)
+                    | (get_byte(data, i + 2) << 8) | get_byte(data, i + 3) AS bits
+            FROM generate_series(0, length(data) - 4, 4) AS i
+        ) words
+    $fn$ LANGUAGE SQL IMMUTABLE STRICT;
+
+    ALTER TABLE encoding ADD COLUMN IF NOT EXISTS embedding vector(128);
+
+    -- Keep the vector column in sync with face_encoding for every writer
+    CREATE OR REPLACE FUNCTION sync_encoding_embedding() RETURNS trigger AS $fn$
+    BEGIN
+        NEW.embedding := face_encoding_to_float4(NEW.face_encoding)::vector;
+        RETURN NEW;
+    END;
+    $fn$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS encoding_embedding_sync ON encoding;
+    CREATE TRIGGER encoding_embedding_sync
+        BEFORE INSERT OR UPDATE OF face_encoding ON encoding
+        FOR EACH ROW EXECUTE FUNCTION sync_encoding_embedding();
+
+    UPDATE encoding SET embedding = face_encoding_to_float4(face_encoding)::vector
+    WHERE embedding IS NULL AND face_encoding IS NOT NULL;
+
+    CREATE INDEX IF NOT EXISTS encoding_embedding_hnsw_idx
+        ON encoding USING hnsw (embedding vector_l2_ops);
+END $$;
@@ -0,0 +1,19 @@
+-- One attendance record per person per day, enforced by the schema so that
+-- concurrent workers cannot double-mark. attendance_date is written by the
+-- application together with timestamp; existing rows are backfilled and
+-- duplicate marks collapsed onto the earliest record of the day.
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS attendance_date DATE;
+
+UPDATE attendance SET attendance_date = timestamp::date WHERE attendance_date IS NULL;
+
+DELETE FROM attendance a
+USING attendance b
+WHERE a.person_id = b.person_id
+  AND a.attendance_date = b.attendance_date
+  AND (a.timestamp, a.id) > (b.timestamp, b.id);
+
+ALTER TABLE attendance ALTER COLUMN attendance_date SET DEFAULT CURRENT_DATE;
+ALTER TABLE attendance ALTER COLUMN attendance_date SET NOT NULL;
+
+ALTER TABLE attendance
+    ADD CONSTRAINT attendance_person_date_key UNIQUE (person_id, attendance_date);
@@ -0,0 +1,7 @@
+-- Indexes behind the half-open timestamp range queries in AttendanceRepository
+-- and the per-person lookups / cascading deletes on encoding and images.
+-- (Migrations run in a transaction, so these are built without CONCURRENTLY.)
+CREATE INDEX IF NOT EXISTS attendance_timestamp_idx ON attendance (timestamp);
+CREATE INDEX IF NOT EXISTS attendance_person_timestamp_idx ON attendance (person_id, timestamp);
+CREATE INDEX IF NOT EXISTS encoding_person_id_idx ON encoding (person_id);
+CREATE INDEX IF NOT EXISTS images_person_id_idx ON images (person_id);
@@ -0,0 +1,112 @@
+-- Monthly range partitions for attendance, keyed on attendance_date.
+--
+-- Partitions are named attendance_pYYYY_MM. ensure_attendance_partitions()
+-- creates the ones up to N months ahead; the application calls it at startup
+-- and database/archive_attendance.py calls it on every run. Rows outside every
+-- monthly partition land in attendance_default instead of failing, and are
+-- moved out when their month's partition is created. Old months are detached
+-- and archived with database/archive_attendance.py.
+
+CREATE OR REPLACE FUNCTION create_attendance_partition(month DATE) RETURNS TEXT AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month)::date;
+    end_date DATE := (date_trunc('month', month) + INTERVAL '1 month')::date;
+    partition_name TEXT := format('attendance_p%s', to_char(start_date, 'YYYY_MM'));
+    has_default BOOLEAN := to_regclass('attendance_default') IS NOT NULL;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF has_default AND EXISTS (
+        SELECT 1 FROM attendance_default
+        WHERE attendance_date >= start_date AND attendance_date < end_date
+    ) THEN
+        -- Move the month's stray rows out of the default partition
+        ALTER TABLE attendance DETACH PARTITION attendance_default;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF attendance FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+        EXECUTE format(
+            'INSERT INTO %I SELECT * FROM attendance_default WHERE attendance_date >= %L AND attendance_date < %L',
+            partition_name, start_date, end_date
+        );
+        DELETE FROM attendance_default WHERE attendance_date >= start_date AND attendance_date < end_date;
+        ALTER TABLE attendance ATTACH PARTITION attendance_default DEFAULT;
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF attendance FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+    END IF;
+
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_attendance_partitions(months_ahead INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    month DATE;
+    created INTEGER := 0;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', CURRENT_DATE),
+            date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead),
+            INTERVAL '1 month'
+        )::date
+    LOOP
+        IF to_regclass(format('attendance_p%s', to_char(month, 'YYYY_MM'))) IS NULL THEN
+            PERFORM create_attendance_partition(month);
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'attendance'::regclass) THEN
+        RETURN;
+    END IF;
+
+    -- Free the constraint and index names for the partitioned table
+    ALTER TABLE attendance RENAME TO attendance_unpartitioned;
+    ALTER TABLE attendance_unpartitioned RENAME CONSTRAINT attendance_pkey TO attendance_unpartitioned_pkey;
+    ALTER TABLE attendance_unpartitioned DROP CONSTRAINT attendance_person_date_key;
+    ALTER TABLE attendance_unpartitioned DROP CONSTRAINT attendance_person_id_fkey;
+    DROP INDEX IF EXISTS attendance_timestamp_idx;
+    DROP INDEX IF EXISTS attendance_person_timestamp_idx;
+
+    -- Unique keys on a partitioned table must include the partition key
+    CREATE TABLE attendance (
+        id UUID NOT NULL DEFAULT uuid_generate_v4(),
+        person_id UUID,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        attendance_date DATE NOT NULL DEFAULT CURRENT_DATE,
+        CONSTRAINT attendance_pkey PRIMARY KEY (id, attendance_date),
+        CONSTRAINT attendance_person_date_key UNIQUE (person_id, attendance_date),
+        CONSTRAINT attendance_person_id_fkey FOREIGN KEY (person_id) REFERENCES name(id) ON DELETE CASCADE
+    ) PARTITION BY RANGE (attendance_date);
+
+    CREATE INDEX attendance_timestamp_idx ON attendance (timestamp);
+    CREATE INDEX attendance_person_timestamp_idx ON attendance (person_id, timestamp);
+
+    CREATE TABLE attendance_default PARTITION OF attendance DEFAULT;
+
+    FOR month IN
+        SELECT DISTINCT date_trunc('month', attendance_date)::date FROM attendance_unpartitioned
+    LOOP
+        PERFORM create_attendance_partition(month);
+    END LOOP;
+    PERFORM ensure_attendance_partitions(3);
+
+    INSERT INTO attendance (id, person_id, timestamp, attendance_date)
+    SELECT id, person_id, timestamp, attendance_date FROM attendance_unpartitioned;
+
+    DROP TABLE attendance_unpartitioned;
+END $$;
@@ -1,3 +1,20 @@
-from .base_repository import PersonRepository, EncodingRepository, ImageRepository
+from .base_repository import (
+    PersonRepository,
+    EncodingRepository,
+    ImageRepository,
+    GALLERY_CHANNEL,
+    encode_face_encoding,
+    decode_face_encoding
+)
+from .attendance_presence import AttendancePresence, attendance_presence
 
-__all__ = ["PersonRepository", "EncodingRepository", "ImageRepository"]
+__all__ = [
+    "PersonRepository",
+    "EncodingRepository",
+    "ImageRepository",
+    "GALLERY_CHANNEL",
+    "encode_face_encoding",
+    "decode_face_encoding",
+    "AttendancePresence",
+    "attendance_presence"
+]
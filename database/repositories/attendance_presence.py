@@ -0,0 +1,68 @@
+"""
+Per-day attendance presence set - who has already been marked today
+
+Kept in memory so the "already marked today" check on every recognition
+needs no database round trip. The set is warmed from the database at
+startup and starts empty again when the date rolls over. Marks made by
+other worker processes are not seen here; the UNIQUE (person_id,
+attendance_date) constraint turns those into conflicts on insert, and the
+repository adds the person to the set when that happens.
+"""
+import threading
+from datetime import date
+from typing import Iterable, Set
+from uuid import UUID
+
+
+class AttendancePresence:
+    """Person ids marked present on the current day (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = date.today()
+        self._present: Set[UUID] = set()
+        self._warm = False
+
+    @property
+    def is_warm(self) -> bool:
+        """True once loaded from the database; until then callers ask the database"""
+        return self._warm
+
+    def warm(self, conn) -> int:
+        """Load today's marked people from the database, replacing the current set"""
+        today = date.today()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT person_id FROM attendance WHERE attendance_date = %s",
+                (today,)
+            )
+            present = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+
+        with self._lock:
+            self._day = today
+            self._present = present
+            self._warm = True
+        return len(present)
+
+    def contains(self, person_id: UUID) -> bool:
+        with self._lock:
+            self._roll_over()
+            return person_id in self._present
+
+    def add(self, person_ids: Iterable[UUID], day: date):
+        """Record people as marked on `day` (ignored if the day has already rolled over)"""
+        with self._lock:
+            self._roll_over()
+            if day == self._day:
+                self._present.update(person_ids)
+
+    def _roll_over(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._present = set()
+
+
+# Global presence set, warmed from the application lifespan
+attendance_presence = AttendancePresence()
@@ -1,11 +1,19 @@
 """
 Attendance repository for tracking attendance records
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from psycopg.rows import dict_row
 
+from database.repositories.attendance_presence import attendance_presence
+
+
+def day_range(day: date) -> Tuple[datetime, datetime]:
+    """[start, end) timestamps covering one calendar day"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
 
 class AttendanceRepository:
     """Repository for attendance-related database operations"""
@@ -13,40 +21,77 @@ class AttendanceRepository:
     def __init__(self, conn):
         self.conn = conn
     
-    def mark_attendance(self, person_id: UUID) -> UUID:
-        """Mark attendance for a person"""
+    def mark_attendance_if_absent(self, person_id: UUID) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Mark attendance for a person unless they are already marked today, in one statement
+        Returns (record, duplicate): the new record, or today's existing record when
+        duplicate is True. The existing record can be None if it was committed by a
+        concurrent transaction after this statement started.
+        """
         try:
             query = """
-                INSERT INTO attendance (person_id, timestamp)
-                VALUES (%s, %s)
-                RETURNING id
+                WITH inserted AS (
+                    INSERT INTO attendance (person_id, timestamp, attendance_date)
+                    VALUES (%(person_id)s, %(timestamp)s, %(date)s)
+                    ON CONFLICT (person_id, attendance_date) DO NOTHING
+                    RETURNING id, person_id, timestamp
+                )
+                SELECT id, person_id, timestamp, FALSE AS duplicate FROM inserted
+                UNION ALL
+                SELECT id, person_id, timestamp, TRUE AS duplicate FROM attendance
+                WHERE person_id = %(person_id)s AND attendance_date = %(date)s
+                  AND NOT EXISTS (SELECT 1 FROM inserted)
             """
-            with self.conn.cursor() as cursor:
-                cursor.execute(query, (person_id, datetime.now()))
-                attendance_id = cursor.fetchone()[0]
+            now = datetime.now()
+            with self.conn.cursor(row_factory=dict_row) as cursor:
+                cursor.execute(query, {"person_id": person_id, "timestamp": now, "date": now.date()})
+                row = cursor.fetchone()
             self.conn.commit()
-            return attendance_id
+            # Marked either now or earlier (possibly by another worker)
+            attendance_presence.add([person_id], now.date())
+            if row is None:
+                return None, True
+            duplicate = row.pop("duplicate")
+            return row, duplicate
         except Exception as e:
             self.conn.rollback()
             raise e
     
-    def get_today_attendance(self) -> List[Dict[str, Any]]:
-        """Get all attendance records for today"""
+    def mark_attendance_many(self, person_ids: List[UUID]) -> List[Dict[str, Any]]:
+        """
+        Mark attendance for several people in one statement, skipping anyone already marked today
+        Returns the inserted rows (id, person_id, timestamp)
+        """
         try:
+            query = """
+                INSERT INTO attendance (person_id, timestamp, attendance_date)
+                SELECT p.person_id, %s, %s
+                FROM unnest(%s::uuid[]) AS p(person_id)
+                ON CONFLICT (person_id, attendance_date) DO NOTHING
+                RETURNING id, person_id, timestamp
+            """
+            # People already known to be present need no insert attempt
+            unique_ids = [
+                person_id for person_id in dict.fromkeys(person_ids)
+                if not (attendance_presence.is_warm and attendance_presence.contains(person_id))
+            ]
+            if not unique_ids:
+                return []
+            now = datetime.now()
             with self.conn.cursor(row_factory=dict_row) as cursor:
-                cursor.execute(
-                    """
-                    SELECT a.*, n.first_name, n.last_name, n.full_name
-                    FROM attendance a
-                    JOIN name n ON a.person_id = n.id
-                    WHERE DATE(a.timestamp) = CURRENT_DATE
-                    ORDER BY a.timestamp DESC
-                    """
-                )
-                return cursor.fetchall()
+                cursor.execute(query, (now, now.date(), unique_ids))
+                rows = cursor.fetchall()
+            self.conn.commit()
+            attendance_presence.add(unique_ids, now.date())
+            return rows
         except Exception as e:
+            self.conn.rollback()
             raise e
     
+    def get_today_attendance(self) -> List[Dict[str, Any]]:
+        """Get all attendance records for today"""
+        return self.get_attendance_by_date(date.today())
+    
     def get_attendance_by_date(self, target_date: date) -> List[Dict[str, Any]]:
         """Get attendance records for a specific date"""
         try:
@@ -56,10 +101,11 @@ class AttendanceRepository:
                     SELECT a.*, n.first_name, n.last_name, n.full_name
                     FROM attendance a
                     JOIN name n ON a.person_id = n.id
-                    WHERE DATE(a.timestamp) = %s
+                    WHERE a.attendance_date = %s
+                      AND a.timestamp >= %s AND a.timestamp < %s
                     ORDER BY a.timestamp DESC
                     """,
-                    (target_date,)
+                    (target_date, *day_range(target_date))
                 )
                 return cursor.fetchall()
         except Exception as e:
@@ -76,13 +122,15 @@ class AttendanceRepository:
             """
             params = [person_id]
             
+            # Half-open timestamp bounds so the (person_id, timestamp) index is used,
+            # plus attendance_date bounds so only the covered monthly partitions are scanned
             if start_date:
-                query += " AND DATE(a.timestamp) >= %s"
-                params.append(start_date)
+                query += " AND a.attendance_date >= %s AND a.timestamp >= %s"
+                params.extend([start_date, day_range(start_date)[0]])
             
             if end_date:
-                query += " AND DATE(a.timestamp) <= %s"
-                params.append(end_date)
+                query += " AND a.attendance_date <= %s AND a.timestamp < %s"
+                params.extend([end_date, day_range(end_date)[1]])
             
             query += " ORDER BY a.timestamp DESC"
             
@@ -92,18 +140,70 @@ class AttendanceRepository:
         except Exception as e:
             raise e
     
+    def iter_attendance_range(
+        self,
+        start_date: date,
+        end_date: date,
+        batch_size: int = 2000
+    ) -> Iterator[Tuple[str, datetime]]:
+        """
+        Stream (full_name, timestamp) for every record from start_date to end_date inclusive,
+        newest first, through a server-side cursor fetching batch_size rows at a time
+        """
+        query = """
+            SELECT n.full_name, a.timestamp
+            FROM attendance a
+            JOIN name n ON a.person_id = n.id
+            WHERE a.attendance_date >= %s AND a.attendance_date <= %s
+              AND a.timestamp >= %s AND a.timestamp < %s
+            ORDER BY a.timestamp DESC
+        """
+        try:
+            with self.conn.cursor(name="attendance_export") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(
+                    query,
+                    (start_date, end_date, day_range(start_date)[0], day_range(end_date)[1])
+                )
+                yield from cursor
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            raise e
+    
+    def ensure_partitions(self, months_ahead: int) -> int:
+        """
+        Create the monthly attendance partitions from this month to months_ahead
+        Returns number of partitions created
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT ensure_attendance_partitions(%s)", (months_ahead,))
+                created = cursor.fetchone()[0]
+            self.conn.commit()
+            return created
+        except Exception as e:
+            self.conn.rollback()
+            raise e
+    
     def check_already_marked_today(self, person_id: UUID) -> bool:
-        """Check if person has already marked attendance today"""
+        """
+        Check if person has already marked attendance today
+        Answered from the in-memory presence set once it is warm
+        """
+        if attendance_presence.is_warm:
+            return attendance_presence.contains(person_id)
         try:
             with self.conn.cursor() as cursor:
                 cursor.execute(
                     """
-                    SELECT COUNT(*) FROM attendance
-                    WHERE person_id = %s AND DATE(timestamp) = CURRENT_DATE
+                    SELECT EXISTS (
+                        SELECT 1 FROM attendance
+                        WHERE person_id = %s AND attendance_date = %s
+                    )
                     """,
-                    (person_id,)
+                    (person_id, date.today())
                 )
-                count = cursor.fetchone()[0]
-                return count > 0
+                return cursor.fetchone()[0]
         except Exception as e:
             raise e
@@ -2,10 +2,50 @@
 Database repository layer - handles all database operations
 """
 from typing import Optional, List, Dict, Any
-from uuid import UUID
+from uuid import UUID, uuid4
+import numpy as np
 import psycopg
 from psycopg.rows import dict_row
 
+# Face encodings are stored as raw float32 in network byte order (the same
+# layout as Postgres float4send and the pgvector binary format): 512 bytes per
+# 128-d vector instead of ~2.5 KB of JSONB text.
+ENCODING_DTYPE = np.dtype('>f4')
+
+
+def encode_face_encoding(encoding: np.ndarray) -> bytes:
+    """Serialize a face encoding vector to its BYTEA storage format"""
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def decode_face_encoding(data) -> np.ndarray:
+    """Deserialize a stored BYTEA face encoding into a native float32 vector"""
+    return np.frombuffer(data, dtype=ENCODING_DTYPE).astype(np.float32)
+
+
+# Explicit column list so the optional pgvector `embedding` column is not fetched
+ENCODING_COLUMNS = "e.id, e.person_id, e.face_encoding, e.date_create"
+
+# Postgres channel the encoding/name triggers in schema.sql notify on (payload: person ids)
+GALLERY_CHANNEL = "gallery_changes"
+
+# Person ids per bulk notification; a pg_notify payload must stay under 8000 bytes
+_NOTIFY_BATCH_SIZE = 200
+
+# SQL aggregate for each template reduction in find_nearest
+_DISTANCE_AGGREGATES = {"min": "MIN", "mean": "AVG"}
+
+# Encodings the pgvector index is asked for per requested person, so people
+# with several templates do not crowd the others out of the candidate set
+_CANDIDATES_PER_RESULT = 10
+
+
+def _decode_encoding_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for row in rows:
+        if row.get('face_encoding') is not None:
+            row['face_encoding'] = decode_face_encoding(row['face_encoding'])
+    return rows
+
 
 class PersonRepository:
     """Repository for person-related database operations"""
@@ -35,6 +75,48 @@ class PersonRepository:
             self.conn.rollback()
             raise e
     
+    def copy_people_with_faces(self, people: List[Dict[str, Any]]) -> List[UUID]:
+        """
+        Bulk insert people with their face encoding and image using COPY
+        Each dict needs first_name, last_name, face_encoding and image (an id is generated
+        when missing). Runs inside the caller's transaction - does not commit.
+        The per-row gallery triggers are muted; the new people are announced in a
+        few batched notifications instead, delivered when the transaction commits
+        Returns the person ids in input order
+        """
+        person_ids = [person.get('id') or uuid4() for person in people]
+        
+        with self.conn.cursor() as cursor:
+            cursor.execute("SET LOCAL gallery.skip_notify = 'on'")
+            with cursor.copy("COPY name (id, first_name, last_name, full_name) FROM STDIN") as copy:
+                for person_id, person in zip(person_ids, people):
+                    copy.write_row((
+                        person_id,
+                        person['first_name'],
+                        person['last_name'],
+                        person.get('full_name') or f"{person['first_name']} {person['last_name']}"
+                    ))
+            
+            with cursor.copy("COPY encoding (person_id, face_encoding) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(["uuid", "bytea"])
+                for person_id, person in zip(person_ids, people):
+                    copy.write_row((person_id, encode_face_encoding(person['face_encoding'])))
+            
+            with cursor.copy("COPY images (person_id, image) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(["uuid", "bytea"])
+                for person_id, person in zip(person_ids, people):
+                    copy.write_row((person_id, person['image']))
+            
+            cursor.execute("SET LOCAL gallery.skip_notify = 'off'")
+            for start in range(0, len(person_ids), _NOTIFY_BATCH_SIZE):
+                batch = person_ids[start:start + _NOTIFY_BATCH_SIZE]
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    (GALLERY_CHANNEL, ",".join(str(person_id) for person_id in batch))
+                )
+        
+        return person_ids
+    
     def get_by_id(self, person_id: UUID) -> Optional[Dict[str, Any]]:
         """Get person by ID"""
         try:
@@ -105,10 +187,13 @@ class PersonRepository:
 class EncodingRepository:
     """Repository for face encoding operations"""
     
+    # Whether encoding.embedding (pgvector) exists - checked once per process
+    _vector_search_available: Optional[bool] = None
+    
     def __init__(self, conn):
         self.conn = conn
     
-    def create(self, person_id: UUID, encoding: str) -> UUID:
+    def create(self, person_id: UUID, encoding: np.ndarray) -> UUID:
         """Store face encoding for a person"""
         try:
             query = """
@@ -117,7 +202,7 @@ class EncodingRepository:
                 RETURNING id
             """
             with self.conn.cursor() as cursor:
-                cursor.execute(query, (person_id, encoding))
+                cursor.execute(query, (person_id, encode_face_encoding(encoding)))
                 encoding_id = cursor.fetchone()[0]
             self.conn.commit()
             return encoding_id
@@ -125,15 +210,45 @@ class EncodingRepository:
             self.conn.rollback()
             raise e
     
+    def create_many(self, person_id: UUID, encodings: List[np.ndarray]) -> List[UUID]:
+        """Store several face encodings (templates) for a person in one transaction"""
+        try:
+            encoding_ids = []
+            with self.conn.cursor() as cursor:
+                for encoding in encodings:
+                    cursor.execute(
+                        "INSERT INTO encoding (person_id, face_encoding) VALUES (%s, %s) RETURNING id",
+                        (person_id, encode_face_encoding(encoding))
+                    )
+                    encoding_ids.append(cursor.fetchone()[0])
+            self.conn.commit()
+            return encoding_ids
+        except Exception as e:
+            self.conn.rollback()
+            raise e
+    
     def get_by_person_id(self, person_id: UUID) -> Optional[Dict[str, Any]]:
         """Get encoding for a specific person"""
         try:
             with self.conn.cursor(row_factory=dict_row) as cursor:
                 cursor.execute(
-                    "SELECT * FROM encoding WHERE person_id = %s",
+                    f"SELECT {ENCODING_COLUMNS} FROM encoding e WHERE e.person_id = %s",
                     (person_id,)
                 )
-                return cursor.fetchone()
+                row = cursor.fetchone()
+                return _decode_encoding_rows([row])[0] if row else None
+        except Exception as e:
+            raise e
+    
+    def get_all_by_person_id(self, person_id: UUID) -> List[Dict[str, Any]]:
+        """Get every encoding (template) of a specific person"""
+        try:
+            with self.conn.cursor(row_factory=dict_row) as cursor:
+                cursor.execute(
+                    f"SELECT {ENCODING_COLUMNS} FROM encoding e WHERE e.person_id = %s",
+                    (person_id,)
+                )
+                return _decode_encoding_rows(cursor.fetchall())
         except Exception as e:
             raise e
     
@@ -141,8 +256,8 @@ class EncodingRepository:
         """Get all face encodings"""
         try:
             with self.conn.cursor(row_factory=dict_row) as cursor:
-                cursor.execute("SELECT * FROM encoding")
-                return cursor.fetchall()
+                cursor.execute(f"SELECT {ENCODING_COLUMNS} FROM encoding e")
+                return _decode_encoding_rows(cursor.fetchall())
         except Exception as e:
             raise e
     
@@ -151,16 +266,172 @@ class EncodingRepository:
         try:
             with self.conn.cursor(row_factory=dict_row) as cursor:
                 cursor.execute(
-                    """
-                    SELECT e.*, n.first_name, n.last_name, n.full_name
+                    f"""
+                    SELECT {ENCODING_COLUMNS}, n.first_name, n.last_name, n.full_name
                     FROM encoding e
                     JOIN name n ON e.person_id = n.id
                     """
                 )
+                return _decode_encoding_rows(cursor.fetchall())
+        except Exception as e:
+            raise e
+    
+    def get_by_person_id_with_person_info(self, person_id: UUID) -> List[Dict[str, Any]]:
+        """Get all encodings of one person with associated person information"""
+        try:
+            with self.conn.cursor(row_factory=dict_row) as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT {ENCODING_COLUMNS}, n.first_name, n.last_name, n.full_name
+                    FROM encoding e
+                    JOIN name n ON e.person_id = n.id
+                    WHERE e.person_id = %s
+                    """,
+                    (person_id,)
+                )
+                return _decode_encoding_rows(cursor.fetchall())
+        except Exception as e:
+            raise e
+    
+    def get_by_person_ids_with_person_info(self, person_ids: List[UUID]) -> List[Dict[str, Any]]:
+        """Get all encodings of several people with associated person information"""
+        try:
+            with self.conn.cursor(row_factory=dict_row) as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT {ENCODING_COLUMNS}, n.first_name, n.last_name, n.full_name
+                    FROM encoding e
+                    JOIN name n ON e.person_id = n.id
+                    WHERE e.person_id = ANY(%s)
+                    """,
+                    (list(person_ids),)
+                )
+                return _decode_encoding_rows(cursor.fetchall())
+        except Exception as e:
+            raise e
+    
+    def has_vector_search(self) -> bool:
+        """Check whether the pgvector embedding column is available"""
+        if EncodingRepository._vector_search_available is None:
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        SELECT EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_name = 'encoding' AND column_name = 'embedding'
+                        )
+                        """
+                    )
+                    EncodingRepository._vector_search_available = cursor.fetchone()[0]
+            except Exception as e:
+                raise e
+        return EncodingRepository._vector_search_available
+    
+    def find_nearest(
+        self,
+        vector: np.ndarray,
+        k: int = 1,
+        max_distance: Optional[float] = None,
+        reduction: str = "min"
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the k people whose stored encodings are closest (L2) to a vector, nearest first
+        A person with several templates is scored by the min or mean distance over
+        them (reduction, as in GALLERY_TEMPLATE_REDUCTION) and returned once.
+        Each result has person_id, first_name, last_name, full_name and distance.
+        Runs inside Postgres via pgvector when available, otherwise scans in Python.
+        """
+        if reduction not in _DISTANCE_AGGREGATES:
+            raise ValueError(f"Unknown template reduction: {reduction}")
+        if self.has_vector_search():
+            return self._find_nearest_pgvector(vector, k, max_distance, reduction)
+        return self._find_nearest_scan(vector, k, max_distance, reduction)
+    
+    def _find_nearest_pgvector(
+        self,
+        vector: np.ndarray,
+        k: int,
+        max_distance: Optional[float],
+        reduction: str = "min"
+    ) -> List[Dict[str, Any]]:
+        # Text literal avoids a client-side dependency on the pgvector package
+        literal = "[" + ",".join(map(str, np.asarray(vector, dtype=np.float32).tolist())) + "]"
+        try:
+            with self.conn.cursor(row_factory=dict_row) as cursor:
+                # The inner ORDER BY ... LIMIT is what lets the HNSW index serve the query;
+                # the people it finds are then scored over all of their templates
+                cursor.execute(
+                    f"""
+                    WITH candidates AS (
+                        SELECT DISTINCT person_id FROM (
+                            SELECT e.person_id
+                            FROM encoding e
+                            ORDER BY e.embedding <-> %(vector)s::vector
+                            LIMIT %(candidates)s
+                        ) nearest
+                    )
+                    SELECT * FROM (
+                        SELECT e.person_id, n.first_name, n.last_name, n.full_name,
+                               {_DISTANCE_AGGREGATES[reduction]}(e.embedding <-> %(vector)s::vector) AS distance
+                        FROM encoding e
+                        JOIN candidates c ON e.person_id = c.person_id
+                        JOIN name n ON e.person_id = n.id
+                        GROUP BY e.person_id, n.first_name, n.last_name, n.full_name
+                    ) scored
+                    WHERE %(max_distance)s::float8 IS NULL OR distance <= %(max_distance)s::float8
+                    ORDER BY distance
+                    LIMIT %(k)s
+                    """,
+                    {
+                        "vector": literal,
+                        "candidates": k * _CANDIDATES_PER_RESULT,
+                        "max_distance": max_distance,
+                        "k": k
+                    }
+                )
                 return cursor.fetchall()
         except Exception as e:
             raise e
     
+    def _find_nearest_scan(
+        self,
+        vector: np.ndarray,
+        k: int,
+        max_distance: Optional[float],
+        reduction: str = "min"
+    ) -> List[Dict[str, Any]]:
+        records = self.get_all_with_person_info()
+        if not records:
+            return []
+        
+        encodings = np.stack([record['face_encoding'] for record in records])
+        distances = np.linalg.norm(encodings - np.asarray(vector, dtype=np.float32), axis=1)
+        
+        # One entry per person: their first record and the distances to all their templates
+        people: Dict[UUID, Any] = {}
+        for record, distance in zip(records, distances):
+            people.setdefault(record['person_id'], (record, []))[1].append(distance)
+        
+        reduce = np.mean if reduction == "mean" else np.min
+        scored = sorted(
+            ((float(reduce(person_distances)), record) for record, person_distances in people.values()),
+            key=lambda item: item[0]
+        )
+        
+        results = []
+        for distance, record in scored[:k]:
+            if max_distance is not None and distance > max_distance:
+                break
+            results.append({
+                "person_id": record['person_id'],
+                "first_name": record['first_name'],
+                "last_name": record['last_name'],
+                "full_name": record['full_name'],
+                "distance": distance
+            })
+        return results
+    
     def delete(self, encoding_id: UUID) -> bool:
         """Delete an encoding by ID"""
         try:
@@ -8,21 +8,63 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.db import get_connection, close_connection, run_schema
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+
+def get_applied_migrations(conn) -> set:
+    """Get versions of migrations that have already been applied"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def apply_pending_migrations(conn, migrations_dir: str = MIGRATIONS_DIR) -> int:
+    """
+    Apply numbered SQL files from the migrations directory in order
+    Each file runs in its own transaction and is recorded in schema_migrations
+    Returns number of migrations applied
+    """
+    applied = get_applied_migrations(conn)
+    pending = sorted(
+        name for name in os.listdir(migrations_dir)
+        if name.endswith('.sql') and name[:-4] not in applied
+    )
+
+    for name in pending:
+        version = name[:-4]
+        print(f"Applying migration: {version}")
+
+        with open(os.path.join(migrations_dir, name), 'r') as f:
+            sql = f.read()
+
+        with conn.transaction():
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version) VALUES (%s)",
+                    (version,)
+                )
+
+    return len(pending)
+
 
 def run_migrations():
     """Run database migrations"""
     print("Starting database migration...")
-    
+
     try:
         conn = get_connection()
         schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        
+
         print(f"Executing schema from: {schema_path}")
         run_schema(conn, schema_path)
-        
+
+        count = apply_pending_migrations(conn)
+        print(f"Applied {count} pending migration(s)")
+
         close_connection(conn)
         print("✅ Migration completed successfully!")
-        
+
     except Exception as e:
         print(f"Migration failed: {e}")
         sys.exit(1)
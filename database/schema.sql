@@ -1,6 +1,6 @@
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
-CREATE TABLE name (
+CREATE TABLE IF NOT EXISTS name (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     first_name VARCHAR(50),
     last_name VARCHAR(50),
@@ -8,15 +8,15 @@ CREATE TABLE name (
     date_created TIMESTAMP default current_timestamp
 );
 
-CREATE TABLE encoding (
+CREATE TABLE IF NOT EXISTS encoding (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     person_id UUID DEFAULT uuid_generate_v4(),
     FOREIGN KEY (person_id) REFERENCES name(id) ON DELETE CASCADE,
-    face_encoding JSONB,
+    face_encoding BYTEA,  -- 128 x float32, network byte order
     date_create TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE images (
+CREATE TABLE IF NOT EXISTS images (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     person_id UUID DEFAULT uuid_generate_v4(),
     FOREIGN KEY (person_id) REFERENCES name(id) ON DELETE CASCADE,
@@ -24,9 +24,50 @@ CREATE TABLE images (
     data_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE attendance (
+CREATE TABLE IF NOT EXISTS attendance (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     person_id UUID,
     FOREIGN KEY (person_id) REFERENCES name(id) ON DELETE CASCADE,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
\ No newline at end of file
+);
+
+-- Applied files from database/migrations (see run_migration.py)
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Gallery change notifications: every worker keeps an in-memory gallery of
+-- encodings and LISTENs on this channel to refresh the affected person only.
+-- Bulk writers SET LOCAL gallery.skip_notify = 'on' and send one notification
+-- per batch of person ids instead of one per row.
+CREATE OR REPLACE FUNCTION notify_encoding_change() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('gallery.skip_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('gallery_changes', OLD.person_id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('gallery_changes', NEW.person_id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_name_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('gallery_changes', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS encoding_gallery_notify ON encoding;
+CREATE TRIGGER encoding_gallery_notify
+    AFTER INSERT OR UPDATE OR DELETE ON encoding
+    FOR EACH ROW EXECUTE FUNCTION notify_encoding_change();
+
+DROP TRIGGER IF EXISTS name_gallery_notify ON name;
+CREATE TRIGGER name_gallery_notify
+    AFTER UPDATE OF full_name ON name
+    FOR EACH ROW EXECUTE FUNCTION notify_name_change();
@@ -19,6 +19,13 @@ export interface UploadImageResponse {
   filename: string;
 }
 
+export interface PersonEncodingsResponse {
+  person_id: string;
+  added: number;
+  template_count: number;
+  errors: string[];
+}
+
 export interface FaceRecognitionResponse {
   success: boolean;
   person_id?: string;
@@ -35,6 +42,26 @@ export interface AttendanceMarkResponse {
   message: string;
 }
 
+export type RecognitionStreamMode = 'recognize' | 'attendance';
+
+export interface RecognitionStreamEvent {
+  type: 'ready' | 'result' | 'error';
+  mode?: RecognitionStreamMode;
+  success?: boolean;
+  person_id?: string;
+  full_name?: string;
+  confidence?: number;
+  timestamp?: string;
+  already_marked?: boolean;
+  track_id?: number;
+  tracked?: boolean;
+  idle?: boolean;
+  message?: string;
+  frame?: number;
+  dropped?: number;
+  latency_ms?: number;
+}
+
 export interface AttendanceRecord {
   id: string;
   person_id: string;
@@ -55,6 +82,10 @@ class ApiService {
     return `${this.baseUrl}${this.apiPrefix}${endpoint}`;
   }
 
+  private getWebSocketUrl(endpoint: string): string {
+    return this.getUrl(endpoint).replace(/^http/, 'ws');
+  }
+
   // Person Management APIs
   async createPerson(data: PersonCreate): Promise<PersonResponse> {
     const response = await fetch(this.getUrl('/persons/'), {
@@ -147,6 +178,23 @@ class ApiService {
     }
   }
 
+  async addPersonImages(personId: string, images: File[]): Promise<PersonEncodingsResponse> {
+    const formData = new FormData();
+    images.forEach((image) => formData.append('images', image));
+
+    const response = await fetch(this.getUrl(`/persons/${personId}/encodings`), {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to add person images');
+    }
+
+    return response.json();
+  }
+
   // Face Recognition APIs
   async uploadPersonImage(
     image: File,
@@ -206,6 +254,17 @@ class ApiService {
     return response.json();
   }
 
+  // Streaming recognition: send JPEG frames over one socket, receive result events
+  openRecognitionStream(
+    mode: RecognitionStreamMode,
+    onEvent: (event: RecognitionStreamEvent) => void
+  ): WebSocket {
+    const socket = new WebSocket(this.getWebSocketUrl(`/stream/recognize?mode=${mode}`));
+    socket.binaryType = 'arraybuffer';
+    socket.onmessage = (message) => onEvent(JSON.parse(message.data));
+    return socket;
+  }
+
   async markAttendanceManual(personId: string): Promise<AttendanceMarkResponse> {
     const response = await fetch(this.getUrl(`/attendance/mark/manual/${personId}`), {
       method: 'POST',
@@ -282,6 +341,20 @@ class ApiService {
 
     return response.blob();
   }
+
+  async exportAttendanceCSVRange(startDate: string, endDate: string, gzip = false): Promise<Blob> {
+    const params = new URLSearchParams({ start_date: startDate, end_date: endDate });
+    if (gzip) {
+      params.append('gzip', 'true');
+    }
+    const response = await fetch(this.getUrl(`/attendance/export/range?${params}`));
+
+    if (!response.ok) {
+      throw new Error(`Failed to export attendance: ${response.statusText}`);
+    }
+
+    return response.blob();
+  }
 }
 
 // Export singleton instance
@@ -0,0 +1,14 @@
+"""Shared test data builders"""
+import uuid
+
+import numpy as np
+
+
+def random_encoding(rng) -> np.ndarray:
+    """A unit-length 128-d encoding, far (distance ~1.4) from any other random one"""
+    vector = rng.normal(size=128).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def new_person_id() -> uuid.UUID:
+    return uuid.uuid4()
@@ -0,0 +1,38 @@
+from backend.models import MultiFaceAttendanceResponse
+from backend.services.attendance_service import AttendanceService
+from tests.helpers import new_person_id
+
+
+def service_with_faces(faces) -> AttendanceService:
+    service = AttendanceService(None)
+    service.face_service.recognize_faces = lambda image: [dict(face) for face in faces]
+    return service
+
+
+class TestMarkAttendanceByFaces:
+    def test_repository_failure_returns_valid_response(self):
+        person_id = new_person_id()
+        service = service_with_faces([
+            {"location": (0, 10, 10, 0), "person_id": person_id, "full_name": "Ada Lovelace", "confidence": 0.9},
+            {"location": (20, 30, 30, 20), "person_id": None, "full_name": None, "confidence": None},
+        ])
+
+        def fail(person_ids):
+            raise RuntimeError("connection lost")
+
+        service.attendance_repo.mark_attendance_many = fail
+        result = service.mark_attendance_by_faces(b"jpeg")
+
+        response = MultiFaceAttendanceResponse(**result)
+        assert not response.success
+        assert response.message == "Failed to mark attendance: connection lost"
+        assert response.marked_count == 0
+        assert [face.status for face in response.faces] == ["error", "unknown"]
+        assert all(face.timestamp is None for face in response.faces)
+
+    def test_unreadable_image(self):
+        service = AttendanceService(None)
+        service.face_service.recognize_faces = lambda image: None
+        response = MultiFaceAttendanceResponse(**service.mark_attendance_by_faces(b"not an image"))
+        assert not response.success
+        assert response.faces == []
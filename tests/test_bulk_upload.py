@@ -0,0 +1,93 @@
+import io
+import zipfile
+
+import pytest
+
+from backend.utils.bulk_upload import read_manifest, zip_image_sources, match_manifest, add_image_source
+
+
+def make_zip(members) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+class TestManifest:
+    def test_rows_by_filename(self):
+        people, errors = read_manifest(b"\xef\xbb\xbffilename,first_name,last_name\nphotos/ada.jpg,Ada,Lovelace\n")
+        assert list(people) == ["ada.jpg"]
+        assert (people["ada.jpg"].first_name, people["ada.jpg"].last_name) == ("Ada", "Lovelace")
+        assert errors == []
+
+    def test_row_without_filename(self):
+        people, errors = read_manifest(b"filename,first_name,last_name\n,Ada,Lovelace\n")
+        assert people == {}
+        assert errors[0]["filename"] == "line 2"
+
+    def test_missing_column(self):
+        with pytest.raises(ValueError, match="last_name"):
+            read_manifest(b"filename,first_name\nada.jpg,Ada\n")
+
+    def test_duplicate_filename(self):
+        with pytest.raises(ValueError, match="more than once"):
+            read_manifest(b"filename,first_name,last_name\nada.jpg,Ada,Lovelace\nada.jpg,Ada,King\n")
+
+
+class TestZipSources:
+    def test_lists_images_and_manifest(self):
+        archive = make_zip({
+            "people/ada.jpg": b"jpeg",
+            "people/notes.txt": b"skip",
+            "__MACOSX/people/._ada.jpg": b"skip",
+            "manifest.csv": b"filename,first_name,last_name\n",
+        })
+        sources, manifest = zip_image_sources(archive)
+        assert list(sources) == ["ada.jpg"]
+        assert sources["ada.jpg"]() == b"jpeg"
+        assert manifest == b"filename,first_name,last_name\n"
+
+    def test_oversized_member_is_not_decompressed(self, monkeypatch):
+        archive = make_zip({"bomb.jpg": b"\0" * 10_000})
+        sources, _ = zip_image_sources(archive, max_size=1_000)
+
+        opened = []
+        monkeypatch.setattr(zipfile.ZipFile, "open", lambda *args, **kwargs: opened.append(args))
+        with pytest.raises(ValueError, match="too large"):
+            sources["bomb.jpg"]()
+        assert opened == []
+
+    def test_same_name_in_two_folders_is_ambiguous(self):
+        sources, _ = zip_image_sources(make_zip({"a/photo.jpg": b"first", "b/photo.jpg": b"second"}))
+        assert sources == {"photo.jpg": None}
+
+    def test_oversized_manifest(self):
+        with pytest.raises(ValueError, match="too large"):
+            zip_image_sources(make_zip({"manifest.csv": b"x" * 2_000}), max_size=1_000)
+
+
+def test_match_manifest():
+    people, _ = read_manifest(b"filename,first_name,last_name\nada.jpg,Ada,Lovelace\nalan.jpg,Alan,Turing\n")
+    sources = {"ada.jpg": lambda: b"", "grace.jpg": lambda: b""}
+    items, errors = match_manifest(sources, people)
+    assert [item.filename for item in items] == ["ada.jpg"]
+    assert {error["filename"]: error["message"] for error in errors} == {
+        "grace.jpg": "File is not listed in the manifest",
+        "alan.jpg": "File listed in the manifest was not uploaded",
+    }
+
+
+def test_duplicate_file_name_is_not_enrolled():
+    people, _ = read_manifest(b"filename,first_name,last_name\nphoto.jpg,Ada,Lovelace\n")
+    sources = {}
+    add_image_source(sources, "photo.jpg", lambda: b"first")
+    add_image_source(sources, "photo.jpg", lambda: b"second")
+    add_image_source(sources, "photo.jpg", lambda: b"third")
+
+    items, errors = match_manifest(sources, people)
+    assert items == []
+    assert [(error["filename"], error["message"]) for error in errors] == [
+        ("photo.jpg", "Several uploaded files have this name; file names must be unique")
+    ]
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import pytest
+
+from backend.services.face_tracker import FaceTracker
+from tests.helpers import new_person_id
+
+FACE = (60, 140, 140, 60)
+NEWCOMER = (60, 280, 140, 200)
+
+
+@pytest.fixture
+def frame(rng) -> bytes:
+    """A frame whose face-sized patches are distinctive enough to template-match"""
+    img = np.full((240, 320, 3), 128, dtype=np.uint8)
+    for top, right, bottom, left in (FACE, NEWCOMER):
+        img[top:bottom, left:right] = rng.integers(0, 256, size=(bottom - top, right - left, 3), dtype=np.uint8)
+    ok, buffer = cv2.imencode(".png", img)
+    assert ok
+    return buffer.tobytes()
+
+
+class Pipeline:
+    """Stand-in for recognize_faces / detect_faces returning fixed faces"""
+
+    def __init__(self, *faces):
+        self.faces = list(faces)
+        self.recognized = 0
+        self.detected = 0
+
+    def recognize(self, image_bytes):
+        self.recognized += 1
+        return [dict(face) for face in self.faces]
+
+    def detect(self, image_bytes):
+        self.detected += 1
+        return [face["location"] for face in self.faces]
+
+
+def face(location, person_id=None):
+    return {
+        "location": location,
+        "person_id": person_id,
+        "full_name": "Ada Lovelace" if person_id else None,
+        "confidence": 0.9 if person_id else None
+    }
+
+
+class TestFaceTracker:
+    def test_identified_face_is_followed(self, frame):
+        pipeline = Pipeline(face(FACE, new_person_id()))
+        tracker = FaceTracker(reverify_seconds=60, detect_seconds=60)
+
+        first = tracker.update(frame, pipeline.recognize, pipeline.detect)
+        second = tracker.update(frame, pipeline.recognize, pipeline.detect)
+
+        assert [f["tracked"] for f in first + second] == [False, True]
+        assert second[0]["track_id"] == first[0]["track_id"]
+        assert pipeline.recognized == 1
+
+    def test_unknown_face_is_recognized_again(self, frame):
+        pipeline = Pipeline(face(FACE))
+        tracker = FaceTracker(reverify_seconds=60, detect_seconds=60)
+
+        first = tracker.update(frame, pipeline.recognize, pipeline.detect)
+        second = tracker.update(frame, pipeline.recognize, pipeline.detect)
+
+        assert not second[0]["tracked"]
+        assert second[0]["track_id"] == first[0]["track_id"]
+        assert pipeline.recognized == 2
+
+    def test_new_face_found_by_periodic_detection(self, frame):
+        pipeline = Pipeline(face(FACE, new_person_id()))
+        tracker = FaceTracker(reverify_seconds=60, detect_seconds=0)
+
+        tracker.update(frame, pipeline.recognize, pipeline.detect)
+        assert tracker.update(frame, pipeline.recognize, pipeline.detect)[0]["tracked"]
+        assert pipeline.detected == 1
+
+        pipeline.faces.append(face(NEWCOMER, new_person_id()))
+        faces = tracker.update(frame, pipeline.recognize, pipeline.detect)
+
+        assert [f["tracked"] for f in faces] == [False, False]
+        assert pipeline.recognized == 2
+
+    def test_detection_waits_for_its_interval(self, frame):
+        pipeline = Pipeline(face(FACE, new_person_id()))
+        tracker = FaceTracker(reverify_seconds=60, detect_seconds=60)
+
+        for _ in range(3):
+            tracker.update(frame, pipeline.recognize, pipeline.detect)
+        assert (pipeline.recognized, pipeline.detected) == (1, 0)
@@ -0,0 +1,221 @@
+import importlib
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from backend.services.gallery_index import GalleryIndex
+from backend.services.search_backends import ExactSearchBackend
+from tests.helpers import random_encoding, new_person_id
+
+gallery_index_module = importlib.import_module("backend.services.gallery_index")
+
+
+class FakeEncodingTable:
+    """The encoding table as EncodingRepository would read it, with a query counter"""
+
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+        # Called with the query name before each read (to hold a read mid-flight)
+        self.on_read = lambda query: None
+
+    def insert(self, person_id, full_name, encoding):
+        encoding_id = uuid.uuid4()
+        self.rows.append({"id": encoding_id, "person_id": person_id, "full_name": full_name, "face_encoding": encoding})
+        return encoding_id
+
+    def delete_person(self, person_id):
+        self.rows = [row for row in self.rows if row["person_id"] != person_id]
+
+    def repository(self, conn):
+        table = self
+
+        class Repository:
+            def get_all_with_person_info(self):
+                table.on_read("all")
+                table.queries += 1
+                return list(table.rows)
+
+            def get_by_person_ids_with_person_info(self, person_ids):
+                table.on_read("people")
+                table.queries += 1
+                return [row for row in table.rows if row["person_id"] in set(person_ids)]
+
+        return Repository()
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeEncodingTable()
+    monkeypatch.setattr(gallery_index_module, "EncodingRepository", table.repository)
+    return table
+
+
+def make_index(template_mode="all", reduction="min"):
+    return GalleryIndex(backend=ExactSearchBackend(), template_mode=template_mode, reduction=reduction)
+
+
+class TestRefresh:
+    def test_refreshing_twice_does_not_duplicate_rows(self, table, rng):
+        index = make_index()
+        index.load(None)
+        person_id = new_person_id()
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+
+        # The worker's own write, then the NOTIFY echo of it
+        assert index.refresh_person(None, person_id)
+        version = index.version
+        assert not index.refresh_person(None, person_id)
+
+        assert len(index) == 1
+        assert index.template_count(person_id) == 1
+        assert index.version == version
+
+    def test_loaded_people_are_not_rewritten(self, table, rng):
+        person_id = new_person_id()
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+        index = make_index()
+        index.load(None)
+        version = index.version
+
+        assert index.refresh_people(None, [person_id]) == 0
+        assert index.version == version
+
+    def test_extra_template_is_added_once(self, table, rng):
+        index = make_index()
+        person_id = new_person_id()
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+        index.load(None)
+
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+        index.refresh_person(None, person_id)
+        index.refresh_person(None, person_id)
+
+        assert index.template_count(person_id) == 2
+        assert len(index) == 2
+
+    def test_centroid_template_count(self, table, rng):
+        index = make_index(template_mode="centroid")
+        person_id = new_person_id()
+        encodings = [random_encoding(rng) for _ in range(3)]
+        for encoding in encodings:
+            table.insert(person_id, "Ada Lovelace", encoding)
+        index.refresh_person(None, person_id)
+        index.refresh_person(None, person_id)
+
+        assert index.template_count(person_id) == 3
+        assert len(index) == 1
+        np.testing.assert_allclose(index.person_templates(person_id)[0], np.mean(encodings, axis=0), atol=1e-6)
+
+    def test_replaced_encoding(self, table, rng):
+        index = make_index()
+        person_id = new_person_id()
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+        index.load(None)
+
+        table.delete_person(person_id)
+        new_encoding = random_encoding(rng)
+        table.insert(person_id, "Ada Lovelace", new_encoding)
+        index.refresh_person(None, person_id)
+
+        assert len(index) == 1
+        assert index.search(new_encoding, 0.1)[0] == person_id
+
+    def test_rename_only(self, table, rng):
+        index = make_index()
+        person_id = new_person_id()
+        encoding = random_encoding(rng)
+        table.insert(person_id, "Ada Lovelace", encoding)
+        index.load(None)
+
+        for row in table.rows:
+            row["full_name"] = "Ada King"
+        assert index.refresh_person(None, person_id)
+        assert index.search(encoding, 0.1)[1] == "Ada King"
+
+    def test_deleted_person_is_removed(self, table, rng):
+        index = make_index()
+        person_id = new_person_id()
+        encoding = random_encoding(rng)
+        table.insert(person_id, "Ada Lovelace", encoding)
+        index.load(None)
+
+        table.delete_person(person_id)
+        assert index.refresh_person(None, person_id)
+        assert not index.refresh_person(None, person_id)
+        assert len(index) == 0
+        assert index.search(encoding, 1.0) is None
+
+    def test_compaction_keeps_the_remaining_people(self, table, rng):
+        encodings = {new_person_id(): random_encoding(rng) for _ in range(200)}
+        for person_id, encoding in encodings.items():
+            table.insert(person_id, f"Person {person_id}", encoding)
+        index = make_index()
+        index.load(None)
+
+        removed = list(encodings)[:150]
+        for person_id in removed:
+            table.delete_person(person_id)
+        index.refresh_people(None, removed)
+
+        assert len(index) == 50
+        assert index._tombstones < 150
+        for person_id, encoding in encodings.items():
+            match = index.search(encoding, 0.1)
+            assert (match[0] if match else None) == (None if person_id in removed else person_id)
+
+
+class TestNotifications:
+    def test_batched_payloads_are_refreshed_with_one_query(self, table, monkeypatch, rng):
+        @contextmanager
+        def fake_connection():
+            yield None
+
+        monkeypatch.setattr(gallery_index_module, "get_db_connection", fake_connection)
+        index = make_index()
+        index.load(None)
+        person_ids = [new_person_id() for _ in range(5)]
+        for person_id in person_ids:
+            table.insert(person_id, "Bulk", random_encoding(rng))
+
+        queries = table.queries
+        index._apply_notifications({",".join(map(str, person_ids[:3])), ",".join(map(str, person_ids[3:]))})
+
+        assert table.queries == queries + 1
+        assert len(index) == 5
+        assert index.person_count == 5
+
+    def test_reload_waits_for_an_in_flight_refresh(self, table, rng):
+        index = make_index()
+        index.load(None)
+        person_id = new_person_id()
+        table.insert(person_id, "Ada Lovelace", random_encoding(rng))
+
+        reads = []
+        refresh_reading = threading.Event()
+        release_refresh = threading.Event()
+
+        def on_read(query):
+            reads.append(query)
+            if query == "people":
+                refresh_reading.set()
+                release_refresh.wait(5)
+
+        table.on_read = on_read
+        refresh = threading.Thread(target=index.refresh_person, args=(None, person_id))
+        refresh.start()
+        assert refresh_reading.wait(5)
+
+        reload = threading.Thread(target=index.load, args=(None,))
+        reload.start()
+        reload.join(0.2)
+        assert reads == ["people"]
+
+        release_refresh.set()
+        refresh.join(5)
+        reload.join(5)
+        assert reads == ["people", "all"]
+        assert len(index) == 1
@@ -0,0 +1,65 @@
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.utils import image_utils
+from backend.utils.image_utils import DecodedImage, read_image_size
+
+
+def jpeg_with_orientation(width: int, height: int, orientation: int) -> bytes:
+    """A width x height JPEG carrying an EXIF orientation tag"""
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    img[:, :width // 2] = 255
+    ok, buffer = cv2.imencode(".jpg", img)
+    assert ok
+    jpeg = buffer.tobytes()
+
+    # Little-endian TIFF header, one IFD entry: Orientation (0x0112), SHORT, count 1
+    tiff = b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", 1)
+    tiff += struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<I", 0)
+    app1 = b"Exif\x00\x00" + tiff
+    segment = b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1
+    return jpeg[:2] + segment + jpeg[2:]
+
+
+@pytest.fixture
+def full_frame_detector(monkeypatch):
+    """Stand-in detector that finds one face covering the whole detection image"""
+    def face_locations(img, model="hog"):
+        height, width = img.shape[:2]
+        return [(0, width, height, 0)]
+
+    monkeypatch.setattr(image_utils.model_registry, "face_locations", face_locations)
+
+
+def test_detection_boxes_follow_exif_orientation(full_frame_detector):
+    # Stored landscape, displayed portrait (rotate 90 degrees clockwise)
+    image_bytes = jpeg_with_orientation(400, 200, orientation=6)
+    assert read_image_size(image_bytes) == (400, 200)
+    assert image_utils.bytes_to_ndarray(image_bytes).shape[:2] == (400, 200)
+
+    image = DecodedImage(image_bytes, detection_max_side=100)
+    assert image.face_locations("hog") == [(0, 200, 400, 0)]
+
+
+def test_detection_boxes_without_orientation(full_frame_detector):
+    image = DecodedImage(jpeg_with_orientation(400, 200, orientation=1), detection_max_side=100)
+    assert image.face_locations("hog") == [(0, 400, 200, 0)]
+
+
+
+def test_storage_jpeg_is_reencoded_without_metadata():
+    image_bytes = jpeg_with_orientation(400, 200, orientation=6)
+    stored = DecodedImage(image_bytes).storage_jpeg(max_side=1024, quality=85)
+
+    assert stored != image_bytes
+    assert b"Exif\x00\x00" not in stored
+    # Orientation is applied to the pixels instead of being carried as a tag
+    assert read_image_size(stored) == (200, 400)
+
+
+def test_storage_jpeg_is_capped_to_max_side():
+    stored = DecodedImage(jpeg_with_orientation(400, 200, orientation=1)).storage_jpeg(max_side=100)
+    assert read_image_size(stored) == (100, 50)
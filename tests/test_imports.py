@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(module: str, *candidates: str) -> set:
+    """Which of the candidate modules a fresh interpreter has loaded after importing module"""
+    code = f"import sys, {module}; print(' '.join(name for name in {candidates!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("module", ["database.db", "database.run_migration", "database.archive_attendance"])
+def test_database_modules_do_not_load_image_libraries(module):
+    assert loaded_modules(module, "cv2", "dlib") == set()
+
+
+def test_services_load_dlib_on_first_use():
+    assert loaded_modules("backend.services", "dlib", "face_recognition_models") == set()
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from backend.services.inference_pool import InferencePool
+
+
+@pytest.fixture
+def pool():
+    InferencePool.initialize(2, warm=False)
+    yield InferencePool
+    InferencePool.shutdown()
+
+
+def test_one_report_per_worker(pool):
+    reports = pool.worker_reports()
+    assert len({report["pid"] for report in reports}) == 2
+    assert os.getpid() not in {report["pid"] for report in reports}
+
+
+def test_inline_report():
+    reports = InferencePool.worker_reports()
+    assert [report["pid"] for report in reports] == [os.getpid()]
+    assert {model["name"] for model in reports[0]["models"]} >= {"encoder"}
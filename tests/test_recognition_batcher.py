@@ -0,0 +1,30 @@
+from backend.services.recognition_batcher import RecognitionBatcher
+from backend.utils.metrics import registry
+
+
+def metric_value(name: str) -> float:
+    for line in registry.render().splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    raise KeyError(name)
+
+
+def test_batch_size_and_wait_are_exported():
+    batches, items = metric_value("recognition_batch_size_count"), metric_value("recognition_batch_size_sum")
+    waits = metric_value("recognition_batch_wait_seconds_count")
+
+    batcher = RecognitionBatcher(
+        window_ms=50, max_batch_size=4, max_wait_ms=100, tolerance=0.6, detection_model="hog"
+    )
+    # Queued before the collector starts, so they are dispatched as one batch
+    futures = [batcher.submit(b"") for _ in range(3)]
+    batcher.start()
+    try:
+        assert [future.result(timeout=10) for future in futures] == [None, None, None]
+    finally:
+        batcher.stop()
+
+    assert metric_value("recognition_batch_size_count") == batches + 1
+    assert metric_value("recognition_batch_size_sum") == items + 3
+    assert metric_value("recognition_batch_wait_seconds_count") == waits + 3
+    assert batcher.stats.snapshot()["max_batch_size"] == 3
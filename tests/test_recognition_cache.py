@@ -0,0 +1,151 @@
+import importlib
+import time
+
+import numpy as np
+import pytest
+
+from backend.services.face_recognition_service import FaceRecognitionService
+from backend.services.gallery_index import GalleryIndex
+from backend.services.recognition_cache import RecognitionCache
+from backend.services.search_backends import ExactSearchBackend
+from backend.utils.image_utils import DecodedImage
+from tests.helpers import random_encoding, new_person_id
+
+# backend.services re-exports instances under the module names
+face_recognition_service = importlib.import_module("backend.services.face_recognition_service")
+recognition_cache_module = importlib.import_module("backend.services.recognition_cache")
+
+BOX = (10, 60, 60, 10)
+
+
+def analysed_image(image_bytes: bytes, face_hash: int, encoding: np.ndarray) -> DecodedImage:
+    """A DecodedImage whose detection and encoding results are already cached"""
+    image = DecodedImage(image_bytes)
+    image.update_cache({
+        "decode_failed": False,
+        "face_locations": {"hog": [BOX]},
+        "face_hashes": {"hog": [face_hash]},
+        "encodings": {"hog": [encoding]},
+        "storage_jpeg": None
+    })
+    return image
+
+
+@pytest.fixture
+def gallery(monkeypatch):
+    index = GalleryIndex(backend=ExactSearchBackend(), template_mode="all", reduction="min")
+    monkeypatch.setattr(face_recognition_service, "gallery_index", index)
+    monkeypatch.setattr(recognition_cache_module, "gallery_index", index)
+    return index
+
+
+@pytest.fixture
+def cache(monkeypatch, gallery):
+    cache = RecognitionCache(max_entries=16, ttl_seconds=60, max_hamming=2)
+    monkeypatch.setattr(face_recognition_service, "recognition_cache", cache)
+    monkeypatch.setattr(face_recognition_service.settings, "GALLERY_SEARCH_BACKEND", "exact")
+    return cache
+
+
+@pytest.fixture
+def service():
+    service = FaceRecognitionService(conn=None)
+    service.model = "hog"
+    service.tolerance = 0.6
+    return service
+
+
+class TestRecognitionCache:
+    def test_content_hit(self, cache):
+        cache.put(b"digest", None, None, cache._version)
+        assert cache.get_by_content(b"digest") == (True, None)
+        assert cache.content_hits == 1
+
+    def test_face_lookup_within_hamming_distance(self, cache):
+        match = (new_person_id(), "Ada Lovelace", 0.3)
+        cache.put(b"digest", 0b1010, match, cache._version)
+        assert cache.get_by_face(0b1010) == match
+        assert cache.get_by_face(0b1001) == match
+        assert cache.get_by_face(0b0101) is None
+        # Face lookups are only candidates; the caller counts the outcome
+        assert cache.face_hits == 0 and cache.misses == 0
+
+    def test_exact_face_hash_only(self, gallery):
+        cache = RecognitionCache(max_entries=16, ttl_seconds=60, max_hamming=0)
+        match = (new_person_id(), "Ada Lovelace", 0.3)
+        cache.put(b"digest", 0b1010, match, cache._version)
+        assert cache.get_by_face(0b1011) is None
+
+    def test_gallery_change_clears_entries(self, cache, gallery, rng):
+        match = (new_person_id(), "Ada Lovelace", 0.3)
+        cache.put(b"digest", 0b1010, match, gallery.version)
+        gallery.load_encodings(random_encoding(rng)[None, :], [new_person_id()], ["Alan Turing"])
+        assert cache.get_by_content(b"digest") == (False, None)
+        assert cache.get_by_face(0b1010) is None
+
+    def test_stale_results_are_not_cached(self, cache, gallery, rng):
+        version = gallery.version
+        gallery.load_encodings(random_encoding(rng)[None, :], [new_person_id()], ["Alan Turing"])
+        cache.put(b"digest", 0b1010, None, version)
+        assert cache.get_by_content(b"digest") == (False, None)
+
+    def test_entries_expire(self, cache, monkeypatch):
+        cache.put(b"digest", None, None, cache._version)
+        now = time.monotonic()
+        monkeypatch.setattr(recognition_cache_module.time, "monotonic", lambda: now + 120)
+        assert cache.get_by_content(b"digest") == (False, None)
+
+    def test_least_recently_used_entries_are_evicted(self, gallery):
+        cache = RecognitionCache(max_entries=2, ttl_seconds=60)
+        for digest in (b"a", b"b", b"c"):
+            cache.put(digest, None, None, cache._version)
+        assert cache.get_by_content(b"a") == (False, None)
+        assert cache.get_by_content(b"c") == (True, None)
+
+
+class TestCachedMatching:
+    def test_face_hash_collision_returns_the_searched_identity(self, cache, gallery, service, rng):
+        alice, bob = new_person_id(), new_person_id()
+        alice_encoding, bob_encoding = random_encoding(rng), random_encoding(rng)
+        gallery.load_encodings(np.stack([alice_encoding, bob_encoding]), [alice, bob], ["Alice", "Bob"])
+
+        first = service._match_face_cached(analysed_image(b"frame-1", 0b1010, alice_encoding))
+        assert first[0] == alice
+
+        # Bob's crop hashes one bit away from Alice's: the cached answer must not be reused
+        second = service._match_face_cached(analysed_image(b"frame-2", 0b1011, bob_encoding))
+        assert second[0] == bob
+        assert cache.face_hits == 0
+        assert cache.misses == 2
+
+    def test_confirmed_face_hash_hit(self, cache, gallery, service, rng):
+        alice = new_person_id()
+        alice_encoding = random_encoding(rng)
+        gallery.load_encodings(alice_encoding[None, :], [alice], ["Alice"])
+
+        service._match_face_cached(analysed_image(b"frame-1", 0b1010, alice_encoding))
+        nearby = alice_encoding + 0.01 * random_encoding(rng)
+        person_id, full_name, distance = service._match_face_cached(analysed_image(b"frame-2", 0b1011, nearby))
+
+        assert (person_id, full_name) == (alice, "Alice")
+        assert distance == pytest.approx(float(np.linalg.norm(nearby - alice_encoding)), abs=1e-5)
+        assert cache.face_hits == 1
+
+    def test_cached_no_match_is_searched_again(self, cache, gallery, service, rng):
+        alice_encoding = random_encoding(rng)
+        gallery.load_encodings(np.empty((0, 128), dtype=np.float32), [], [])
+        assert service._match_face_cached(analysed_image(b"frame-1", 0b1010, alice_encoding)) is None
+
+        alice = new_person_id()
+        gallery.load_encodings(alice_encoding[None, :], [alice], ["Alice"])
+        assert service._match_face_cached(analysed_image(b"frame-2", 0b1010, alice_encoding))[0] == alice
+
+    def test_exact_repeat_is_answered_from_content(self, cache, gallery, service, rng):
+        alice = new_person_id()
+        alice_encoding = random_encoding(rng)
+        gallery.load_encodings(alice_encoding[None, :], [alice], ["Alice"])
+
+        service._match_face_cached(analysed_image(b"frame-1", 0b1010, alice_encoding))
+        # Not analysed: a content hit must not need detection or encoding
+        assert service._match_face_cached(DecodedImage(b"frame-1"))[0] == alice
+        assert cache.content_hits == 1
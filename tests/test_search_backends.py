@@ -0,0 +1,69 @@
+import numpy as np
+
+from backend.services.search_backends import IVFSearchBackend
+from tests.helpers import random_encoding
+
+
+def gallery(rng, count) -> np.ndarray:
+    return np.stack([random_encoding(rng) for _ in range(count)])
+
+
+class TestIVFSearchBackend:
+    def test_untrained_below_min_size(self, rng):
+        backend = IVFSearchBackend(min_size=50)
+        encodings = gallery(rng, 10)
+        backend.rebuild(encodings, np.ones(len(encodings), dtype=bool))
+        assert not backend.is_trained
+        assert not backend.needs_rebuild
+        assert backend.candidates(encodings[:1]) is None
+
+    def test_updates_in_place_do_not_grow_size(self, rng):
+        backend = IVFSearchBackend(min_size=5)
+        encodings = gallery(rng, 4)
+        backend.rebuild(encodings, np.ones(len(encodings), dtype=bool))
+
+        # Re-enrolling existing rows many times must not look like a growing gallery
+        for _ in range(10):
+            for row in range(len(encodings)):
+                backend.add(row, random_encoding(rng))
+        assert not backend.needs_rebuild
+
+        backend.add(4, random_encoding(rng))
+        assert backend.needs_rebuild
+
+    def test_retrain_only_after_real_growth(self, rng):
+        backend = IVFSearchBackend(nlist=2, min_size=8)
+        encodings = gallery(rng, 8)
+        backend.rebuild(encodings, np.ones(len(encodings), dtype=bool))
+        assert backend.is_trained
+
+        for _ in range(50):
+            backend.add(0, random_encoding(rng))
+        assert not backend.needs_rebuild
+
+        for row in range(8, 8 * int(IVFSearchBackend.RETRAIN_GROWTH) + 1):
+            backend.add(row, random_encoding(rng))
+        assert backend.needs_rebuild
+
+    def test_rebuild_counts_live_rows(self, rng):
+        backend = IVFSearchBackend(nlist=2, min_size=4)
+        encodings = gallery(rng, 6)
+        live = np.array([True, False, True, True, False, True])
+        backend.rebuild(encodings, live)
+
+        candidates = backend.candidates(encodings)
+        assert set(candidates.tolist()) <= {0, 2, 3, 5}
+
+        # Dead rows are still known gallery rows: rewriting one is not growth
+        backend.add(1, random_encoding(rng))
+        backend.add(6, random_encoding(rng))
+        assert backend._size == 5
+
+    def test_added_row_is_a_candidate(self, rng):
+        backend = IVFSearchBackend(nlist=2, nprobe=2, min_size=4)
+        encodings = gallery(rng, 6)
+        backend.rebuild(encodings, np.ones(len(encodings), dtype=bool))
+
+        vector = random_encoding(rng)
+        backend.add(6, vector)
+        assert 6 in backend.candidates(vector[None, :]).tolist()
@@ -0,0 +1,41 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.routes import stream
+
+
+def make_client(monkeypatch) -> TestClient:
+    processed = []
+
+    def fake_process_frame(mode, frame, gate, tracker):
+        processed.append(frame)
+        return {"success": True, "message": f"{len(frame)} bytes"}
+
+    monkeypatch.setattr(stream, "_process_frame", fake_process_frame)
+    app = FastAPI()
+    app.include_router(stream.router)
+    client = TestClient(app)
+    client.processed = processed
+    return client
+
+
+class TestRecognitionStream:
+    def test_text_message_is_rejected_and_session_stays_open(self, monkeypatch):
+        client = make_client(monkeypatch)
+        with client.websocket_connect("/stream/recognize") as websocket:
+            assert websocket.receive_json()["type"] == "ready"
+
+            websocket.send_text("not a frame")
+            event = websocket.receive_json()
+            assert event == {"type": "error", "message": "Frames must be sent as binary messages"}
+
+            websocket.send_bytes(b"jpeg")
+            event = websocket.receive_json()
+            assert event["type"] == "result"
+            assert event["message"] == "4 bytes"
+        assert client.processed == [b"jpeg"]
+
+    def test_unknown_mode_closes(self, monkeypatch):
+        client = make_client(monkeypatch)
+        with client.websocket_connect("/stream/recognize?mode=bogus") as websocket:
+            assert websocket.receive_json() == {"type": "error", "message": "Unknown mode: bogus"}